@@ -0,0 +1,384 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Cache of computed responses keyed on a namespace and normalized parameters.
+
+    Lookups go through a bounded in-process LRU first and then, when
+    configured, a shared Django cache (e.g. Redis) so that workers warm each
+    other up. Entries are fresh for ``ttl`` seconds; after that, and until
+    ``stale_ttl``, the stale response is served while a single background
+    thread recomputes it.
+
+    A missing entry is computed once: concurrent requests for it wait up to
+    ``lock_timeout`` seconds for the first one's result instead of all
+    computing it (in-process, and across processes through a lock in the
+    shared tier).
+
+    ``aget_or_compute()`` is the same for async views: waits happen on the
+    event loop, and the shared tier is read in a thread.
+
+    Every key embeds the generation of its namespace. ``invalidate()`` bumps
+    the generation, which orphans all older entries at once instead of
+    enumerating them. With a shared tier the generation lives there too, so
+    an invalidation in one process reaches all of them.
+    """
+
+    def __init__(self, prefix, max_entries=1024, ttl=30, stale_ttl=300, shared_alias=None, lock_timeout=5):
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.shared = caches[shared_alias] if shared_alias else None
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._refreshing = set()
+        self._computing = {}
+        self._acomputing = weakref.WeakKeyDictionary()  # Event loop -> {key: future}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @classmethod
+    def from_settings(cls, name, prefix):
+        """Cache configured by the ``name`` setting (MAX_ENTRIES, TTL, STALE_TTL, SHARED_ALIAS, LOCK_TIMEOUT)"""
+        options = getattr(settings, name, {})
+        return cls(
+            prefix,
+            max_entries=options.get('MAX_ENTRIES', 1024),
+            ttl=options.get('TTL', 30),
+            stale_ttl=options.get('STALE_TTL', 300),
+            shared_alias=options.get('SHARED_ALIAS'),
+            lock_timeout=options.get('LOCK_TIMEOUT', 5),
+        )
+
+    def reset_stats(self):
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'waits': 0,
+            'errors': 0,
+            'miss_seconds': 0.0,
+        }
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+        lookups = snapshot['hits'] + snapshot['stale_hits'] + snapshot['misses']
+        snapshot['hit_ratio'] = (snapshot['hits'] + snapshot['stale_hits']) / lookups if lookups else 0.0
+        snapshot['avg_miss_seconds'] = snapshot['miss_seconds'] / snapshot['misses'] if snapshot['misses'] else 0.0
+        return snapshot
+
+    def generation(self, namespace):
+        if self.shared is not None:
+            try:
+                return self.shared.get_or_set(f'{self.prefix}:gen:{namespace}', 0)
+            except Exception as e:
+                logger.warning("Shared %s cache unavailable: %r", self.prefix, e)
+        return self._generations.get(namespace, 0)
+
+    def invalidate(self, namespace):
+        """Drop every cached response of ``namespace``"""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        if self.shared is not None:
+            key = f'{self.prefix}:gen:{namespace}'
+            try:
+                self.shared.add(key, 0)
+                self.shared.incr(key)
+            except Exception as e:
+                logger.warning("Could not invalidate shared %s cache: %r", self.prefix, e)
+
+    def clear(self):
+        """Forget every entry of this process, e.g. between tests"""
+        with self._lock:
+            self._entries.clear()
+            for namespace in self._generations:
+                self._generations[namespace] += 1
+
+    def make_key(self, namespace, params):
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        return f'{self.prefix}:{namespace}:{self.generation(namespace)}:{digest}'
+
+    def get_or_compute(self, namespace, params, compute):
+        """Return the cached response for ``params``, calling ``compute()`` on a miss"""
+        key = self.make_key(namespace, params)
+        entry = self._get(key)
+        now = time.time()
+
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self._count('hits')
+                return value
+            if now < stale_until:
+                self._count('stale_hits')
+                self._refresh_in_background(key, compute)
+                return value
+
+        return self._compute_once(key, compute)
+
+    def _compute_once(self, key, compute):
+        """Compute a missing entry, or wait for the request already computing it"""
+        with self._lock:
+            computing = self._computing.get(key)
+            if computing is None:
+                computing = self._computing[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            self._count('waits')
+            computing.wait(self.lock_timeout)
+            entry = self._get(key)
+            if entry is not None:
+                return entry[0]
+            # The other request failed or is too slow; compute it ourselves
+        try:
+            if owner and not self._acquire_shared(key):
+                entry = self._wait_shared(key)
+                if entry is not None:
+                    return entry[0]
+            self._count('misses')
+            started = time.perf_counter()
+            value = compute()
+            self._count('miss_seconds', time.perf_counter() - started)
+            self._set(key, value)
+            return value
+        finally:
+            if owner:
+                self._release_shared(key)
+                with self._lock:
+                    self._computing.pop(key, None)
+                computing.set()
+
+    async def aget_or_compute(self, namespace, params, compute):
+        """``get_or_compute()`` where ``compute`` is a coroutine function"""
+        key = await self._shared_call(self.make_key, namespace, params)
+        entry = await self._shared_call(self._get, key)
+        now = time.time()
+
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self._count('hits')
+                return value
+            if now < stale_until:
+                self._count('stale_hits')
+                self._arefresh_in_background(key, compute)
+                return value
+
+        return await self._acompute_once(key, compute)
+
+    async def _acompute_once(self, key, compute):
+        loop = asyncio.get_running_loop()
+        computing = self._acomputing.setdefault(loop, {})
+        future = computing.get(key)
+        owner = future is None
+        if owner:
+            future = computing[key] = loop.create_future()
+        else:
+            self._count('waits')
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.lock_timeout)
+            except asyncio.TimeoutError:
+                pass
+            entry = await self._shared_call(self._get, key)
+            if entry is not None:
+                return entry[0]
+            # The other request failed or is too slow; compute it ourselves
+        try:
+            if owner and not await self._shared_call(self._acquire_shared, key):
+                entry = await self._await_shared(key)
+                if entry is not None:
+                    return entry[0]
+            self._count('misses')
+            started = time.perf_counter()
+            value = await compute()
+            self._count('miss_seconds', time.perf_counter() - started)
+            await self._shared_call(self._set, key, value)
+            return value
+        finally:
+            if owner:
+                await self._shared_call(self._release_shared, key)
+                computing.pop(key, None)
+                if not future.done():
+                    future.set_result(None)
+
+    async def _await_shared(self, key):
+        self._count('waits')
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = await self._shared_call(self._get, key)
+            if entry is not None:
+                return entry
+        return None
+
+    async def _shared_call(self, method, *args):
+        """Call ``method``, in a thread if it may go to the shared tier"""
+        if self.shared is None:
+            return method(*args)
+        return await sync_to_async(method, thread_sensitive=False)(*args)
+
+    def _arefresh_in_background(self, key, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._shared_call(self._set, key, await compute())
+                self._count('refreshes')
+            except Exception as e:
+                self._count('errors')
+                logger.warning("Background %s cache refresh failed: %r", self.prefix, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # Keep a reference, or the task may be garbage collected before it is done
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _acquire_shared(self, key):
+        if self.shared is None:
+            return True
+        try:
+            return self.shared.add(f'{key}:lock', 1, timeout=self.lock_timeout)
+        except Exception as e:
+            logger.warning("Shared %s cache unavailable: %r", self.prefix, e)
+            return True
+
+    def _wait_shared(self, key):
+        """Poll the shared tier for the entry another process is computing"""
+        self._count('waits')
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self._get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _release_shared(self, key):
+        if self.shared is None:
+            return
+        try:
+            self.shared.delete(f'{key}:lock')
+        except Exception as e:
+            logger.warning("Shared %s cache unavailable: %r", self.prefix, e)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.shared is None:
+            return None
+        try:
+            entry = self.shared.get(key)
+        except Exception as e:
+            logger.warning("Shared %s cache unavailable: %r", self.prefix, e)
+            return None
+        if entry is not None:
+            self._set_local(key, entry)
+        return entry
+
+    def _set(self, key, value):
+        now = time.time()
+        entry = (value, now + self.ttl, now + self.stale_ttl)
+        self._set_local(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, timeout=self.stale_ttl)
+            except Exception as e:
+                logger.warning("Could not write shared %s cache: %r", self.prefix, e)
+
+    def _set_local(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh_in_background(self, key, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._set(key, compute())
+                self._count('refreshes')
+            except Exception as e:
+                self._count('errors')
+                logger.warning("Background %s cache refresh failed: %r", self.prefix, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+                connections.close_all()  # This thread's connections only
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+
+
+shop_cache = ResponseCache.from_settings('SHOP_CACHE', prefix='shop')
+
+
+class CachedResponseMixin:
+    """
+    Serves the GET responses of a public view from ``shop_cache``.
+
+    Entries are keyed on ``cache_namespace`` and ``get_cache_params()``: the
+    query parameters that change the response, normalized the way the view
+    reads them, so equivalent URLs share an entry and unrelated parameters
+    are ignored. Receivers of the models' save and delete signals invalidate
+    the namespace. Only successful responses are cached.
+    """
+    response_cache = shop_cache
+    cache_namespace = None
+
+    def get_cache_params(self):
+        return {}
+
+    def get(self, request, *args, **kwargs):
+        params = {
+            'host': request.get_host(),  # Pagination links are absolute
+            'format': request.accepted_renderer.format,
+            **self.get_cache_params(),
+        }
+        data = self.response_cache.get_or_compute(
+            self.cache_namespace,
+            params,
+            lambda: super(CachedResponseMixin, self).get(request, *args, **kwargs).data,
+        )
+        return Response(data)
@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, renderers, serializers
+from rest_framework.parsers import MultiPartParser
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+FORMATS = ('csv', 'jsonl')
+
+
+class Echo:
+    """File-like object handing back what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+class Catalog:
+    """
+    CSV and JSON Lines export and import of one model, in constant memory.
+
+    Exports read the rows of ``queryset()`` through a server-side cursor and
+    stream them out ``chunk_size`` at a time. Imports read a file line by
+    line, validate ``batch_size`` rows at a time with ``serializer_class``
+    (whose list serializer must bulk-create) and write each batch in its own
+    transaction: a rejected row is reported and skipped, and an interrupted
+    import keeps the batches written before.
+
+    ``columns`` maps export columns to fields or annotations of
+    ``queryset()``; ``json_columns`` hold lists, JSON encoded in CSV cells.
+    Imported rows are validated like API input, so read-only columns (ids,
+    owner, timestamps) are ignored and every row creates a new object.
+    """
+    name = None
+    serializer_class = None
+    columns = {}
+    json_columns = ()
+    chunk_size = 2000
+    batch_size = 500
+
+    def queryset(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def format_of(filename):
+        """Import format of a file, from its extension"""
+        extension = os.path.splitext(filename)[1].lower().lstrip('.')
+        return {'ndjson': 'jsonl'}.get(extension, extension) if extension in FORMATS + ('ndjson',) else None
+
+    def export(self, file_format):
+        rows = self.queryset().values_list(*self.columns.values()).iterator(chunk_size=self.chunk_size)
+        render = self.render_csv if file_format == 'csv' else self.render_jsonl
+        response = StreamingHttpResponse(
+            render(rows),
+            content_type='text/csv' if file_format == 'csv' else 'application/x-ndjson',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.name}.{file_format}"'
+        return response
+
+    def render_csv(self, rows):
+        writer = csv.writer(Echo())
+        json_indexes = [index for index, column in enumerate(self.columns) if column in self.json_columns]
+        yield writer.writerow(list(self.columns))
+        while chunk := list(islice(rows, self.chunk_size)):
+            lines = []
+            for row in chunk:
+                row = list(row)
+                for index in json_indexes:
+                    if row[index] is not None:
+                        row[index] = json.dumps(row[index])
+                lines.append(writer.writerow(row))
+            yield ''.join(lines)
+
+    def render_jsonl(self, rows):
+        while chunk := list(islice(rows, self.chunk_size)):
+            yield ''.join(
+                json.dumps(dict(zip(self.columns, row)), cls=DjangoJSONEncoder) + '\n' for row in chunk
+            )
+
+    def read(self, file, file_format):
+        """
+        ``(line number, row)`` pairs of a binary CSV or JSON Lines file, read
+        one line at a time. Empty CSV cells are left out of their row, so
+        that fields fall back to their defaults; lines that are not valid
+        JSON come as a ValueError instead of a row.
+        """
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        if file_format == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, self.parse_csv_row(row)
+        else:
+            for number, line in enumerate(text, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError as e:
+                        yield number, e
+
+    def parse_csv_row(self, row):
+        parsed = {}
+        for column, value in row.items():
+            if not value or column is None:  # Empty cell, or cells past the header
+                continue
+            if column in self.json_columns:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass  # Left for the serializer to reject
+            parsed[column] = value
+        return parsed
+
+    def import_rows(self, rows, owner, batch_size=None, context=None):
+        """
+        Validate and create ``(line number, row)`` pairs for ``owner``, a batch
+        at a time. Yields the running totals after each batch, with the
+        errors of the rows it rejected:
+        ``{"rows": ..., "created": ..., "rejected": ..., "errors": [{"line": ..., "errors": ...}]}``.
+        """
+        rows = iter(rows)
+        progress = {'rows': 0, 'created': 0, 'rejected': 0}
+        while batch := list(islice(rows, batch_size or self.batch_size)):
+            errors = []
+            valid = []
+            for line, row in batch:
+                if isinstance(row, ValueError):
+                    errors.append({'line': line, 'errors': {api_settings.NON_FIELD_ERRORS_KEY: [f'Invalid JSON: {row}']}})
+                else:
+                    valid.append((line, row))
+
+            # Validate the batch, then once more without the rows it rejected
+            while valid:
+                serializer = self.serializer_class(data=[row for _, row in valid], many=True, context=context)
+                if serializer.is_valid():
+                    with transaction.atomic():
+                        serializer.save(owner=owner)
+                    break
+                row_errors = serializer.errors
+                if not any(row_errors):  # Not attributable to a row
+                    row_errors = [{api_settings.NON_FIELD_ERRORS_KEY: ['Rejected with its batch.']}] * len(valid)
+                errors += [{'line': line, 'errors': e} for (line, _), e in zip(valid, row_errors) if e]
+                valid = [(line, row) for (line, row), e in zip(valid, row_errors) if not e]
+
+            progress['rows'] += len(batch)
+            progress['created'] += len(valid)
+            progress['rejected'] += len(batch) - len(valid)
+            yield {**progress, 'errors': sorted(errors, key=lambda error: error['line'])}
+
+
+class StreamRenderer(renderers.BaseRenderer):
+    """
+    Lets ``?format=`` and the Accept header pick a catalog file format. The
+    rows themselves are streamed by Catalog.export; only error responses
+    are rendered here, as JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b'' if data is None else json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class CSVRenderer(StreamRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JSONLinesRenderer(StreamRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+
+class CatalogExportView(APIView):
+    """
+    Streams every row of ``catalog`` as CSV (the default) or JSON Lines
+    (``?format=jsonl`` or ``Accept: application/x-ndjson``).
+    """
+    catalog = None
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [CSVRenderer, JSONLinesRenderer]
+
+    def get(self, request):
+        return self.catalog.export(request.accepted_renderer.format)
+
+
+class CatalogImportView(APIView):
+    """
+    Imports the CSV or JSON Lines ``file`` of a multipart upload into
+    ``catalog``, owned by the current user. The response streams one JSON
+    line of progress per batch written, the last one holding the totals.
+    Batches commit one by one.
+    """
+    catalog = None
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise serializers.ValidationError({'file': ['No file was submitted.']})
+        file_format = self.catalog.format_of(upload.name)
+        if file_format is None:
+            raise serializers.ValidationError({'file': [f"Expected a {' or '.join(FORMATS)} file."]})
+
+        progress = self.catalog.import_rows(self.catalog.read(upload.file, file_format), request.user)
+        return StreamingHttpResponse(
+            (json.dumps(batch, cls=DjangoJSONEncoder) + '\n' for batch in progress),
+            content_type='application/x-ndjson',
+        )
+
+
+class CatalogImportCommand(BaseCommand):
+    """Base of the ``import_<catalog>`` management commands"""
+    catalog = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import (.csv, .jsonl or .ndjson)')
+        parser.add_argument('--owner', required=True, help='Username owning the imported rows')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=self.catalog.batch_size,
+                            help='Rows validated and written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['owner']}")
+        file_format = options['format'] or self.catalog.format_of(options['path'])
+        if file_format is None:
+            raise CommandError('Unknown file format; pass --format')
+
+        progress = {'rows': 0, 'created': 0, 'rejected': 0}
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = self.catalog.read(f, file_format)
+                for progress in self.catalog.import_rows(rows, owner, options['batch_size']):
+                    for error in progress['errors']:
+                        self.stderr.write(f"Line {error['line']}: {json.dumps(error['errors'])}")
+                    self.stdout.write(
+                        f"{progress['rows']} rows: {progress['created']} created, {progress['rejected']} rejected"
+                    )
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {progress['created']} {self.catalog.name}, rejected {progress['rejected']}"
+        ))
@@ -0,0 +1,349 @@
+import contextvars
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Where the time of one request went, filled in by the hooks below"""
+
+    def __init__(self, keep_queries=False):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.queries = [] if keep_queries else None  # (seconds, sql), for the slow request log
+        self.external = {}  # service -> [seconds, calls]
+        self.serialize_seconds = 0.0
+        self.serializing = False
+
+    def add_external(self, service, seconds):
+        totals = self.external.setdefault(service, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+
+def current_timings():
+    """Timings of the request being handled, or None outside of one"""
+    return _current.get()
+
+
+@contextmanager
+def external_call(service):
+    """Account the time of the block to calls to ``service`` of the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_external(service, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing every query of the current request"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings.db_seconds += elapsed
+        timings.db_queries += 1
+        if timings.queries is not None:
+            timings.queries.append((elapsed, sql))
+
+
+def instrument_connection(connection, **kwargs):
+    """
+    Install ``record_query`` on a database connection, once. Connections are
+    per thread, and async views query from executor threads, so every
+    connection gets it as it is created instead of for the request at hand.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _timed_data(data):
+    """
+    Times the ``data`` property of a serializer, i.e. ``to_representation``
+    and the queries it triggers. Nested serializers are counted once, as
+    part of the outermost one.
+    """
+    def getter(serializer):
+        timings = _current.get()
+        if timings is None or timings.serializing:
+            return data.fget(serializer)
+        timings.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            timings.serializing = False
+            timings.serialize_seconds += time.perf_counter() - started
+    getter.instrumented = True
+    return property(getter)
+
+
+def instrument_serializers():
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, 'instrumented', False):
+            cls.data = _timed_data(cls.data)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # Per bucket, not cumulative
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.responses = {}  # status code -> count
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.serialize_seconds = 0.0
+        self.external = {}  # service -> [seconds, calls]
+
+
+class Metrics:
+    """
+    Request metrics aggregated per view and method, rendered in the
+    Prometheus text format.
+
+    Each process keeps its own; with several workers every scrape sees the
+    worker that answered it, which Prometheus handles as counter resets
+    unless the workers are scraped separately.
+    """
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def record(self, view, method, status, seconds, timings):
+        with self._lock:
+            metrics = self._views.get((view, method))
+            if metrics is None:
+                metrics = self._views[(view, method)] = ViewMetrics()
+            metrics.latency.observe(seconds)
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+            metrics.db_seconds += timings.db_seconds
+            metrics.db_queries += timings.db_queries
+            metrics.serialize_seconds += timings.serialize_seconds
+            for service, (service_seconds, calls) in timings.external.items():
+                totals = metrics.external.setdefault(service, [0.0, 0])
+                totals[0] += service_seconds
+                totals[1] += calls
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, description, samples):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+                lines.append(f'{name}{suffix}{{{label_text}}} {format_value(value)}')
+
+        with self._lock:
+            views = sorted(self._views.items())
+            family('http_requests_total', 'counter', 'Responses by view, method and status.', [
+                ('', {'view': view, 'method': method, 'status': str(status)}, count)
+                for (view, method), metrics in views
+                for status, count in sorted(metrics.responses.items())
+            ])
+            family('http_request_duration_seconds', 'histogram', 'Request latency by view and method.', [
+                sample
+                for (view, method), metrics in views
+                for sample in histogram_samples({'view': view, 'method': method}, metrics.latency)
+            ])
+            family('http_request_db_seconds_total', 'counter', 'Time spent in database queries.', [
+                ('', {'view': view, 'method': method}, metrics.db_seconds) for (view, method), metrics in views
+            ])
+            family('http_request_db_queries_total', 'counter', 'Database queries run.', [
+                ('', {'view': view, 'method': method}, metrics.db_queries) for (view, method), metrics in views
+            ])
+            family('http_request_serialize_seconds_total', 'counter', 'Time spent serializing responses.', [
+                ('', {'view': view, 'method': method}, metrics.serialize_seconds)
+                for (view, method), metrics in views
+            ])
+            family('http_request_external_seconds_total', 'counter', 'Time spent calling external services.', [
+                ('', {'view': view, 'method': method, 'service': service}, seconds)
+                for (view, method), metrics in views
+                for service, (seconds, _) in sorted(metrics.external.items())
+            ])
+            family('http_request_external_calls_total', 'counter', 'Calls made to external services.', [
+                ('', {'view': view, 'method': method, 'service': service}, calls)
+                for (view, method), metrics in views
+                for service, (_, calls) in sorted(metrics.external.items())
+            ])
+        return '\n'.join(lines) + '\n'
+
+
+def histogram_samples(labels, histogram):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        yield '_bucket', {**labels, 'le': format_value(bound)}, cumulative
+    yield '_bucket', {**labels, 'le': '+Inf'}, histogram.count
+    yield '_sum', labels, histogram.sum
+    yield '_count', labels, histogram.count
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
+
+
+class InstrumentationMiddleware:
+    """
+    Times every request and accounts for its database queries, response
+    serialization and external calls (see ``external_call``). The breakdown
+    is sent back in a ``Server-Timing`` header, aggregated per view for
+    ``/metrics``, and logged with the slowest queries when the request took
+    longer than ``SLOW_REQUEST_SECONDS``.
+
+    Goes first in MIDDLEWARE so that the other middleware is timed too.
+    Supports both sync and async requests, so that it keeps async views
+    running on the event loop under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        options = getattr(settings, 'INSTRUMENTATION', {})
+        self.server_timing = options.get('SERVER_TIMING', True)
+        self.slow_request_seconds = options.get('SLOW_REQUEST_SECONDS')
+        self.slow_request_queries = options.get('SLOW_REQUEST_QUERIES', 5)
+        instrument_serializers()
+        connection_created.connect(instrument_connection)
+        for connection in connections.all(initialized_only=True):  # Opened before this middleware
+            instrument_connection(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings(keep_queries=self.slow_request_seconds is not None)
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.process(request, response, time.perf_counter() - started, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings(keep_queries=self.slow_request_seconds is not None)
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.process(request, response, time.perf_counter() - started, timings)
+
+    def process(self, request, response, elapsed, timings):
+        view = self.view_name(request)
+        metrics.record(view, request.method, response.status_code, elapsed, timings)
+        if self.server_timing:
+            response['Server-Timing'] = self.server_timing_header(elapsed, timings)
+        if self.slow_request_seconds is not None and elapsed >= self.slow_request_seconds:
+            self.log_slow_request(request, view, response, elapsed, timings)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unresolved>'  # 404s stay in one series whatever the path
+        return match.view_name or match._func_path
+
+    @staticmethod
+    def server_timing_header(elapsed, timings):
+        entries = [f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_queries} queries"']
+        if timings.serialize_seconds:
+            entries.append(f'serialize;dur={timings.serialize_seconds * 1000:.1f}')
+        for service, (seconds, calls) in sorted(timings.external.items()):
+            entries.append(f'{service};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        entries.append(f'total;dur={elapsed * 1000:.1f}')
+        return ', '.join(entries)
+
+    def log_slow_request(self, request, view, response, elapsed, timings):
+        slowest = sorted(timings.queries, key=lambda query: query[0], reverse=True)[:self.slow_request_queries]
+        logger.warning(
+            'Slow request: %s %s (%s) -> %s in %.0fms; %d queries in %.0fms, serialize %.0fms%s%s',
+            request.method,
+            request.get_full_path(),
+            view,
+            response.status_code,
+            elapsed * 1000,
+            timings.db_queries,
+            timings.db_seconds * 1000,
+            timings.serialize_seconds * 1000,
+            ''.join(
+                f', {service} {calls} calls in {seconds * 1000:.0f}ms'
+                for service, (seconds, calls) in sorted(timings.external.items())
+            ),
+            ''.join(f'\n  {seconds * 1000:.1f}ms: {sql}' for seconds, sql in slowest),
+        )
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+       -> Request metrics of this process in the Prometheus text format.
+
+    Open to staff sessions, and to ``Authorization: Bearer <METRICS_TOKEN>``
+    when that setting is configured, for the scraper.
+    """
+    token = getattr(settings, 'INSTRUMENTATION', {}).get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if not (
+        request.user.is_staff
+        or (token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()))
+    ):
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
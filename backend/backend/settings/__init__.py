@@ -0,0 +1,3 @@
+# DJANGO_SETTINGS_MODULE=backend.settings runs the development settings;
+# deployments use backend.settings.production.
+from .development import *  # noqa: F401,F403
@@ -1,16 +1,18 @@
+"""
+Settings shared by every environment. Run with backend.settings (development,
+the default) or backend.settings.production; see README.org.
+"""
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "dummy-secret-key"
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dummy-secret-key")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
 
 # Application definition
@@ -22,6 +24,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'drf_spectacular',
     "allauth",
     "allauth.account",
@@ -35,16 +38,88 @@ INSTALLED_APPS = [
     "user",
     "product",
     "property",
-    # "search"
+    "search",
+    "chat",
+    "benchmarks",
 ]
 
 
-import os
 # ✅ Use Traefik Proxy URL for Meilisearch
-MEILISEARCH_URL = "http://meilisearch:7700"
+MEILISEARCH_URL = os.getenv("MEILISEARCH_URL", "http://meilisearch:7700")
 MEILISEARCH_API_KEY = os.getenv("MEILISEARCH_API_KEY", "8OYFXXO8qCT9JJVKyrbu2F0OssR-DvMbh1Ci5UeoPvE")
 
+# Search engines, tried in order. One that fails is skipped for
+# SEARCH_FAILOVER_COOLDOWN seconds and the next one answers instead.
+SEARCH_BACKENDS = [
+    "search.backends.MeilisearchBackend",
+    "search.backends.PostgresSearchBackend",
+]
+SEARCH_FAILOVER_COOLDOWN = 30
+
+# Meilisearch clients (search.client): one per process, and one async client
+# per event loop. Timeouts are in seconds.
+MEILISEARCH_HTTP = {
+    "TIMEOUT": 5,
+    "CONNECT_TIMEOUT": 1,
+    "MAX_CONNECTIONS": 100,  # Async client only
+    "MAX_KEEPALIVE_CONNECTIONS": 20,
+    "KEEPALIVE_EXPIRY": 30,  # Seconds an idle connection is kept open (async client)
+    "FAILURE_THRESHOLD": 5,  # Consecutive failures opening the circuit breaker
+    "RESET_TIMEOUT": 30,  # Seconds calls fail fast before Meilisearch is tried again
+}
+
+# Django's built-in Redis cache (redis-py comes with channels-redis) as the
+# "shared" alias whenever Redis is available.
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+if os.getenv("REDIS_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+
+# Search result cache: in-process LRU, plus a shared tier naming a CACHES
+# alias (the Redis "shared" one by default) so invalidations reach every
+# worker, including the search worker that drains the outbox.
+SEARCH_CACHE = {
+    "MAX_ENTRIES": 1024,
+    "TTL": 30,  # Seconds a cached response is served as fresh
+    "STALE_TTL": 300,  # Seconds it may be served stale while being refreshed
+    "SHARED_ALIAS": os.getenv("SEARCH_CACHE_SHARED_ALIAS") or ("shared" if "shared" in CACHES else None),
+}
+
+# Server-side cache of the public shop listings, configured like
+# SEARCH_CACHE. Model signals invalidate it; with several workers it needs
+# the shared tier so that they all see the invalidations.
+SHOP_CACHE = {
+    "MAX_ENTRIES": 1024,
+    "TTL": 60,
+    "STALE_TTL": 600,
+    "LOCK_TIMEOUT": 5,  # Seconds concurrent misses wait for the first one's result
+    "SHARED_ALIAS": os.getenv("SHOP_CACHE_SHARED_ALIAS") or ("shared" if "shared" in CACHES else None),
+}
+
+# WebSocket chat. Without REDIS_URL messages only reach sockets of the same
+# process, which is enough for a single development server.
+ASGI_APPLICATION = "backend.asgi.application"
+if os.getenv("REDIS_URL"):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [os.getenv("REDIS_URL")]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+CHAT = {
+    "MAX_MESSAGE_LENGTH": 4000,
+    "FLUSH_INTERVAL": 0.2,  # Seconds a received message may wait before being written
+    "FLUSH_BATCH_SIZE": 200,  # Pending messages that trigger an immediate write
+    "FLUSH_RETRIES": 3,  # Failed writes of a batch before its messages are written, or dropped, one by one
+}
+
 MIDDLEWARE = [
+    "backend.metrics.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     'corsheaders.middleware.CorsMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -56,6 +131,17 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
 ]
 
+# Per-request instrumentation (backend.metrics.InstrumentationMiddleware):
+# a Server-Timing header with the database, serialization and Meilisearch
+# time of each response, per-view aggregates at /metrics, and a warning with
+# the slowest queries of requests taking SLOW_REQUEST_SECONDS or more.
+INSTRUMENTATION = {
+    "SERVER_TIMING": True,
+    "METRICS_TOKEN": os.getenv("METRICS_TOKEN") or None,  # Bearer token for the scraper
+    "SLOW_REQUEST_SECONDS": float(os.getenv("SLOW_REQUEST_SECONDS", "1")),  # None disables the log
+    "SLOW_REQUEST_QUERIES": 5,  # Queries logged per slow request, slowest first
+}
+
 # settings.py
 REST_AUTH_REGISTER_SERIALIZERS = {
     'REGISTER_SERIALIZER': 'user.serializers.CustomRegisterSerializer',
@@ -107,11 +193,11 @@ WSGI_APPLICATION = "backend.wsgi.application"
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'meetgoti',
-        'USER': 'meetgoti',
-        'PASSWORD': '',
-        'HOST': 'localhost',
-        'PORT': '',
+        'NAME': os.getenv('DB_NAME', 'meetgoti'),
+        'USER': os.getenv('DB_USER', 'meetgoti'),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', ''),
     }
 }
 
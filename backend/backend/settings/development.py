@@ -0,0 +1,9 @@
+"""Local development: runserver, DEBUG, a new database connection per request."""
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+# Must come first: makes runserver serve the ASGI app, WebSockets included.
+# Only for runserver, as it installs the Twisted reactor in every process that
+# loads it; production runs the daphne command instead.
+INSTALLED_APPS = ["daphne", *INSTALLED_APPS]  # noqa: F405
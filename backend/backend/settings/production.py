@@ -0,0 +1,40 @@
+"""
+Production, served by gunicorn (HTTP, see gunicorn.conf.py) and daphne
+(WebSockets). Configured from the environment; DJANGO_SECRET_KEY is required.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES
+
+DEBUG = False
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
+if not SECRET_KEY:
+    raise ImproperlyConfigured("DJANGO_SECRET_KEY must be set in production")
+ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "localhost").split(",")
+CSRF_TRUSTED_ORIGINS = os.getenv("DJANGO_CSRF_TRUSTED_ORIGINS", "http://localhost:3000").split(",")
+STATIC_ROOT = os.getenv("DJANGO_STATIC_ROOT", "/code/static")
+
+# Persistent connections: each worker thread keeps its connection for
+# DB_CONN_MAX_AGE seconds instead of opening one per request, and checks
+# that it still works before reusing it. Django does not support them under
+# ASGI, so the daphne process runs with DB_CONN_MAX_AGE=0.
+DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# DB_POOL=pgbouncer when DB_HOST is a pgbouncer in transaction pooling mode:
+# server-side cursors (used by QuerySet.iterator(), e.g. the catalog
+# exports) do not survive the switching of server connections between
+# transactions, so rows are fetched client-side instead.
+if os.getenv("DB_POOL") == "pgbouncer":
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "root": {"handlers": ["console"], "level": os.getenv("DJANGO_LOG_LEVEL", "INFO")},
+    "loggers": {"httpx": {"level": "WARNING"}},  # Not every Meilisearch request
+}
@@ -0,0 +1,55 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .cache import shop_cache
+
+
+class QueryPlanTestMixin:
+    """
+    Asserts that the queries behind an endpoint are served by indexes.
+
+    Every SELECT the request runs is re-run under ``EXPLAIN`` and the plan
+    fails the test if it sequentially scans one of ``indexed_tables``. Plans
+    depend on table statistics, so seed a realistically large and skewed
+    dataset and call ``analyze()`` before asserting.
+    """
+    indexed_tables = ()
+
+    @staticmethod
+    def analyze(*models):
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+    def seq_scans(self, plan):
+        scans = []
+        if plan['Node Type'] == 'Seq Scan' and plan['Relation Name'] in self.indexed_tables:
+            scans.append(plan['Relation Name'])
+        for child in plan.get('Plans', []):
+            scans += self.seq_scans(child)
+        return scans
+
+    def assertUsesIndexes(self, url, user):
+        self.client.force_authenticate(user)
+        shop_cache.clear()  # Plan the queries, not a cached response
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        selects = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, f'{url} ran no queries')
+        for sql in selects:
+            plan = self.explain(sql)
+            scans = self.seq_scans(plan)
+            self.assertFalse(
+                scans,
+                f'{url} sequentially scans {", ".join(scans)}:\n{sql}\n{json.dumps(plan, indent=2)}',
+            )
@@ -0,0 +1,22 @@
+from django.db import transaction
+
+
+class AtomicWritesMixin:
+    """
+    Runs the create, update and destroy actions of a DRF generic view in a
+    transaction, so that the rows signal receivers write along with the
+    change (the search outbox) commit or roll back together with it. Reads
+    stay in autocommit, without BEGIN/COMMIT or savepoints.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
@@ -2,17 +2,20 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     # Optional UI:
     path('swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path("metrics", metrics_view, name="metrics"),
     path("admin/", admin.site.urls),
     path("accounts/", include("allauth.urls")),
     path("_allauth/", include("allauth.headless.urls")),
     path("_allauth/api/", include("user.urls")),
     path("_allauth/api/", include("product.urls")),
     path("_allauth/api/", include("property.urls")),
-
-    # path("_allauth/api/", include("search.urls")),
+    path("_allauth/api/", include("search.urls")),
+    path("_allauth/api/", include("chat.urls")),
 ]
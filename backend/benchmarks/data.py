@@ -0,0 +1,160 @@
+import random
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from product.models import Category, Product, ProductImage
+from property.models import Property, PropertyImage
+
+USERNAME_PREFIX = 'bench'
+PASSWORD = 'bench-password'
+BATCH_SIZE = 2000
+
+CATEGORIES = ['Books', 'Electronics', 'Furniture', 'Clothing', 'Sports', 'Stationery', 'Kitchen', 'Cycles']
+BRANDS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark', 'Wayne', 'Tyrell']
+NOUNS = ['laptop', 'chair', 'desk', 'novel', 'jacket', 'bicycle', 'kettle', 'lamp', 'calculator', 'headphones']
+ADJECTIVES = ['used', 'new', 'vintage', 'compact', 'wireless', 'wooden', 'foldable', 'portable']
+AREAS = ['North Campus', 'South Campus', 'Old Town', 'Station Road', 'Lake View', 'Hill Side']
+COLOURS = ['red', 'blue', 'black', 'white', 'green']
+
+
+def title(rng):
+    return f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)}'
+
+
+@transaction.atomic
+def generate(users, products, properties, messages, seed=0):
+    """
+    Create a reproducible dataset: the same arguments always produce the same
+    rows (apart from ids). Users are named ``bench<n>`` and share
+    ``PASSWORD``. The mix of sold, hidden and deleted listings mirrors a
+    long-running deployment rather than a fresh one. Chat messages are only
+    generated when the chat app is installed.
+
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    counts = {}
+
+    # Hashing is deliberately slow; hash once and share the result.
+    password = make_password(PASSWORD)
+    owners = User.objects.bulk_create(
+        (
+            User(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com', password=password)
+            for i in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    counts['users'] = len(owners)
+
+    categories = [Category.objects.get_or_create(name=name, defaults={'slug': name.lower()})[0] for name in CATEGORIES]
+
+    def created(i, total):
+        # Spread creation times over the last year, oldest first.
+        return now - timedelta(seconds=(total - i) * 365 * 24 * 3600 // max(total, 1))
+
+    product_rows = Product.objects.bulk_create(
+        (
+            Product(
+                title=title(rng),
+                description=' '.join(rng.choices(NOUNS + ADJECTIVES, k=30)),
+                owner=rng.choice(owners),
+                category=rng.choice(categories),
+                brand=rng.choice(BRANDS),
+                quantity=rng.randint(1, 5),
+                mrp=(mrp := rng.randint(100, 50000)),
+                selling_price=rng.randint(mrp // 2, mrp),
+                is_ad=rng.random() < 0.05,
+                is_active=rng.random() < 0.9,
+                is_sold=rng.random() < 0.6,
+                deleted=rng.random() < 0.05,
+                extra_features=[{'key': 'colour', 'value': rng.choice(COLOURS)}],
+            )
+            for _ in range(products)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    for i, product in enumerate(product_rows):
+        product.created_at = created(i, products)
+    Product.objects.bulk_update(product_rows, ['created_at'], batch_size=BATCH_SIZE)
+    ProductImage.objects.bulk_create(
+        (
+            ProductImage(product=product, url=f'https://img.example.com/p/{product.pk}/{position}.jpg',
+                         position=position, is_primary=position == 0)
+            for product in product_rows
+            for position in range(rng.randint(1, 4))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    counts['products'] = len(product_rows)
+
+    property_rows = Property.objects.bulk_create(
+        (
+            Property(
+                title=f'{rng.randint(1, 3)} BHK near {rng.choice(AREAS)}',
+                description=' '.join(rng.choices(NOUNS + ADJECTIVES, k=30)),
+                owner=rng.choice(owners),
+                location=rng.choice(AREAS),
+                latitude=round(18.5 + rng.uniform(-0.05, 0.05), 6),
+                longitude=round(73.85 + rng.uniform(-0.05, 0.05), 6),
+                rent_per_month=rng.randrange(2000, 20000, 500),
+                security_deposit=rng.randrange(0, 50000, 1000),
+                furnished=rng.random() < 0.5,
+                total_vacancy=(total := rng.randint(1, 6)),
+                available_vacancy=rng.randint(0, total),
+                sharing=rng.randint(1, 4),
+                is_active=rng.random() < 0.3,
+                deleted=rng.random() < 0.05,
+            )
+            for _ in range(properties)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    for i, property_obj in enumerate(property_rows):
+        property_obj.created_at = created(i, properties)
+    Property.objects.bulk_update(property_rows, ['created_at'], batch_size=BATCH_SIZE)
+    PropertyImage.objects.bulk_create(
+        (
+            PropertyImage(property=property_obj, url=f'https://img.example.com/r/{property_obj.pk}/{position}.jpg',
+                          position=position, is_primary=position == 0)
+            for property_obj in property_rows
+            for position in range(rng.randint(1, 4))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    counts['properties'] = len(property_rows)
+
+    if apps.is_installed('chat') and messages and len(owners) > 1:
+        counts['messages'] = generate_messages(rng, owners, messages)
+    return counts
+
+
+def generate_messages(rng, owners, messages):
+    from chat.inbox import record_messages
+    from chat.models import ChatParticipant, ChatRoom, Message
+
+    pairs = set()
+    while len(pairs) < min(max(messages // 50, 1), len(owners) * (len(owners) - 1) // 2):
+        user1, user2 = sorted(rng.sample(range(len(owners)), 2))
+        pairs.add((user1, user2))
+    rooms = ChatRoom.objects.bulk_create(ChatRoom(user1=owners[a], user2=owners[b]) for a, b in sorted(pairs))
+    ChatParticipant.objects.bulk_create(
+        ChatParticipant(room=room, user=user) for room in rooms for user in (room.user1, room.user2)
+    )
+    created = Message.objects.bulk_create(
+        (
+            Message(
+                chat_room=(room := rng.choice(rooms)),
+                sender=rng.choice([room.user1, room.user2]),
+                content=' '.join(rng.choices(NOUNS + ADJECTIVES, k=rng.randint(2, 20))),
+            )
+            for _ in range(messages)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    record_messages(created)
+    return messages
@@ -0,0 +1,76 @@
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import runner, startup
+from .run_benchmarks import DEFAULT_BASELINE
+
+
+class Command(BaseCommand):
+    help = (
+        'Time how long a fresh worker process takes to be ready to serve, profile its imports '
+        '(python -X importtime) and compare it with the JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['wsgi', 'asgi'], default='wsgi',
+                            help='Worker to boot: gunicorn (wsgi) or daphne (asgi)')
+        parser.add_argument('--runs', type=int, default=5, help='Processes started; the median is reported')
+        parser.add_argument('--top', type=int, default=15, help='Slowest packages and imports to list')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed drift as a fraction of the baseline')
+        parser.add_argument('--min-delta-ms', type=float, default=50.0,
+                            help='Drift always allowed, in milliseconds')
+        parser.add_argument('--budget-ms', type=float, default=1000.0,
+                            help='Fail when a worker takes longer than this to be ready')
+        parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+
+    def handle(self, *args, **options):
+        try:
+            result, rows = startup.measure(options['target'], options['runs'])
+        except runner.BenchmarkError as e:
+            raise CommandError(str(e))
+
+        report = startup.profile(rows, f"backend.{options['target']}", options['top'])
+        self.stdout.write('Import time by package (ms, own time of its modules):')
+        for ms, package in report['packages']:
+            self.stdout.write(f'  {ms:8.1f}  {package}')
+        self.stdout.write('Slowest imports of the application and URLconf (ms, including what they import):')
+        for ms, module in report['direct']:
+            self.stdout.write(f'  {ms:8.1f}  {module}')
+        name = f"startup_{options['target']}"
+        self.stdout.write(f'{name:<16} {json.dumps(result)}')
+
+        baseline = runner.load_baseline(options['baseline'])
+        if options['update_baseline']:
+            baseline.setdefault('startup', {})[options['target']] = {
+                **result,
+                'settings': settings.SETTINGS_MODULE,
+                'python': platform.python_version(),
+            }
+            runner.save_baseline(options['baseline'], baseline)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        failures = []
+        if result['wall_ms'] > options['budget_ms']:
+            failures.append(f"{name}: wall_ms {result['wall_ms']} over the {options['budget_ms']:g}ms budget")
+        recorded = baseline.get('startup', {}).get(options['target'])
+        if recorded is None:
+            self.stdout.write(self.style.WARNING(f'{name}: no baseline'))
+        else:
+            if recorded.get('settings') != settings.SETTINGS_MODULE:
+                self.stdout.write(self.style.WARNING(
+                    f"Settings {settings.SETTINGS_MODULE} differ from the baseline's {recorded.get('settings')}; "
+                    'run with the production settings for a meaningful comparison'
+                ))
+            failures += [
+                f'{name}: {regression}'
+                for regression in startup.compare(result, recorded, options['tolerance'], options['min_delta_ms'])
+            ]
+        if failures:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
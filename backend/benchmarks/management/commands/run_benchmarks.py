@@ -0,0 +1,105 @@
+import json
+import os
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from search import backends
+from search.cache import search_cache
+
+from ... import runner
+from ...meilisearch_stub import MeilisearchStub
+from ...scenarios import SCENARIOS, Context
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = 'Run API benchmark scenarios against seeded data and compare them with the JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+        parser.add_argument('--requests', type=int, default=500, help='Recorded requests per scenario')
+        parser.add_argument('--warmup', type=int, default=50, help='Unrecorded requests per scenario')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed latency/throughput drift as a fraction of the baseline')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help='Latency drift always allowed, in milliseconds')
+        parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+        parser.add_argument('--search-latency', type=float, default=0.0,
+                            help='Seconds the Meilisearch stand-in waits per search')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        baseline = runner.load_baseline(options['baseline'])
+        try:
+            context = Context(options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        dataset = context.dataset()
+        environment = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'debug': settings.DEBUG,
+            'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+        }
+        results = {}
+        for name in names:
+            results[name] = self.run_scenario(name, context, options)
+            self.stdout.write(f"{name:<16} {json.dumps(results[name])}")
+
+        if options['update_baseline']:
+            baseline['scenarios'].update(results)
+            baseline['dataset'] = dataset
+            baseline['environment'] = environment
+            runner.save_baseline(options['baseline'], baseline)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        if baseline.get('dataset') and baseline['dataset'] != dataset:
+            self.stdout.write(self.style.WARNING(
+                f"Dataset {dataset} differs from the baseline's {baseline['dataset']}; "
+                'reseed with the default sizes for a meaningful comparison'
+            ))
+        serving = {key: environment[key] for key in ('debug', 'conn_max_age')}
+        baseline_serving = {key: baseline.get('environment', {}).get(key) for key in serving}
+        if baseline.get('environment') and baseline_serving != serving:
+            self.stdout.write(self.style.WARNING(
+                f"Settings {serving} differ from the baseline's {baseline_serving}; "
+                'run with the production settings for a meaningful comparison'
+            ))
+
+        failures = []
+        for name, result in results.items():
+            if name not in baseline['scenarios']:
+                self.stdout.write(self.style.WARNING(f'{name}: no baseline'))
+                continue
+            for regression in runner.compare(
+                result, baseline['scenarios'][name], options['tolerance'], options['min_delta_ms'],
+            ):
+                failures.append(f'{name}: {regression}')
+        if failures:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def run_scenario(self, name, context, options):
+        scenario = SCENARIOS[name]
+        if name != 'search':
+            return runner.run(scenario, context, options['requests'], options['warmup'])
+
+        with MeilisearchStub(latency=options['search_latency']) as stub, override_settings(MEILISEARCH_URL=stub.url):
+            backends._search = None  # Rebuilt against the stand-in
+            for index_name in stub.documents:
+                search_cache.invalidate(index_name)
+            try:
+                return runner.run(scenario, context, options['requests'], options['warmup'])
+            finally:
+                backends._search = None
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...data import USERNAME_PREFIX, generate
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a reproducible benchmark dataset; use a dedicated database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--properties', type=int, default=5000)
+        parser.add_argument('--messages', type=int, default=50000, help='Skipped unless the chat app is installed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete a previous benchmark dataset (and everything its users own) first')
+
+    def handle(self, *args, **options):
+        existing = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        if existing.exists():
+            if not options['flush']:
+                raise CommandError('Benchmark data already exists; pass --flush to replace it')
+            existing.delete()
+
+        counts = generate(
+            options['users'], options['products'], options['properties'], options['messages'], options['seed'],
+        )
+        # Fresh planner statistics, so the first run does not measure stale plans.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+        ))
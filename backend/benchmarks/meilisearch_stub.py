@@ -0,0 +1,98 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from search.outbox import get_indexes
+
+
+class MeilisearchStub:
+    """
+    In-process stand-in for the Meilisearch search endpoint, so search
+    scenarios run without a Meilisearch server and with a fixed cost.
+
+    Documents come from the real index mappers. Matching is a plain
+    case-insensitive substring test on ``title`` and the response has the
+    shape the search backend reads. Filters, sorting and facets are
+    ignored, so the numbers measure the API around search, not search
+    relevance. ``latency`` adds a fixed server-side delay per request.
+    """
+    path_pattern = re.compile(r'^/indexes/(?P<index>[^/]+)/search$')
+
+    def __init__(self, latency=0.0, limit=None):
+        self.latency = latency
+        self.documents = {
+            name: [search_index.to_dict(instance) for instance in search_index.queryset()[:limit]]
+            for name, search_index in get_indexes().items()
+        }
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def search(self, index, body):
+        started = time.perf_counter()
+        q = (body.get('q') or '').lower()
+        hits = [document for document in self.documents.get(index, []) if q in document['title'].lower()]
+        attributes = body.get('attributesToRetrieve')
+        if attributes:
+            hits = [{key: hit[key] for key in attributes if key in hit} for hit in hits]
+        response = {'query': q, 'facetDistribution': {facet: {} for facet in body.get('facets') or []}}
+        if 'page' in body or 'hitsPerPage' in body:
+            page, hits_per_page = body.get('page', 1), body.get('hitsPerPage', 20)
+            response.update({
+                'hits': hits[(page - 1) * hits_per_page:page * hits_per_page],
+                'page': page,
+                'hitsPerPage': hits_per_page,
+                'totalHits': len(hits),
+            })
+        else:
+            offset, limit = body.get('offset', 0), body.get('limit', 20)
+            response.update({
+                'hits': hits[offset:offset + limit],
+                'offset': offset,
+                'limit': limit,
+                'estimatedTotalHits': len(hits),
+            })
+        response['processingTimeMs'] = int((time.perf_counter() - started) * 1000)
+        return response
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                match = stub.path_pattern.match(self.path)
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if match:
+                    self.reply(200, stub.search(match['index'], body))
+                else:
+                    self.reply(404, {'message': f'{self.path} is not stubbed', 'code': 'not_found',
+                                     'type': 'invalid_request', 'link': ''})
+
+            def reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
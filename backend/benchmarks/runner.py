@@ -0,0 +1,134 @@
+import json
+import statistics
+import time
+
+from django.db import close_old_connections, connection, reset_queries
+from rest_framework.test import APIClient
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Recorder:
+    """
+    Sends requests through Django's test client, in-process, and records the
+    latency and number of database queries of each one. Going through the
+    full middleware and view stack without a network hop keeps the numbers
+    reproducible across machines with similar CPUs.
+
+    Database connections are handled as by a server (which the test client
+    skips): closed after each request unless CONN_MAX_AGE keeps them. Queries
+    are counted without forcing the debug cursor, so connection setup and the
+    DEBUG query log cost what they cost under the settings in use.
+    """
+
+    def __init__(self):
+        # Any name in ALLOWED_HOSTS; the test client defaults to 'testserver'.
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.latencies = []
+        self.queries = []
+        self.sent = 0
+        self.recording = True
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+
+    def request(self, method, path, data=None, expect=200):
+        # With DEBUG the query log is capped; start each request with an empty one.
+        reset_queries()
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, data, format='json' if method != 'get' else None)
+            close_old_connections()
+            elapsed = time.perf_counter() - started
+        if response.status_code != expect:
+            raise BenchmarkError(f'{method.upper()} {path} returned {response.status_code}: {response.content[:500]!r}')
+        self.sent += 1
+        if self.recording:
+            self.latencies.append(elapsed)
+            self.queries.append(len(queries))
+        return response
+
+    def get(self, path, data=None, **kwargs):
+        return self.request('get', path, data, **kwargs)
+
+    def post(self, path, data=None, **kwargs):
+        return self.request('post', path, data, **kwargs)
+
+    def patch(self, path, data=None, **kwargs):
+        return self.request('patch', path, data, **kwargs)
+
+    def delete(self, path, data=None, **kwargs):
+        return self.request('delete', path, data, **kwargs)
+
+
+def run(scenario, context, requests, warmup):
+    """
+    Repeat ``scenario(recorder, context)`` until ``requests`` requests have
+    been recorded, after ``warmup`` unrecorded ones, and summarize them.
+    """
+    recorder = Recorder()
+    recorder.recording = False
+    while recorder.sent < warmup:
+        scenario(recorder, context)
+    recorder.recording = True
+
+    started = time.perf_counter()
+    while len(recorder.latencies) < requests:
+        scenario(recorder, context)
+    elapsed = time.perf_counter() - started
+    return summarize(recorder.latencies, recorder.queries, elapsed)
+
+
+def summarize(latencies, queries, elapsed):
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'req_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentiles[49] * 1000, 2),
+        'p95_ms': round(percentiles[94] * 1000, 2),
+        'p99_ms': round(percentiles[98] * 1000, 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'max_queries': max(queries),
+    }
+
+
+def compare(result, baseline, tolerance, min_delta_ms=0.0):
+    """
+    Regressions of ``result`` against ``baseline``, as readable strings.
+    Latency and throughput may drift by ``tolerance`` (a fraction) before
+    they count, and latencies also by ``min_delta_ms`` so that jitter on
+    millisecond-scale requests is ignored. Query counts are deterministic
+    and may not grow at all.
+    """
+    regressions = []
+    for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+        if result[metric] > max(baseline[metric] * (1 + tolerance), baseline[metric] + min_delta_ms):
+            regressions.append(f'{metric} {baseline[metric]} -> {result[metric]}')
+    if result['req_per_sec'] < baseline['req_per_sec'] * (1 - tolerance):
+        regressions.append(f"req_per_sec {baseline['req_per_sec']} -> {result['req_per_sec']}")
+    for metric in ('queries_per_request', 'max_queries'):
+        if result[metric] > baseline[metric]:
+            regressions.append(f'{metric} {baseline[metric]} -> {result[metric]}')
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'scenarios': {}}
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,110 @@
+import random
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from product.models import Category, Product
+from property.models import Property
+
+from .data import ADJECTIVES, AREAS, BRANDS, NOUNS, USERNAME_PREFIX
+
+
+class Context:
+    """Seeded rows the scenarios pick from, and a random generator to pick with"""
+
+    def __init__(self, seed=0, sample_size=1000):
+        self.rng = random.Random(seed)
+        self.users = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk'))
+        if not self.users:
+            raise ValueError('No benchmark data; run seed_benchmark_data first')
+        self.product_ids = list(Product.objects.shop().order_by('pk').values_list('pk', flat=True)[:sample_size])
+        self.category = Category.objects.order_by('name').first()
+
+    def dataset(self):
+        """Row counts identifying the dataset a result was measured on"""
+        return {
+            'users': len(self.users),
+            # dashboard_crud and bulk_import leave soft-deleted products behind.
+            'products': Product.objects.filter(deleted=False).count(),
+            'properties': Property.objects.count(),
+        }
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+
+def shop_browse(recorder, context):
+    """Open the shop, page through products and filter rentals"""
+    recorder.login(context.user())
+    recorder.get(reverse('category-list'))
+    url = reverse('shop-products')
+    for _ in range(3):
+        url = recorder.get(url).data['next']
+        if not url:
+            break
+    recorder.get(reverse('shop-properties'), {
+        'sharing': context.rng.randint(1, 4),
+        'min_rent': 4000,
+        'max_rent': context.rng.randrange(6000, 20000, 1000),
+    })
+
+
+def product_detail(recorder, context):
+    """Open a few products from the shop"""
+    recorder.login(context.user())
+    for pk in context.rng.sample(context.product_ids, min(3, len(context.product_ids))):
+        recorder.get(reverse('shop-product-detail', args=[pk]))
+
+
+def dashboard_crud(recorder, context):
+    """List own products, then create, edit and delete one"""
+    recorder.login(context.user())
+    recorder.get(reverse('product-list-create'))
+    product = recorder.post(reverse('product-list-create'), {
+        'title': f'{context.rng.choice(ADJECTIVES).title()} {context.rng.choice(NOUNS)}',
+        'description': 'Benchmark listing',
+        'category': str(context.category.pk),
+        'brand': context.rng.choice(BRANDS),
+        'mrp': '1000.00',
+        'selling_price': '800.00',
+        'images': ['https://img.example.com/bench/0.jpg', 'https://img.example.com/bench/1.jpg'],
+        'extra_features': [{'key': 'colour', 'value': 'red'}],
+    }, expect=201).data
+    detail = reverse('product-detail', args=[product['id']])
+    recorder.patch(detail, {'selling_price': '750.00'})
+    recorder.delete(detail, expect=204)
+
+
+def bulk_import(recorder, context, size=100):
+    """Import a catalog page in one request, reprice it, then remove it"""
+    recorder.login(context.user())
+    url = reverse('product-bulk')
+    ids = recorder.post(url, [
+        {
+            'title': f'{context.rng.choice(ADJECTIVES).title()} {context.rng.choice(NOUNS)}',
+            'description': 'Benchmark import',
+            'category': str(context.category.pk),
+            'brand': context.rng.choice(BRANDS),
+            'mrp': '1000.00',
+            'selling_price': '800.00',
+            'images': [f'https://img.example.com/bench/import/{i}.jpg'],
+        }
+        for i in range(size)
+    ], expect=201).data['ids']
+    recorder.patch(url, [{'id': str(pk), 'selling_price': '750.00'} for pk in ids])
+    recorder.delete(url, {'ids': [str(pk) for pk in ids]})
+
+
+def search(recorder, context):
+    """Search products and rentals; runs against MeilisearchStub"""
+    recorder.login(context.user())
+    recorder.get(reverse('search_products'), {'q': context.rng.choice(NOUNS), 'facets': ['category_name']})
+    recorder.get(reverse('search_properties'), {'q': context.rng.choice(AREAS).split()[0]})
+
+
+SCENARIOS = {
+    'shop_browse': shop_browse,
+    'product_detail': product_detail,
+    'dashboard_crud': dashboard_crud,
+    'bulk_import': bulk_import,
+    'search': search,
+}
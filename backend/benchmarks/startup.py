@@ -0,0 +1,106 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from .runner import BenchmarkError
+
+# What a worker does before it can answer its first request: load the
+# project's application (settings, apps, middleware) and import every view
+# through the URLconf. Prints the milliseconds that took.
+BOOT = '''
+import time
+started = time.perf_counter()
+import backend.{target}
+from django.urls import get_resolver
+get_resolver().url_patterns
+print((time.perf_counter() - started) * 1000)
+'''
+
+
+def boot(target='wsgi', importtime=False):
+    """
+    Start a fresh interpreter booting the project as a ``target`` ('wsgi'
+    or 'asgi') worker under the current settings. Returns the wall-clock
+    milliseconds of the whole process, those of the boot itself and, with
+    ``importtime``, the ``-X importtime`` report.
+    """
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', BOOT.format(target=target)]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+    started = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, env=env, cwd=settings.BASE_DIR)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if process.returncode:
+        raise BenchmarkError(f'Boot failed:\n{process.stderr[-2000:]}')
+    return wall_ms, float(process.stdout.strip().splitlines()[-1]), process.stderr
+
+
+def parse_importtime(report):
+    """``(self_us, cumulative_us, depth, module)`` rows of a ``-X importtime`` report"""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        module = name.strip()
+        rows.append((int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2, module))
+    return rows
+
+
+def profile(rows, entry, top=15):
+    """
+    Import time per top-level package (the sum of its modules' own time)
+    and the slowest imports made directly by loading the ``entry`` module
+    and the URLconf, which pull in everything else; ``top`` of each,
+    slowest first.
+    """
+    packages = {}
+    for self_us, _, _, module in rows:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    # The report lists imports after those they made, so walk it backwards
+    direct = []
+    ancestors = []
+    for _, cumulative_us, depth, module in reversed(rows):
+        del ancestors[depth:]
+        if (depth == 0 and module != entry) or (depth == 1 and ancestors == [entry]):
+            direct.append((cumulative_us / 1000, module))
+        ancestors.append(module)
+    return {
+        'packages': sorted(((us / 1000, package) for package, us in packages.items()), reverse=True)[:top],
+        'direct': sorted(direct, reverse=True)[:top],
+    }
+
+
+def measure(target='wsgi', runs=5):
+    """Median boot times of ``runs`` fresh processes, and the import profile of one more"""
+    timings = [boot(target)[:2] for _ in range(runs)]
+    _, _, report = boot(target, importtime=True)
+    rows = parse_importtime(report)
+    result = {
+        'runs': runs,
+        'wall_ms': round(statistics.median(wall for wall, _ in timings), 1),
+        'boot_ms': round(statistics.median(boot_ms for _, boot_ms in timings), 1),
+        'import_ms': round(sum(cumulative for _, cumulative, depth, _ in rows if depth == 0) / 1000, 1),
+        'modules': len(rows),
+    }
+    return result, rows
+
+
+def compare(result, baseline, tolerance, min_delta_ms=0.0):
+    """
+    Regressions of a startup ``result`` against ``baseline``, as in
+    runner.compare. The number of imported modules is deterministic and
+    may not grow: a new import on the boot path shows up there first.
+    """
+    regressions = []
+    for metric in ('wall_ms', 'boot_ms', 'import_ms'):
+        if result[metric] > max(baseline[metric] * (1 + tolerance), baseline[metric] + min_delta_ms):
+            regressions.append(f'{metric} {baseline[metric]} -> {result[metric]}')
+    if result['modules'] > baseline['modules']:
+        regressions.append(f"modules {baseline['modules']} -> {result['modules']}")
+    return regressions
@@ -0,0 +1,97 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .inbox import group_name, mark_read
+from .models import ChatRoom, Message
+from .serializers import MessageSerializer
+from .writer import writer
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/chat/<room_id>/
+       -> Live messages of a 1-to-1 room; only its two members may connect.
+
+    Client frames:
+      ``{"type": "message", "content": "..."}``
+      ``{"type": "read", "message": "<id>"}``: read up to that message, or
+      everything received so far without ``message``.
+    Server frames: ``{"type": "message", "message": {...}}`` for every message
+    of the room, the sender's own included, ``{"type": "read", "user": <id>,
+    "last_read_at": "..."}`` when a member's read watermark moves, and
+    ``{"type": "error", ...}``.
+
+    Messages fan out through the channel layer group of the room, so members
+    connected to different worker processes see each other, and are written
+    in batches by the process's MessageWriter.
+    """
+
+    async def connect(self):
+        self.user = self.scope['user']
+        self.room_id = self.scope['url_route']['kwargs']['room_id']
+        if not self.user.is_authenticated or not await self.is_member():
+            await self.close(code=4403)
+            return
+        self.group = group_name(self.room_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+            await writer.drain()
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'message':
+            await self.receive_message(content)
+        elif content.get('type') == 'read':
+            await self.receive_read(content)
+        else:
+            await self.send_error('Unknown frame type')
+
+    async def receive_message(self, content):
+        text = content.get('content')
+        max_length = getattr(settings, 'CHAT', {}).get('MAX_MESSAGE_LENGTH', 4000)
+        if not isinstance(text, str) or not text.strip() or len(text) > max_length:
+            await self.send_error(f'content must be a non-empty string of at most {max_length} characters')
+            return
+
+        message = Message(chat_room_id=self.room_id, sender_id=self.user.pk, content=text)
+        writer.add(message)
+        await self.channel_layer.group_send(self.group, {
+            'type': 'chat.message',
+            'message': dict(MessageSerializer(message).data),
+        })
+
+    async def receive_read(self, content):
+        until = None
+        if content.get('message') is not None:
+            # The message may still be waiting in this process's write buffer.
+            until = writer.created_at(self.room_id, content['message']) or await self.message_created_at(content['message'])
+            if until is None:
+                await self.send_error('Unknown message')
+                return
+        await database_sync_to_async(mark_read)(self.room, self.user, until)
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
+
+    async def chat_read(self, event):
+        await self.send_json({'type': 'read', 'user': event['user'], 'last_read_at': event['last_read_at']})
+
+    async def send_error(self, detail):
+        await self.send_json({'type': 'error', 'detail': detail})
+
+    @database_sync_to_async
+    def is_member(self):
+        self.room = ChatRoom.objects.filter(pk=self.room_id).only('user1', 'user2').first()
+        return self.room is not None and self.room.has_member(self.user)
+
+    @database_sync_to_async
+    def message_created_at(self, uid):
+        try:
+            return Message.objects.filter(chat_room_id=self.room_id, uid=uid).values_list('created_at', flat=True).first()
+        except ValidationError:  # Not a UUID
+            return None
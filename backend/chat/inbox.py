@@ -0,0 +1,84 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ChatParticipant, ChatRoom, Message
+
+PREVIEW_LENGTH = ChatRoom._meta.get_field('last_message_preview').max_length
+
+
+def group_name(room_id):
+    """Channel layer group of the sockets connected to a room"""
+    return f'chat_{room_id}'
+
+
+def record_messages(messages):
+    """
+    Fold newly written ``messages`` into the inbox summaries of their rooms:
+    last message time and preview, and the unread count of every member
+    other than the sender. Call in the transaction that writes them.
+
+    Participant rows are locked in a fixed order so that concurrent writers
+    and readers cannot deadlock. Everything only moves forward in time, so
+    batches may land out of order, and a message older than the recipient's
+    read watermark (read while still buffered) is not counted as unread.
+    """
+    by_room = {}
+    for message in messages:
+        by_room.setdefault(message.chat_room_id, []).append(message)
+
+    participants = ChatParticipant.objects.select_for_update().filter(room_id__in=by_room).order_by('room_id', 'user_id')
+    for participant in participants:
+        room_messages = by_room[participant.room_id]
+        unread = sum(
+            1 for message in room_messages
+            if message.sender_id != participant.user_id
+            and (participant.last_read_at is None or message.created_at > participant.last_read_at)
+        )
+        ChatParticipant.objects.filter(pk=participant.pk).update(
+            unread_count=F('unread_count') + unread,
+            last_message_at=Greatest('last_message_at', Value(max(m.created_at for m in room_messages))),
+        )
+
+    for room_id in sorted(by_room):
+        last = max(by_room[room_id], key=lambda message: message.created_at)
+        ChatRoom.objects.filter(
+            Q(last_message_at__isnull=True) | Q(last_message_at__lt=last.created_at), pk=room_id,
+        ).update(last_message_at=last.created_at, last_message_preview=last.content[:PREVIEW_LENGTH])
+
+
+def mark_read(room, user, until=None):
+    """
+    Record that ``user`` has read ``room`` up to the time ``until`` (by
+    default, now): one UPDATE of their watermark and unread count, whatever
+    the number of messages it covers. Watermarks never move back.
+
+    Members of the room are sent one ``read`` receipt once committed.
+    Returns the new watermark, or None if nothing changed.
+    """
+    until = min(until or timezone.now(), timezone.now())
+    with transaction.atomic():
+        participant = ChatParticipant.objects.select_for_update().get(room=room, user=user)
+        if participant.last_read_at is not None and until <= participant.last_read_at:
+            return None
+
+        last_message_at = ChatRoom.objects.values_list('last_message_at', flat=True).get(pk=room.pk)
+        if last_message_at is None or until >= last_message_at:
+            unread = 0
+        else:
+            unread = Message.objects.filter(chat_room=room, created_at__gt=until).exclude(sender=user).count()
+        ChatParticipant.objects.filter(pk=participant.pk).update(last_read_at=until, unread_count=unread)
+
+        transaction.on_commit(lambda: send_receipt(room.pk, user.pk, until))
+    return until
+
+
+def send_receipt(room_id, user_id, until):
+    async_to_sync(get_channel_layer().group_send)(group_name(room_id), {
+        'type': 'chat.read',
+        'user': user_id,
+        'last_read_at': until.isoformat(),
+    })
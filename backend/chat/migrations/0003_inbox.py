@@ -0,0 +1,77 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0002_message_history_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=140),
+        ),
+        migrations.CreateModel(
+            name='ChatParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='chat.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_participations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('last_message_at__isnull', False)), fields=['user', '-last_message_at', '-id'], name='chat_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='chatparticipant',
+            constraint=models.UniqueConstraint(fields=('room', 'user'), name='chat_participant_unique'),
+        ),
+        # Participants and summaries of existing rooms.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO chat_chatparticipant (room_id, user_id, unread_count)
+                SELECT id, user1_id, 0 FROM chat_chatroom
+                UNION ALL
+                SELECT id, user2_id, 0 FROM chat_chatroom;
+
+                UPDATE chat_chatroom r
+                SET last_message_at = m.created_at, last_message_preview = left(m.content, 140)
+                FROM (
+                    SELECT DISTINCT ON (chat_room_id) chat_room_id, created_at, content
+                    FROM chat_message
+                    ORDER BY chat_room_id, created_at DESC, id DESC
+                ) m
+                WHERE m.chat_room_id = r.id;
+
+                UPDATE chat_chatparticipant p
+                SET last_message_at = r.last_message_at
+                FROM chat_chatroom r
+                WHERE r.id = p.room_id;
+
+                UPDATE chat_chatparticipant p
+                SET unread_count = c.unread
+                FROM (
+                    SELECT chat_room_id, sender_id, count(*) AS unread
+                    FROM chat_message
+                    WHERE NOT is_read
+                    GROUP BY chat_room_id, sender_id
+                ) c
+                WHERE c.chat_room_id = p.room_id AND c.sender_id <> p.user_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatparticipant',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Each member has read up to the newest message flagged as read for them.
+        migrations.RunSQL(
+            sql="""
+                UPDATE chat_chatparticipant p
+                SET last_read_at = r.read_until
+                FROM (
+                    SELECT m.chat_room_id, p2.user_id, max(m.created_at) AS read_until
+                    FROM chat_message m
+                    JOIN chat_chatparticipant p2 ON p2.room_id = m.chat_room_id AND p2.user_id <> m.sender_id
+                    WHERE m.is_read
+                    GROUP BY m.chat_room_id, p2.user_id
+                ) r
+                WHERE r.chat_room_id = p.room_id AND r.user_id = p.user_id;
+
+                UPDATE chat_chatparticipant p
+                SET unread_count = (
+                    SELECT count(*) FROM chat_message m
+                    WHERE m.chat_room_id = p.room_id
+                    AND m.sender_id <> p.user_id
+                    AND (p.last_read_at IS NULL OR m.created_at > p.last_read_at)
+                );
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='status',
+        ),
+    ]
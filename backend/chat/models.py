@@ -1,4 +1,7 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class ChatRoom(models.Model):
@@ -8,32 +11,82 @@ class ChatRoom(models.Model):
     user1 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_rooms_as_user1')
     user2 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_rooms_as_user2')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Inbox summary, maintained by chat.inbox as messages are written
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=140, blank=True, default='')
 
     def __str__(self):
         return f"ChatRoom: {self.user1.username} and {self.user2.username}"
 
+    @classmethod
+    @transaction.atomic
+    def get_or_create_between(cls, user, other):
+        """The room of two users; the lower user id is always stored as ``user1``."""
+        user1, user2 = sorted([user, other], key=lambda u: u.pk)
+        room, created = cls.objects.get_or_create(user1=user1, user2=user2)
+        if created:
+            ChatParticipant.objects.bulk_create([
+                ChatParticipant(room=room, user=user1),
+                ChatParticipant(room=room, user=user2),
+            ])
+        return room, created
+
+    def has_member(self, user):
+        return user.pk in (self.user1_id, self.user2_id)
+
     class Meta:
         unique_together = ('user1', 'user2')  # Prevent duplicate rooms between two users
 
 
+class ChatParticipant(models.Model):
+    """
+    One member's side of a room. Holds what differs per member (read
+    watermark, unread count) and a copy of the room's ``last_message_at``,
+    so that a user's inbox is a single index scan instead of a query over
+    both ``user1`` and ``user2`` of ChatRoom.
+
+    Messages carry no read flag: the member has read every message received
+    up to ``last_read_at``.
+    """
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='participants')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_participations')
+    unread_count = models.PositiveIntegerField(default=0)  # Messages from the other member not yet read
+    last_read_at = models.DateTimeField(null=True, blank=True)  # Read watermark
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'user'], name='chat_participant_unique'),
+        ]
+        indexes = [
+            # Serves the inbox (InboxView), most recent conversation first.
+            models.Index(
+                fields=['user', '-last_message_at', '-id'],
+                name='chat_inbox_idx',
+                condition=models.Q(last_message_at__isnull=False),
+            ),
+        ]
+
+
 class Message(models.Model):
     """
     Represents a single message within a chat room.
     """
+    # Assigned when the message is received, before it is written, so clients can
+    # reference messages that are still waiting in the write buffer.
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     chat_room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()  # Message content
-    is_read = models.BooleanField(default=False)  # Read receipt
-    created_at = models.DateTimeField(auto_now_add=True)  # When the message was created
+    created_at = models.DateTimeField(default=timezone.now)  # When the message was received
     updated_at = models.DateTimeField(auto_now=True)  # When the message was last updated
-    status = models.CharField(
-        max_length=10,
-        choices=[('sent', 'Sent'), ('read', 'Read')],
-        default='sent'
-    )  # Status of the message
 
     def __str__(self):
         return f"Message from {self.sender.username} in ChatRoom {self.chat_room.id}"
 
     class Meta:
-        ordering = ['created_at']  # Messages ordered by creation time
+        ordering = ['created_at', 'id']  # Messages ordered by creation time
+        indexes = [
+            # Serves the keyset-paginated history of a room (MessageHistoryView).
+            models.Index(fields=['chat_room', '-created_at', '-id'], name='chat_message_history_idx'),
+        ]
@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from rest_framework import serializers
+
+from .models import ChatParticipant, ChatRoom, Message
+
+
+class ChatRoomSerializer(serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), write_only=True,
+                                              help_text='The other member of the room')
+    other_user = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChatRoom
+        fields = ['id', 'user', 'other_user', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def get_other_user(self, room):
+        other = room.user2 if room.user1_id == self.context['request'].user.pk else room.user1
+        return {'id': other.pk, 'username': other.username}
+
+    def validate_user(self, user):
+        if user == self.context['request'].user:
+            raise serializers.ValidationError('You cannot chat with yourself.')
+        return user
+
+
+class MessageSerializer(serializers.ModelSerializer):
+    """
+    Compact message payload, shared by the history API and the WebSocket.
+
+    ``status`` is ``read`` once the recipient's watermark has passed the
+    message; pass the watermarks of the room as ``{user id: last_read_at}``
+    in the ``read_until`` context.
+    """
+    id = serializers.UUIDField(source='uid', read_only=True)
+    room = serializers.IntegerField(source='chat_room_id', read_only=True)
+    sender = serializers.IntegerField(source='sender_id', read_only=True)
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Message
+        fields = ['id', 'room', 'sender', 'content', 'status', 'created_at']
+
+    def get_status(self, message):
+        for user_id, last_read_at in self.context.get('read_until', {}).items():
+            if user_id != message.sender_id and last_read_at is not None and message.created_at <= last_read_at:
+                return 'read'
+        return 'sent'
+
+
+class InboxSerializer(serializers.ModelSerializer):
+    """One conversation of the inbox, from the current user's ChatParticipant row."""
+    room = serializers.IntegerField(source='room_id', read_only=True)
+    other_user = serializers.SerializerMethodField()
+    last_message_preview = serializers.CharField(source='room.last_message_preview', read_only=True)
+
+    class Meta:
+        model = ChatParticipant
+        fields = ['room', 'other_user', 'last_message_at', 'last_message_preview', 'unread_count', 'last_read_at']
+
+    def get_other_user(self, participant):
+        room = participant.room
+        other = room.user2 if room.user1_id == participant.user_id else room.user1
+        return {'id': other.pk, 'username': other.username}
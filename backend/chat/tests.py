@@ -1,3 +1,211 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .inbox import mark_read
+from .models import ChatParticipant, ChatRoom, Message
+from .writer import MessageWriter, write
+
+
+class ChatRoomMixin:
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'password')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'password')
+        self.room, _ = ChatRoom.get_or_create_between(self.alice, self.bob)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def message(self, content, sender=None, **kwargs):
+        return Message(chat_room_id=self.room.pk, sender_id=(sender or self.alice).pk, content=content, **kwargs)
+
+    def at(self, minutes, content, sender=None):
+        """A message received ``minutes`` after the start of the test's conversation"""
+        return self.message(content, sender, created_at=self.start + timedelta(minutes=minutes))
+
+    def unread(self, user):
+        return ChatParticipant.objects.get(room=self.room, user=user).unread_count
+
+
+class MessageWriterTestCase(ChatRoomMixin, TransactionTestCase):
+    """
+    The writer runs its writes in database_sync_to_async, which closes the
+    connection of a test case transaction, hence a TransactionTestCase.
+    """
+
+    def send(self, writer, messages):
+        async def receive():
+            for message in messages:
+                writer.add(message)
+            await writer.task
+        async_to_sync(receive)()
+
+    def test_full_batch_is_written_at_once(self):
+        writer = MessageWriter(interval=60, batch_size=2)
+        self.send(writer, [self.message('Hi'), self.message('Still there?')])
+        self.assertEqual(list(Message.objects.values_list('content', flat=True)), ['Hi', 'Still there?'])
+        self.assertEqual(writer.pending, [])
+        self.assertEqual(self.unread(self.bob), 2)
+
+    def test_buffered_messages_are_found_until_written(self):
+        writer = MessageWriter(interval=60, batch_size=10)
+        message = self.message('Hi')
+
+        async def receive():
+            writer.add(message)
+            self.assertEqual(writer.created_at(self.room.pk, str(message.uid)), message.created_at)
+            await writer.drain()
+            self.assertIsNone(writer.created_at(self.room.pk, str(message.uid)))
+        async_to_sync(receive)()
+        self.assertTrue(Message.objects.filter(uid=message.uid).exists())
+
+    def test_failing_message_is_dropped_after_retries(self):
+        writer = MessageWriter(interval=0, batch_size=10)
+        invalid = self.message(None)  # Fails the NOT NULL constraint, and the whole batch with it
+        with self.assertLogs('chat.writer') as logs:
+            self.send(writer, [self.message('Hi'), invalid, self.message('Still there?')])
+
+        self.assertEqual(writer.retries, 3)
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'WARNING', 'ERROR', 'ERROR'])
+        self.assertIn(str(invalid.uid), logs.records[-1].getMessage())
+        # The messages behind the invalid one are written all the same
+        self.assertEqual(list(Message.objects.values_list('content', flat=True)), ['Hi', 'Still there?'])
+        self.assertEqual(writer.pending, [])
+        self.assertEqual(writer.failures, 0)
+        self.assertEqual(self.unread(self.bob), 2)
+
+
+class MessageHistoryTestCase(ChatRoomMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+        self.url = reverse('chat-message-history', args=[self.room.pk])
+
+    def pages(self, url):
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            yield [message['content'] for message in response.data['results']]
+            url = response.data['next']
+
+    def test_pages_back_in_time(self):
+        write([self.at(minute, f'm{minute}') for minute in range(5)])
+        self.assertEqual(list(self.pages(f'{self.url}?page_size=2')), [['m4', 'm3'], ['m2', 'm1'], ['m0']])
+
+    def test_messages_written_late_keep_their_place(self):
+        # Messages are stamped when received and written when their buffer
+        # flushes: a page may be read in between.
+        write([self.at(0, 'm0'), self.at(1, 'm1'), self.at(3, 'm3'), self.at(4, 'm4')])
+        buffered = [self.at(2, 'm2'), self.at(5, 'm5')]
+
+        pages = self.pages(f'{self.url}?page_size=2')
+        self.assertEqual(next(pages), ['m4', 'm3'])
+        write(buffered)
+        # Older ones show up in the following pages, newer ones on a refresh,
+        # and no message is repeated or skipped.
+        self.assertEqual(list(pages), [['m2', 'm1'], ['m0']])
+        self.assertEqual(next(self.pages(f'{self.url}?page_size=2')), ['m5', 'm4'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_other_rooms_are_hidden(self):
+        carol = User.objects.create_user('carol', 'carol@example.com', 'password')
+        self.client.force_authenticate(carol)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class InboxTestCase(ChatRoomMixin, TestCase):
+    def test_unread_counts_follow_written_messages(self):
+        write([self.at(0, 'Hi'), self.at(1, 'Hello', self.bob)])
+        write([self.at(2, 'Is the lamp still available?')])
+        self.assertEqual(self.unread(self.bob), 2)
+        self.assertEqual(self.unread(self.alice), 1)
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message_at, self.start + timedelta(minutes=2))
+        self.assertEqual(self.room.last_message_preview, 'Is the lamp still available?')
+
+    def test_late_batch_does_not_move_the_summary_back(self):
+        write([self.at(2, 'Is the lamp still available?')])
+        write([self.at(1, 'Hi')])  # Flushed late by another process
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message_preview, 'Is the lamp still available?')
+        self.assertEqual(self.unread(self.bob), 2)
+
+    def test_mark_read_recounts_unread(self):
+        write([self.at(minute, f'm{minute}') for minute in range(4)])
+        mark_read(self.room, self.bob, self.start + timedelta(minutes=1))
+        self.assertEqual(self.unread(self.bob), 2)
+        mark_read(self.room, self.bob)
+        self.assertEqual(self.unread(self.bob), 0)
+        write([self.message('One more')])
+        self.assertEqual(self.unread(self.bob), 1)
+
+    def test_inbox(self):
+        carol = User.objects.create_user('carol', 'carol@example.com', 'password')
+        ChatRoom.get_or_create_between(self.bob, carol)  # No messages: not listed
+        write([self.at(0, 'Hi'), self.at(1, 'Is the lamp still available?')])
+
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        response = client.get(reverse('chat-inbox'))
+        self.assertEqual(response.status_code, 200)
+        [conversation] = response.data['results']
+        self.assertEqual(conversation['room'], self.room.pk)
+        self.assertEqual(conversation['other_user'], {'id': self.alice.pk, 'username': 'alice'})
+        self.assertEqual(conversation['last_message_preview'], 'Is the lamp still available?')
+        self.assertEqual(conversation['unread_count'], 2)
+
+
+class MarkReadTestCase(ChatRoomMixin, TestCase):
+    def participant(self, user):
+        return ChatParticipant.objects.get(room=self.room, user=user)
+
+    def test_watermark_never_moves_back(self):
+        write([self.at(minute, f'm{minute}') for minute in range(4)])
+        later, earlier = self.start + timedelta(minutes=2), self.start + timedelta(minutes=1)
+        self.assertEqual(mark_read(self.room, self.bob, later), later)
+
+        with self.captureOnCommitCallbacks() as receipts:
+            self.assertIsNone(mark_read(self.room, self.bob, earlier))
+            self.assertIsNone(mark_read(self.room, self.bob, later))
+        self.assertEqual(receipts, [])  # Nothing changed, nobody is told
+        participant = self.participant(self.bob)
+        self.assertEqual(participant.last_read_at, later)
+        self.assertEqual(participant.unread_count, 1)
+
+    def test_watermark_is_capped_at_now(self):
+        until = mark_read(self.room, self.bob, timezone.now() + timedelta(days=1))
+        self.assertLessEqual(until, timezone.now())
+
+    def test_one_receipt_per_read(self):
+        write([self.at(minute, f'm{minute}') for minute in range(50)])
+        with self.captureOnCommitCallbacks() as receipts:
+            mark_read(self.room, self.bob)
+        self.assertEqual(len(receipts), 1)
+        self.assertEqual(self.participant(self.bob).unread_count, 0)
+
+    def test_message_read_while_buffered_is_not_unread(self):
+        buffered = self.at(1, 'Hi')
+        mark_read(self.room, self.bob, buffered.created_at)  # Read from the socket before its batch is written
+        write([buffered, self.at(2, 'Still there?')])
+        self.assertEqual(self.participant(self.bob).unread_count, 1)
+
+    def test_mark_read_endpoint(self):
+        write([self.at(minute, f'm{minute}') for minute in range(3)])
+        first = Message.objects.get(content='m0')
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        url = reverse('chat-room-read', args=[self.room.pk])
+
+        self.assertEqual(client.post(url, {'message': str(first.uid)}, format='json').status_code, 204)
+        self.assertEqual(self.participant(self.bob).last_read_at, first.created_at)
+        self.assertEqual(self.participant(self.bob).unread_count, 2)
+        self.assertEqual(client.post(url, {'message': 'not-a-uuid'}, format='json').status_code, 404)
+        self.assertEqual(client.post(url).status_code, 204)
+        self.assertEqual(self.participant(self.bob).unread_count, 0)
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import ChatRoomListCreateView, InboxView, MarkRoomReadView, MessageHistoryView
+
+urlpatterns = [
+    path('chat/rooms/', ChatRoomListCreateView.as_view(), name='chat-room-list-create'),
+    path('chat/rooms/<int:pk>/messages/', MessageHistoryView.as_view(), name='chat-message-history'),
+    path('chat/rooms/<int:pk>/read/', MarkRoomReadView.as_view(), name='chat-room-read'),
+    path('chat/inbox/', InboxView.as_view(), name='chat-inbox'),
+]
@@ -1,3 +1,115 @@
-from django.shortcuts import render
+from backend.pagination import KeysetPagination
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 
-# Create your views here.
+from . import inbox
+from .models import ChatParticipant, ChatRoom, Message
+from .serializers import ChatRoomSerializer, InboxSerializer, MessageSerializer
+
+
+class MessageHistoryPagination(KeysetPagination):
+    page_size = 50
+    max_page_size = 200
+
+
+class InboxPagination(KeysetPagination):
+    ordering = ('-last_message_at', '-id')
+
+
+class ChatRoomListCreateView(generics.ListCreateAPIView):
+    """
+    GET /chat/rooms/
+       -> List the current user's chat rooms.
+    POST /chat/rooms/ {"user": <id>}
+       -> Open the room with another user, creating it on first contact.
+          Messages are then exchanged over ws/chat/<room id>/.
+    """
+    serializer_class = ChatRoomSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        return ChatRoom.objects.filter(Q(user1=user) | Q(user2=user)).select_related('user1', 'user2')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        room, created = ChatRoom.get_or_create_between(request.user, serializer.validated_data['user'])
+        return Response(
+            self.get_serializer(room).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class MessageHistoryView(generics.ListAPIView):
+    """
+    GET /chat/rooms/<int:pk>/messages/
+       -> Messages of one of the current user's rooms, newest first, cursor
+          paginated (?cursor=...&page_size=...). Follow ``next`` to page
+          back in time; live messages arrive over ws/chat/<pk>/.
+    """
+    serializer_class = MessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageHistoryPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        self.room = get_object_or_404(ChatRoom.objects.filter(Q(user1=user) | Q(user2=user)), pk=self.kwargs['pk'])
+        return Message.objects.filter(chat_room=self.room).only(
+            'id', 'uid', 'chat_room', 'sender', 'content', 'created_at',
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self, 'room'):
+            # Read status of the page, from the members' watermarks
+            context['read_until'] = dict(self.room.participants.values_list('user_id', 'last_read_at'))
+        return context
+
+
+class InboxView(generics.ListAPIView):
+    """
+    GET /chat/inbox/
+       -> The current user's conversations, most recent first, with the
+          last message preview and the unread count of each. Cursor
+          paginated (?cursor=...&page_size=...). Rooms without messages
+          are left out.
+    """
+    serializer_class = InboxSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InboxPagination
+
+    def get_queryset(self):
+        return ChatParticipant.objects.filter(
+            user=self.request.user, last_message_at__isnull=False,
+        ).select_related('room__user1', 'room__user2').only(
+            'id', 'room', 'user', 'unread_count', 'last_read_at', 'last_message_at',
+            'room__user1__username', 'room__user2__username', 'room__last_message_preview',
+        )
+
+
+class MarkRoomReadView(generics.GenericAPIView):
+    """
+    POST /chat/rooms/<int:pk>/read/
+       -> Move the current user's read watermark of the room up to a message
+          ({"message": "<id>"}), or to every message received so far when
+          the body is empty, and recompute the room's unread count. The
+          other member gets a ``read`` receipt over ws/chat/<pk>/.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        user = request.user
+        room = get_object_or_404(ChatRoom.objects.filter(Q(user1=user) | Q(user2=user)), pk=pk)
+        until = None
+        if request.data.get('message') is not None:
+            try:
+                until = Message.objects.values_list('created_at', flat=True).get(chat_room=room, uid=request.data['message'])
+            except (Message.DoesNotExist, ValidationError):
+                raise NotFound('Message not found.')
+        inbox.mark_read(room, user, until)
+        return Response(status=status.HTTP_204_NO_CONTENT)
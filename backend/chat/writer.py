@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import math
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .inbox import record_messages
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """
+    Buffers received messages and writes them with one ``bulk_create`` per
+    batch instead of one INSERT per message.
+
+    A batch is written ``FLUSH_INTERVAL`` seconds after its first message, or
+    as soon as ``FLUSH_BATCH_SIZE`` messages are pending. Messages are
+    delivered to sockets before they are written, so a process crash can lose
+    at most one interval's worth of them; sockets flush on disconnect, which
+    covers graceful shutdowns. Message uids are unique, so retrying a failed
+    batch never duplicates rows. A batch failing ``FLUSH_RETRIES`` times in a
+    row is written one message at a time instead, and the messages that
+    still fail are logged and dropped, so that one bad row cannot hold up
+    the messages behind it.
+
+    One writer serves every socket of a process, on that process's event loop.
+    """
+
+    def __init__(self, interval=None, batch_size=None):
+        options = getattr(settings, 'CHAT', {})
+        self.interval = interval if interval is not None else options.get('FLUSH_INTERVAL', 0.2)
+        self.batch_size = batch_size or options.get('FLUSH_BATCH_SIZE', 200)
+        self.retries = options.get('FLUSH_RETRIES', 3)
+        self.failures = 0  # Consecutive failed writes of the batch at the head of pending
+        self.pending = []
+        self.task = None
+        self.full = None
+
+    def add(self, message):
+        self.pending.append(message)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.full = asyncio.Event()
+            self.task = loop.create_task(self.run())
+        if len(self.pending) >= self.batch_size:
+            self.full.set()
+
+    async def run(self):
+        while self.pending:
+            try:
+                await asyncio.wait_for(self.full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.full.clear()
+            await self.flush()
+
+    async def flush(self):
+        batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+        if not batch:
+            return
+        try:
+            await database_sync_to_async(write)(batch)
+        except Exception as e:
+            self.failures += 1
+            if self.failures < self.retries:
+                logger.warning("Writing %d chat messages failed, retrying: %r", len(batch), e)
+                self.pending[:0] = batch
+                await asyncio.sleep(self.interval * 2 ** (self.failures - 1))
+                return
+            logger.error(
+                "Writing %d chat messages failed %d times, writing them one by one: %r",
+                len(batch), self.failures, e,
+            )
+            await database_sync_to_async(write_each)(batch)
+        self.failures = 0
+
+    def created_at(self, room_id, uid):
+        """Receive time of a message of ``room_id`` still waiting to be written"""
+        for message in self.pending:
+            if message.chat_room_id == room_id and str(message.uid) == str(uid):
+                return message.created_at
+        return None
+
+    async def drain(self):
+        """Write everything pending now, trying each batch once"""
+        for _ in range(math.ceil(len(self.pending) / self.batch_size)):
+            await self.flush()
+
+
+@transaction.atomic
+def write(messages):
+    Message.objects.bulk_create(messages, ignore_conflicts=True)
+    record_messages(messages)
+
+
+def write_each(messages):
+    """Write ``messages`` one per transaction, dropping those that fail"""
+    for message in messages:
+        try:
+            write([message])
+        except Exception:
+            logger.exception("Dropping chat message %s of room %s", message.uid, message.chat_room_id)
+
+
+writer = MessageWriter()
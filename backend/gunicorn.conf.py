@@ -0,0 +1,25 @@
+"""
+gunicorn settings for serving the HTTP API over WSGI in production:
+
+    DJANGO_SETTINGS_MODULE=backend.settings.production gunicorn backend.wsgi:application
+
+Threaded workers keep one persistent database connection per thread, so a
+process holds at most ``threads`` connections. Size WEB_CONCURRENCY *
+GUNICORN_THREADS under the database's max_connections, or put pgbouncer in
+front of it (see backend/settings/production.py).
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then, staggered, to bound slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,48 @@
+from backend.catalog import Catalog
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+
+from .models import Product, ProductImage
+from .serializers import ProductSerializer
+
+
+class ProductImportSerializer(ProductSerializer):
+    owner = None  # Given to the whole import, not read from the rows
+
+    class Meta(ProductSerializer.Meta):
+        exclude = ProductSerializer.Meta.exclude + ['owner']
+
+
+class ProductCatalog(Catalog):
+    name = 'products'
+    serializer_class = ProductImportSerializer
+    columns = {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'owner': 'owner__username',
+        'category': 'category_id',
+        'brand': 'brand',
+        'quantity': 'quantity',
+        'mrp': 'mrp',
+        'selling_price': 'selling_price',
+        'is_ad': 'is_ad',
+        'is_active': 'is_active',
+        'is_sold': 'is_sold',
+        'deleted': 'deleted',
+        'extra_features': 'extra_features',
+        'images': 'image_urls',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    json_columns = ('extra_features', 'images')
+
+    def queryset(self):
+        return Product.objects.annotate(
+            image_urls=ArraySubquery(
+                ProductImage.objects.filter(product=OuterRef('pk')).order_by('position').values('url'),
+            ),
+        ).order_by('pk')
+
+
+product_catalog = ProductCatalog()
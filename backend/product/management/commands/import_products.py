@@ -0,0 +1,8 @@
+from backend.catalog import CatalogImportCommand
+
+from ...catalog import product_catalog
+
+
+class Command(CatalogImportCommand):
+    help = 'Import products from a CSV or JSON Lines file, validated and written in batches'
+    catalog = product_catalog
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('deleted', False), ('is_active', True), ('is_sold', False)), fields=['-created_at', '-id'], name='product_shop_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_images(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    ProductImage = apps.get_model('product', 'ProductImage')
+    batch = []
+    for product_id, images in Product.objects.exclude(legacy_images__isnull=True).values_list('id', 'legacy_images').iterator():
+        urls = [url.strip() for url in images.split(',') if url.strip()]
+        batch.extend(
+            ProductImage(product_id=product_id, url=url, position=position, is_primary=position == 0)
+            for position, url in enumerate(urls)
+        )
+        if len(batch) >= 1000:
+            ProductImage.objects.bulk_create(batch)
+            batch = []
+    ProductImage.objects.bulk_create(batch)
+
+
+def join_images(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    ProductImage = apps.get_model('product', 'ProductImage')
+    images = {}
+    for product_id, url in ProductImage.objects.order_by('product_id', 'position').values_list('product_id', 'url'):
+        images.setdefault(product_id, []).append(url)
+    for product_id, urls in images.items():
+        Product.objects.filter(pk=product_id).update(legacy_images=','.join(urls))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0002_product_product_shop_feed_idx'),
+    ]
+
+    operations = [
+        # Move the old column out of the way of the new reverse accessor.
+        migrations.RenameField(
+            model_name='product',
+            old_name='images',
+            new_name='legacy_images',
+        ),
+        migrations.CreateModel(
+            name='ProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2048)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('is_primary', models.BooleanField(default=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='product.product')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['product', 'position'], name='product_image_order_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('product',), name='product_image_single_primary'),
+        ),
+        migrations.RunPython(split_images, join_images),
+        migrations.RemoveField(
+            model_name='product',
+            name='legacy_images',
+        ),
+    ]
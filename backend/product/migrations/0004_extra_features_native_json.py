@@ -0,0 +1,32 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:08
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_productimage'),
+    ]
+
+    operations = [
+        # Rows written before this migration hold a JSON *string* containing
+        # the encoded list; decode them in place into native JSON arrays.
+        migrations.RunSQL(
+            sql="""
+                UPDATE product_product
+                SET extra_features = (extra_features #>> '{}')::jsonb
+                WHERE jsonb_typeof(extra_features) = 'string'
+            """,
+            reverse_sql="""
+                UPDATE product_product
+                SET extra_features = to_jsonb(extra_features::text)
+                WHERE jsonb_typeof(extra_features) = 'array'
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['extra_features'], name='product_features_gin_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_extra_features_native_json'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION product_product_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                    setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(NEW.brand, '')), 'B') ||
+                    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER product_product_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF title, brand, description ON product_product
+                FOR EACH ROW EXECUTE FUNCTION product_product_search_vector_update();
+
+                -- Backfill existing rows through the trigger.
+                UPDATE product_product SET title = title;
+            """,
+            reverse_sql="""
+                DROP TRIGGER product_product_search_vector_trigger ON product_product;
+                DROP FUNCTION product_product_search_vector_update();
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='product_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['owner', '-created_at'], name='product_owner_dashboard_idx'),
+        ),
+    ]
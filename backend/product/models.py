@@ -1,6 +1,11 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .signals import products_bulk_saved
 
 class Category(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Use UUID as primary key
@@ -12,6 +17,64 @@ class Category(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def shop(self):
+        """Products visible in the public shop."""
+        return self.filter(deleted=False, is_active=True, is_sold=False)
+
+    def owned_by(self, user):
+        """Non-deleted products of a single owner (customer dashboard)."""
+        return self.filter(owner=user, deleted=False)
+
+    def soft_delete(self):
+        """Soft-delete every product of the queryset with one UPDATE; returns their ids."""
+        ids = list(self.filter(deleted=False).values_list('pk', flat=True))
+        if ids:
+            self.model.objects.filter(pk__in=ids).update(deleted=True, updated_at=timezone.now())
+            products_bulk_saved.send(sender=self.model, ids=ids)
+        return ids
+
+    def with_images(self):
+        """Prefetch every image of each product, in display order."""
+        return self.prefetch_related(
+            models.Prefetch('images', queryset=ProductImage.objects.only('product', 'url', 'position')),
+        )
+
+    def with_thumbnail(self):
+        """Prefetch only the primary image URL of each product into ``thumbnails``."""
+        return self.prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=ProductImage.objects.filter(is_primary=True).only('product', 'url'),
+                to_attr='thumbnails',
+            ),
+        )
+
+    def with_features(self, features):
+        """
+        Products having every ``{key: value}`` pair in ``features`` among their
+        extra features. Uses JSONB containment so the GIN index applies.
+        """
+        if not features:
+            return self
+        return self.filter(extra_features__contains=[
+            {'key': key, 'value': value} for key, value in features.items()
+        ])
+
+    def for_serializer(self):
+        """
+        Join the relations ProductSerializer reads and load only the columns
+        it renders, so a list costs one query regardless of its length
+        (plus one per image prefetch).
+        """
+        product_fields = [
+            field.name for field in self.model._meta.concrete_fields if field.name != 'search_vector'
+        ]
+        return self.select_related('category', 'owner').only(
+            *product_fields, 'category__name', 'owner__username',
+        )
+
+
 class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Use UUID as primary key
     title = models.CharField(max_length=255)
@@ -19,17 +82,76 @@ class Product(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='products')
     brand = models.CharField(max_length=25)
-    images = models.TextField(blank=True, null=True)  # Store image URLs as a comma-separated string
     quantity = models.PositiveIntegerField(default=0)
     mrp = models.DecimalField(max_digits=10, decimal_places=2)  # Maximum Retail Price
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)  # Selling Price
     is_ad = models.BooleanField(default=False)  # Field to identify if the product is an ad
-    extra_features = models.JSONField(blank=True, null=True)  # Store custom features as a JSON string
+    extra_features = models.JSONField(blank=True, null=True)  # List of {"key": ..., "value": ...} objects
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_sold = models.BooleanField(default=False)
     is_active = models.BooleanField(default=False)
     deleted = models.BooleanField(default=False)
+    # Weighted title/brand/description tsvector, maintained by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated shop feed (ShopProductsView).
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='product_shop_feed_idx',
+                condition=models.Q(deleted=False, is_active=True, is_sold=False),
+            ),
+            # Serves the owner dashboard (ProductListCreateView), newest first.
+            models.Index(
+                fields=['owner', '-created_at'],
+                name='product_owner_dashboard_idx',
+                condition=models.Q(deleted=False),
+            ),
+            # Serves ``extra_features @> [...]`` containment filters.
+            GinIndex(
+                fields=['extra_features'],
+                name='product_features_gin_idx',
+                opclasses=['jsonb_path_ops'],
+            ),
+            # Full-text and typo-tolerant matching for PostgresSearchBackend.
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['title'], name='product_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
+
+    def set_images(self, urls):
+        """Replace the product's images; the first URL becomes the primary one."""
+        self.images.all().delete()
+        ProductImage.objects.bulk_create(
+            ProductImage(product=self, url=url, position=position, is_primary=position == 0)
+            for position, url in enumerate(urls)
+        )
+
+
+class ProductImage(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
+    url = models.URLField(max_length=2048)
+    position = models.PositiveSmallIntegerField(default=0)  # Display order, 0 first
+    is_primary = models.BooleanField(default=False)  # Thumbnail shown in listings
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['product', 'position'], name='product_image_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=models.Q(is_primary=True),
+                name='product_image_single_primary',
+            ),
+        ]
+
+    def __str__(self):
+        return self.url
@@ -0,0 +1,25 @@
+from backend.cache import shop_cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Product
+from .signals import products_bulk_saved
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(products_bulk_saved, sender=Product)
+def invalidate_shop_products(sender, **kwargs):
+    """Drop the cached shop pages once the change is committed."""
+    transaction.on_commit(lambda: shop_cache.invalidate('shop-products'))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    """Drop the cached category list, and the shop pages showing category names."""
+    def invalidate():
+        shop_cache.invalidate('categories')
+        shop_cache.invalidate('shop-products')
+    transaction.on_commit(invalidate)
@@ -1,7 +1,11 @@
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Category, Product
+from .models import Category, Product, ProductImage
+from .signals import products_bulk_saved
 from django.contrib.auth.models import User
-import json
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -19,6 +23,111 @@ class ExtraFeatureSerializer(serializers.Serializer):
     value = serializers.CharField()
     ref_name = "ProductExtraFeature"
 
+MAX_BULK_ITEMS = 1000  # Products per bulk request
+
+
+class ProductBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_BULK_ITEMS)
+
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """Category by id, looked up in the categories a bulk list preloaded if any."""
+
+    def to_internal_value(self, data):
+        categories = getattr(self.root, 'categories', None)
+        if categories is None:
+            return super().to_internal_value(data)
+        try:
+            return categories[uuid.UUID(str(data))]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ProductListSerializer(serializers.ListSerializer):
+    """
+    Bulk writes for ``ProductSerializer(many=True)``: the products of the list
+    are written with one ``bulk_create``/``bulk_update`` and their images with
+    one more insert, in a single transaction.
+
+    For updates, pass the products that may be changed as ``instance``; each
+    item names its product with ``id``. Errors are reported per item, in list
+    order. Bulk queries send no ``post_save``, so ``products_bulk_saved`` is
+    sent once for the whole list instead.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(uuid.UUID(str(item['category'])))
+                except (TypeError, ValueError, KeyError):
+                    pass
+            self.categories = Category.objects.in_bulk(ids)
+            if self.instance is not None:
+                self.products = {product.pk: product for product in self.instance}
+                self.seen = set()
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        try:
+            product = self.products[uuid.UUID(str(data['id']))]
+        except (TypeError, ValueError, KeyError):
+            raise serializers.ValidationError({'id': ['No such product.']})
+        if product.pk in self.seen:
+            raise serializers.ValidationError({'id': ['Product listed more than once.']})
+        self.seen.add(product.pk)
+        self.child.instance = product
+        validated = super().run_child_validation(data)
+        validated['id'] = product.pk
+        return validated
+
+    @transaction.atomic
+    def create(self, validated_data):
+        images = [item.pop('images', None) for item in validated_data]
+        products = Product.objects.bulk_create(Product(**item) for item in validated_data)
+        self.save_images(zip(products, images))
+        products_bulk_saved.send(sender=Product, ids=[product.pk for product in products])
+        return products
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        products = {product.pk: product for product in instance}
+        fields = {'updated_at'}
+        changed = []
+        images = []
+        now = timezone.now()
+        for item in validated_data:
+            product = products[item.pop('id')]
+            images.append((product, item.pop('images', None)))
+            for field, value in item.items():
+                setattr(product, field, value)
+            fields.update(item)
+            product.updated_at = now
+            changed.append(product)
+        Product.objects.bulk_update(changed, sorted(fields))
+        self.save_images(images)
+        products_bulk_saved.send(sender=Product, ids=[product.pk for product in changed])
+        return changed
+
+    @staticmethod
+    def save_images(products_images):
+        """Replace the images of the products given a list of URLs, like ``Product.set_images``."""
+        products_images = [(product, urls) for product, urls in products_images if urls is not None]
+        if not products_images:
+            return
+        ProductImage.objects.filter(product__in=[product for product, _ in products_images]).delete()
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, url=url, position=position, is_primary=position == 0)
+            for product, urls in products_images
+            for position, url in enumerate(urls)
+        )
+
+
 class ProductSerializer(serializers.ModelSerializer):
     owner = serializers.PrimaryKeyRelatedField(read_only=True, default=serializers.CurrentUserDefault())
     images = serializers.ListField(
@@ -33,15 +142,16 @@ class ProductSerializer(serializers.ModelSerializer):
         allow_empty=True,
         write_only=True
     )
-    category = serializers.PrimaryKeyRelatedField(
+    category = CategoryField(
         queryset=Category.objects.all(),
         write_only=True
     )
 
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['created_at', 'updated_at']
+        list_serializer_class = ProductListSerializer
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -53,35 +163,30 @@ class ProductSerializer(serializers.ModelSerializer):
         if instance.owner:
                     representation['owner'] = instance.owner.username  # Return category name instead of ID
 
-        # Convert comma-separated images string to an array
-        representation['images'] = instance.images.split(',') if instance.images else []
+        thumbnails = getattr(instance, 'thumbnails', None)
+        if thumbnails is not None:
+            # Listing querysets prefetch only the primary image
+            representation['thumbnail'] = thumbnails[0].url if thumbnails else None
+        else:
+            representation['images'] = [image.url for image in instance.images.all()]
+            representation['thumbnail'] = representation['images'][0] if representation['images'] else None
 
-        # Deserialize extra_features JSON string to a list of objects
-        representation['extra_features'] = json.loads(instance.extra_features) if instance.extra_features else []
+        representation['extra_features'] = instance.extra_features or []
 
         return representation
 
     def create(self, validated_data):
         images = validated_data.pop('images', None)
-        if images:
-            validated_data['images'] = ','.join(images)
-
-        # Serialize extra_features list of objects to JSON string
-        extra_features = validated_data.pop('extra_features', None)
-        if extra_features is not None:
-            validated_data['extra_features'] = json.dumps(extra_features)
 
         validated_data['owner'] = self.context['request'].user
-        return super().create(validated_data)
+        instance = super().create(validated_data)
+        if images:
+            instance.set_images(images)
+        return instance
 
     def update(self, instance, validated_data):
         images = validated_data.pop('images', None)
-        if images:
-            validated_data['images'] = ','.join(images)
-
-        # Serialize extra_features list of objects to JSON string
-        extra_features = validated_data.pop('extra_features', None)
-        if extra_features is not None:
-            validated_data['extra_features'] = json.dumps(extra_features)
+        if images is not None:
+            instance.set_images(images)
 
         return super().update(instance, validated_data)
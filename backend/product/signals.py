@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent with ``sender=Product`` and the ``ids`` of the products written by a
+# bulk create, update or soft-delete. Bulk queries skip ``post_save``, so
+# receivers get a single notification for the whole batch instead.
+products_bulk_saved = Signal()
@@ -1,3 +1,510 @@
-from django.test import TestCase
+import csv
+import io
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from backend.cache import shop_cache
+from backend.metrics import metrics
+from backend.testing import QueryPlanTestMixin
+from search.models import IndexOutbox
+
+from .catalog import product_catalog
+from .models import Category, Product, ProductImage
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Asserts that list endpoints run a fixed number of queries, whatever the
+    number of rows they return. Each endpoint is hit once with a single row
+    and once with many; both must match the expected count exactly.
+    """
+    small, large = 1, 25
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.category = Category.objects.create(name='Books', slug='books')
+
+    def create_products(self, count, **kwargs):
+        defaults = {
+            'description': 'A product',
+            'owner': self.user,
+            'category': self.category,
+            'brand': 'Acme',
+            'mrp': 100,
+            'selling_price': 80,
+            'is_active': True,
+        }
+        defaults.update(kwargs)
+        products = Product.objects.bulk_create(
+            Product(title=f'Product {i}', **defaults) for i in range(count)
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, url=f'https://img.example.com/{product.pk}/{position}.jpg',
+                         position=position, is_primary=position == 0)
+            for product in products
+            for position in range(2)
+        )
+
+    def assertConstantQueries(self, num, url, user):
+        self.client.force_authenticate(user)
+        for count in (self.small, self.large - self.small):
+            self.create_products(count)
+            shop_cache.clear()  # Measure the uncached response
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_shop_products(self):
+        # Page validators (ETag), then the page and its thumbnails
+        self.assertConstantQueries(3, reverse('shop-products'), self.user)
+
+    def test_my_products(self):
+        self.assertConstantQueries(2, reverse('product-list-create'), self.user)
+
+    def test_admin_products(self):
+        self.assertConstantQueries(2, reverse('admin-product-list-create'), self.admin)
+
+
+class ShopTestMixin:
+    def setUp(self):
+        shop_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Books', slug='books')
+
+    def create_products(self, count, prefix='Product', **kwargs):
+        return Product.objects.bulk_create(
+            Product(title=f'{prefix} {i}', description='A product', owner=self.user, category=self.category,
+                    brand='Acme', mrp=100, selling_price=80, is_active=True, **kwargs)
+            for i in range(count)
+        )
+
+    def titles(self, url):
+        """Titles of every page, following ``next``"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([product['title'] for product in response.data['results']])
+            url = response.data['next']
+        return pages
+
+
+class ShopFeedTestCase(ShopTestMixin, TestCase):
+    def test_cursor_round_trip(self):
+        products = self.create_products(5)
+        # Same created_at everywhere: ties are broken by id
+        Product.objects.update(created_at=products[0].created_at)
+        expected = [product.title for product in sorted(products, key=lambda product: product.pk, reverse=True)]
+
+        pages = self.titles(f"{reverse('shop-products')}?page_size=2")
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_pages_stay_put_when_products_are_added(self):
+        self.create_products(4)
+        response = self.client.get(reverse('shop-products'), {'page_size': 2})
+        first = [product['title'] for product in response.data['results']]
+        self.create_products(1, prefix='New')
+        shop_cache.clear()
+        # Newer products go before the first page instead of shifting the next ones
+        rest = sum(self.titles(response.data['next']), [])
+        self.assertEqual(sorted(first + rest), [f'Product {i}' for i in range(4)])
+
+    def test_invalid_cursor(self):
+        self.create_products(1)
+        for cursor in ('not-a-cursor', 'WzFd'):  # Garbage, and a position of the wrong length
+            response = self.client.get(reverse('shop-products'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class ExtraFeaturesTestCase(ShopTestMixin, TestCase):
+    def feature_products(self):
+        features = {
+            'Red L': [{'key': 'colour', 'value': 'red'}, {'key': 'size', 'value': 'L'}],
+            'Red M': [{'key': 'colour', 'value': 'red'}, {'key': 'size', 'value': 'M'}],
+            'Blue L': [{'key': 'colour', 'value': 'blue'}, {'key': 'size', 'value': 'L'}],
+            'Plain': None,
+        }
+        for title, extra_features in features.items():
+            Product.objects.create(title=title, description='A product', owner=self.user, category=self.category,
+                                   brand='Acme', mrp=100, selling_price=80, is_active=True,
+                                   extra_features=extra_features)
+
+    def test_with_features(self):
+        self.feature_products()
+        shop = Product.objects.shop()
+        self.assertEqual(shop.with_features({}).count(), 4)
+        self.assertEqual(set(shop.with_features({'colour': 'red'}).values_list('title', flat=True)), {'Red L', 'Red M'})
+        self.assertEqual(list(shop.with_features({'colour': 'red', 'size': 'L'}).values_list('title', flat=True)), ['Red L'])
+        self.assertFalse(shop.with_features({'colour': 'green'}).exists())
+
+    def test_feature_query_parameters(self):
+        self.feature_products()
+        self.assertEqual(self.titles(f"{reverse('shop-products')}?feature.size=L"), [['Blue L', 'Red L']])
+        self.assertEqual(self.titles(f"{reverse('shop-products')}?feature.size=L&feature.colour=red"), [['Red L']])
+
+    def test_features_are_stored_as_json(self):
+        features = [{'key': 'colour', 'value': 'red'}]
+        response = self.client.post(reverse('product-list-create'), {
+            'title': 'Lamp', 'description': 'A lamp', 'brand': 'Acme', 'mrp': '100', 'selling_price': '80',
+            'category': str(self.category.pk), 'extra_features': features,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['extra_features'], features)
+        self.assertEqual(Product.objects.get(title='Lamp').extra_features, features)
+        self.assertTrue(Product.objects.with_features({'colour': 'red'}).filter(title='Lamp').exists())
+
+
+class ProductBulkTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Books', slug='books')
+        self.url = reverse('product-bulk')
+
+    def item(self, title, **kwargs):
+        return {'title': title, 'description': 'A product', 'brand': 'Acme', 'mrp': '100', 'selling_price': '80',
+                'category': str(self.category.pk), **kwargs}
+
+    def create(self, owner, *titles):
+        return [
+            Product.objects.create(title=title, description='A product', owner=owner, category=self.category,
+                                   brand='Acme', mrp=100, selling_price=80, is_active=True)
+            for title in titles
+        ]
+
+    def test_create(self):
+        response = self.client.post(self.url, [
+            self.item('Lamp', images=['https://img.example.com/1.jpg', 'https://img.example.com/2.jpg']),
+            self.item('Chair', extra_features=[{'key': 'colour', 'value': 'red'}]),
+        ], format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        products = Product.objects.filter(pk__in=response.data['ids'])
+        self.assertEqual(sorted(products.values_list('title', flat=True)), ['Chair', 'Lamp'])
+        self.assertTrue(all(product.owner == self.user for product in products))
+        self.assertEqual(list(ProductImage.objects.filter(is_primary=True).values_list('url', flat=True)),
+                         ['https://img.example.com/1.jpg'])
+        # One search outbox entry per product, from a single notification
+        self.assertEqual(IndexOutbox.objects.filter(index_name='products').count(), 2)
+
+    def test_create_reports_errors_per_item(self):
+        response = self.client.post(self.url, [
+            self.item('Lamp'),
+            self.item('', mrp='cheap'),
+            self.item('Chair', category='7d3b0c52-55d6-4c8e-9f43-8d6c2c35c8a1'),
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(sorted(response.data[1]), ['mrp', 'title'])
+        self.assertEqual(list(response.data[2]), ['category'])
+        self.assertFalse(Product.objects.exists())  # All or nothing
+
+    def test_update(self):
+        lamp, chair = self.create(self.user, 'Lamp', 'Chair')
+        response = self.client.patch(self.url, [
+            {'id': str(lamp.pk), 'selling_price': '60'},
+            {'id': str(chair.pk), 'title': 'Armchair'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        lamp.refresh_from_db()
+        chair.refresh_from_db()
+        self.assertEqual((lamp.selling_price, chair.title), (60, 'Armchair'))
+
+    def test_update_reports_errors_per_item(self):
+        [lamp] = self.create(self.user, 'Lamp')
+        [theirs] = self.create(self.other, 'Chair')
+        response = self.client.patch(self.url, [
+            {'id': str(lamp.pk), 'selling_price': '60'},
+            {'id': str(theirs.pk), 'title': 'Mine now'},
+            {'id': str(lamp.pk), 'title': 'Again'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{}, {'id': ['No such product.']}, {'id': ['Product listed more than once.']}])
+        lamp.refresh_from_db()
+        self.assertEqual(lamp.selling_price, 80)
+
+    def test_delete(self):
+        lamp, chair = self.create(self.user, 'Lamp', 'Chair')
+        [theirs] = self.create(self.other, 'Table')
+        response = self.client.delete(self.url, {'ids': [str(lamp.pk), str(theirs.pk)]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'ids': {1: ['No such product.']}})
+        self.assertFalse(Product.objects.filter(deleted=True).exists())
+
+        response = self.client.delete(self.url, {'ids': [str(lamp.pk), str(chair.pk)]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Product.objects.filter(deleted=True).values_list('title', flat=True)), {'Lamp', 'Chair'})
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_authenticate(self.admin)
+        self.category = Category.objects.create(name='Books', slug='books')
+
+    def upload(self, name, content):
+        response = self.client.post(reverse('admin-product-import'), {'file': SimpleUploadedFile(name, content)},
+                                    format='multipart')
+        if response.status_code != 200:
+            return response, None
+        return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_import_csv(self):
+        category = self.category.pk
+        response, progress = self.upload('products.csv', (
+            'title,description,category,brand,mrp,selling_price,extra_features,images\n'
+            f'Lamp,A lamp,{category},Acme,100,80,"[{{""key"": ""colour"", ""value"": ""red""}}]",'
+            '"[""https://img.example.com/1.jpg""]"\n'
+            f',No title,{category},Acme,100,80,,\n'
+            f'Chair,A chair,{category},Acme,cheap,80,,\n'
+        ).encode())
+        self.assertEqual(response.status_code, 200)
+        totals = progress[-1]
+        self.assertEqual((totals['rows'], totals['created'], totals['rejected']), (3, 1, 2))
+        self.assertEqual([(error['line'], list(error['errors'])) for error in totals['errors']],
+                         [(3, ['title']), (4, ['mrp'])])
+
+        lamp = Product.objects.get()
+        self.assertEqual((lamp.title, lamp.owner), ('Lamp', self.admin))
+        self.assertEqual(lamp.extra_features, [{'key': 'colour', 'value': 'red'}])
+        self.assertEqual([image.url for image in lamp.images.all()], ['https://img.example.com/1.jpg'])
+
+    def test_import_jsonl(self):
+        item = {'title': 'Lamp', 'description': 'A lamp', 'category': str(self.category.pk), 'brand': 'Acme',
+                'mrp': '100', 'selling_price': '80'}
+        response, progress = self.upload('products.jsonl', b'\n'.join([
+            json.dumps(item).encode(), b'{"title": ', b'', json.dumps({**item, 'title': 'Chair'}).encode(),
+        ]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(progress[-1]['created'], 2)
+        [error] = progress[-1]['errors']
+        self.assertEqual(error['line'], 2)
+        self.assertIn('Invalid JSON', error['errors']['non_field_errors'][0])
+
+    def test_batches_commit_one_by_one(self):
+        rows = [(line, {'title': f'Product {line}', 'description': 'A product', 'category': str(self.category.pk),
+                        'brand': 'Acme', 'mrp': '100', 'selling_price': '80'}) for line in range(1, 6)]
+        rows[3][1]['selling_price'] = 'free'
+        progress = list(product_catalog.import_rows(rows, self.admin, batch_size=2))
+        self.assertEqual([(batch['rows'], batch['created']) for batch in progress], [(2, 2), (4, 3), (5, 4)])
+        self.assertEqual([error['line'] for error in progress[1]['errors']], [4])
+        self.assertEqual(Product.objects.count(), 4)
+
+    def test_rejected_uploads(self):
+        response, _ = self.upload('products.xlsx', b'')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(User.objects.create_user('owner', 'owner@example.com', 'password'))
+        response, _ = self.upload('products.csv', b'title\n')
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_round_trip(self):
+        [lamp] = Product.objects.bulk_create([Product(
+            title='Lamp', description='A lamp', owner=self.admin, category=self.category, brand='Acme',
+            mrp=100, selling_price=80, extra_features=[{'key': 'colour', 'value': 'red'}],
+        )])
+        lamp.set_images(['https://img.example.com/1.jpg'])
+
+        response = self.client.get(reverse('admin-product-export'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        exported = b''.join(response.streaming_content)
+        rows = list(csv.DictReader(io.StringIO(exported.decode())))
+        self.assertEqual((rows[0]['title'], rows[0]['owner']), ('Lamp', 'admin'))
+        self.assertEqual(json.loads(rows[0]['images']), ['https://img.example.com/1.jpg'])
+
+        response, progress = self.upload('products.csv', exported)
+        self.assertEqual(progress[-1]['created'], 1, progress[-1]['errors'])
+        copy = Product.objects.exclude(pk=lamp.pk).get()
+        self.assertEqual(copy.extra_features, lamp.extra_features)
+        self.assertEqual([image.url for image in copy.images.all()], ['https://img.example.com/1.jpg'])
+
+        response = self.client.get(reverse('admin-product-export'), {'format': 'jsonl'})
+        self.assertEqual(
+            [json.loads(line)['title'] for line in b''.join(response.streaming_content).splitlines()], ['Lamp', 'Lamp'],
+        )
+
+
+class ShopCacheTestCase(ShopTestMixin, TestCase):
+    def assertCached(self, url, cached=True):
+        # Only the validators query (ETag) runs when the page comes from the cache
+        with self.assertNumQueries(1 if cached else 3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_pages_are_cached(self):
+        self.create_products(2)
+        url = reverse('shop-products')
+        self.assertCached(url, cached=False)
+        self.assertCached(url)
+        self.assertCached(f'{url}?utm_source=mail')  # Ignored parameters share the entry
+        self.assertCached(f'{url}?page_size=1', cached=False)
+
+    def test_writes_invalidate_once_committed(self):
+        [product] = self.create_products(1)
+        url = reverse('shop-products')
+        self.assertCached(url, cached=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.title = 'Renamed'
+            product.save()
+            self.assertCached(url)  # Not before the commit
+        response = self.assertCached(url, cached=False)
+        self.assertEqual(response.data['results'][0]['title'], 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Novels'
+            self.category.save()
+        response = self.assertCached(url, cached=False)
+        self.assertEqual(response.data['results'][0]['category'], 'Novels')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=product.pk).soft_delete()
+        self.assertEqual(self.client.get(url).data['results'], [])
+
+
+class InstrumentationTestCase(ShopTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_server_timing(self):
+        self.create_products(2)
+        response = self.client.get(reverse('shop-products'))
+        timing = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(sorted(timing), ['db', 'serialize', 'total'])
+        self.assertIn('desc="3 queries"', timing['db'])
+
+    def test_metrics_authorization(self):
+        self.client.get(reverse('shop-products'))
+        url = reverse('metrics')
+        client = Client()
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_login(self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_login(User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_requests_total{view="shop-products",method="GET",status="200"} 1', response.content.decode(),
+        )
+
+        scraper = Client()
+        with self.settings(INSTRUMENTATION={'METRICS_TOKEN': 'scrape-me'}):
+            self.assertEqual(scraper.get(url, HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 200)
+            self.assertEqual(scraper.get(url, HTTP_AUTHORIZATION='Bearer guess').status_code, 403)
+        with self.settings(INSTRUMENTATION={'METRICS_TOKEN': None}):
+            self.assertEqual(scraper.get(url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        shop_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Books', slug='books')
+        self.products = [
+            Product.objects.create(title=f'Product {i}', description='A product', owner=self.user, category=category,
+                                   brand='Acme', mrp=100, selling_price=80, is_active=True)
+            for i in range(3)
+        ]
+
+    def test_detail(self):
+        product = self.products[0]
+        url = reverse('shop-product-detail', args=[product.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        product.title = 'Renamed'
+        product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_revalidates_on_etag_only(self):
+        url = reverse('shop-products')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Leaving the listing touches none of the rows still on the page
+        Product.objects.filter(pk=self.products[0].pk).delete()
+        shop_cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200,
+        )
+
+
+class QueryPlanTestCase(QueryPlanTestMixin, TestCase):
+    """
+    Fails when a filtered product listing stops using its index. The seeded
+    catalogue mirrors production: most listings are sold, hidden or deleted,
+    and each owner has a small share of them. Admin listings read the whole
+    table by design and are not checked.
+    """
+    indexed_tables = ('product_product', 'product_productimage')
+    owners, products_per_owner = 50, 200
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Books', slug='books')
+        cls.users = User.objects.bulk_create(
+            User(username=f'owner{i}', email=f'owner{i}@example.com') for i in range(cls.owners)
+        )
+        products = Product.objects.bulk_create(
+            Product(
+                title=f'Product {i}',
+                description='A product',
+                owner=cls.users[i % cls.owners],
+                category=cls.category,
+                brand='Acme',
+                mrp=100,
+                selling_price=80,
+                is_active=i % 10 != 0,
+                is_sold=i % 10 < 7,
+                deleted=i % 20 == 1,
+                extra_features=[{'key': 'colour', 'value': 'red' if i % 50 == 0 else 'blue'}],
+            )
+            for i in range(cls.owners * cls.products_per_owner)
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, url=f'https://img.example.com/{product.pk}/{position}.jpg',
+                         position=position, is_primary=position == 0)
+            for product in products
+            for position in range(2)
+        )
+        cls.analyze(Product, ProductImage)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_shop_products(self):
+        self.assertUsesIndexes(reverse('shop-products'), self.users[0])
+
+    def test_shop_products_by_feature(self):
+        self.assertUsesIndexes(f"{reverse('shop-products')}?feature.colour=red", self.users[0])
+
+    def test_my_products(self):
+        self.assertUsesIndexes(reverse('product-list-create'), self.users[0])
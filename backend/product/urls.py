@@ -2,19 +2,23 @@ from django.urls import path
 from .views import (
     ProductRetrieveUpdateDestroyView,
     ProductListCreateView,
+    ProductBulkView,
     ShopProductsView,
     ShopProductDetailView,
     AdminListCreateProductView,
-    AdminDetailedProductView
+    AdminDetailedProductView,
+    AdminProductExportView,
+    AdminProductImportView,
 )
 from .views import CategoryDetailView, CategoryListView, CategoryListCreateView
 
 urlpatterns = [
     # Customer dashboard endpoints
     path('my-products/', ProductListCreateView.as_view(), name='product-list-create'),
+    path('my-products/bulk/', ProductBulkView.as_view(), name='product-bulk'),
     path('my-products/<uuid:pk>/', ProductRetrieveUpdateDestroyView.as_view(), name='product-detail'),
 
-    path('categories/', CategoryListView.as_view(), name='product-list-create'),
+    path('categories/', CategoryListView.as_view(), name='category-list'),
 
     # Shop endpoints
     path('products/', ShopProductsView.as_view(), name='shop-products'),
@@ -22,8 +26,10 @@ urlpatterns = [
 
     # Admin endpoints
     path('admin/products/', AdminListCreateProductView.as_view(), name='admin-product-list-create'),
+    path('admin/products/export/', AdminProductExportView.as_view(), name='admin-product-export'),
+    path('admin/products/import/', AdminProductImportView.as_view(), name='admin-product-import'),
     path('admin/products/<uuid:pk>/', AdminDetailedProductView.as_view(), name='admin-product-detail'),
 
-    path('admin/categories/', CategoryListCreateView.as_view(), name='product-list-create'),
-    path('admin/categories/<uuid:pk>/', CategoryDetailView.as_view(), name='product-detail'),
+    path('admin/categories/', CategoryListCreateView.as_view(), name='admin-category-list-create'),
+    path('admin/categories/<uuid:pk>/', CategoryDetailView.as_view(), name='admin-category-detail'),
 ]
@@ -1,28 +1,37 @@
-from rest_framework import generics, permissions
+import uuid
+
+from django.db import transaction
+from rest_framework import generics, permissions, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 
-
+from backend.cache import CachedResponseMixin
+from backend.catalog import CatalogExportView, CatalogImportView
+from backend.conditional import ConditionalGetMixin
+from backend.pagination import KeysetPagination
+from backend.transactions import AtomicWritesMixin
+from .catalog import product_catalog
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .serializers import MAX_BULK_ITEMS, ProductBulkDeleteSerializer, ProductSerializer, CategorySerializer
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespace = 'categories'
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(AtomicWritesMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(AtomicWritesMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(AtomicWritesMixin, generics.ListCreateAPIView):
     """
     For the customer's dashboard (authenticated users).
     Provides:
@@ -33,14 +42,66 @@ class ProductListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Product.objects.filter(owner=self.request.user, deleted=False)
+        return Product.objects.owned_by(self.request.user).order_by('-created_at').for_serializer().with_images()
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
+class ProductBulkView(generics.GenericAPIView):
+    """
+    Bulk writes on the current user's products, for catalog imports. Each
+    request is all or nothing: if any item is invalid nothing is written and
+    the 400 response lists the errors of every item, in order ({} for valid
+    ones). At most MAX_BULK_ITEMS items per request.
+    Provides:
+      - POST /my-products/bulk/   -> Create a list of products
+      - PATCH /my-products/bulk/  -> Update a list of products, each named by its "id"
+      - DELETE /my-products/bulk/ -> Soft-delete the products of {"ids": [...]}
+    Responses list the ids of the products written: {"ids": [...]}.
+    """
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, many=True, allow_empty=False, max_length=MAX_BULK_ITEMS, **kwargs)
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        products = serializer.save(owner=request.user)
+        return Response({'ids': [product.pk for product in products]}, status=status.HTTP_201_CREATED)
+
+    @transaction.atomic
+    def patch(self, request):
+        ids = set()
+        for item in request.data if isinstance(request.data, list) else []:
+            try:
+                ids.add(uuid.UUID(str(item['id'])))
+            except (TypeError, ValueError, KeyError):
+                pass
+        products = Product.objects.owned_by(request.user).filter(pk__in=ids).defer('search_vector').select_for_update()
+        serializer = self.get_serializer(list(products), data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        products = serializer.save()
+        return Response({'ids': [product.pk for product in products]})
+
+    @transaction.atomic
+    def delete(self, request):
+        serializer = ProductBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        products = Product.objects.owned_by(request.user).filter(pk__in=ids).select_for_update()
+        found = set(products.values_list('pk', flat=True))
+        errors = {index: ['No such product.'] for index, pk in enumerate(ids) if pk not in found}
+        if errors:
+            return Response({'ids': errors}, status=status.HTTP_400_BAD_REQUEST)
+        products.soft_delete()
+        return Response({'ids': ids})
+
+
 # ✅ Retrieve, Update & Soft-Delete (Requires PK)
-class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class ProductRetrieveUpdateDestroyView(AtomicWritesMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or soft-delete a product.
     Provides:
@@ -53,51 +114,73 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "pk"  # Explicitly specify that 'pk' is used
 
     def get_queryset(self):
-        return Product.objects.filter(owner=self.request.user, deleted=False)
+        return Product.objects.owned_by(self.request.user).for_serializer().with_images()
 
     def perform_destroy(self, instance):
         instance.deleted = True
         instance.save()
 
 
-class ShopProductsView(generics.ListAPIView):
+class ShopProductsView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """
     For the public shop listing (no auth required).
     Provides:
       - GET /shop-products/ -> List all products where:
            deleted=False, is_active=True, is_sold=False
+         Newest first, cursor paginated (?cursor=...&page_size=...).
+         Filter on extra features with ?feature.<key>=<value>, one per key.
          Strips out 'is_sold' from each product's output.
+         Answers 304 to a current If-None-Match.
+         Pages are cached server-side until a product or category changes.
     """
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    feature_param_prefix = 'feature.'
+    cache_namespace = 'shop-products'
+
+    def get_features(self):
+        return {
+            param[len(self.feature_param_prefix):]: value
+            for param, value in self.request.query_params.items()
+            if param.startswith(self.feature_param_prefix)
+        }
 
     def get_queryset(self):
-        return Product.objects.filter(deleted=False, is_active=True, is_sold=False)
+        return Product.objects.shop().with_features(self.get_features()).for_serializer().with_thumbnail()
+
+    def get_cache_params(self):
+        return {
+            'features': self.get_features(),
+            'cursor': self.request.query_params.get(self.paginator.cursor_query_param),
+            'page_size': self.paginator.get_page_size(self.request),
+        }
 
     def list(self, request, *args, **kwargs):
-        # Use the default list behavior
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
         data = serializer.data
 
         # Exclude `is_sold` from each product
         for product in data:
             product.pop('is_sold', None)
 
-        return Response(data)
+        return self.get_paginated_response(data)
 
 
-class ShopProductDetailView(generics.RetrieveAPIView):
+class ShopProductDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     For retrieving a single product for the shop.
     Provides:
       - GET /shop-products/<uuid:pk>/
+         Answers 304 to a current If-None-Match / If-Modified-Since.
     """
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Product.objects.filter(deleted=False, is_active=True, is_sold=False)
+        return Product.objects.shop().for_serializer().with_images()
 
     def retrieve(self, request, *args, **kwargs):
         # Use default retrieve and then strip out is_sold
@@ -107,7 +190,7 @@ class ShopProductDetailView(generics.RetrieveAPIView):
         return Response(data)
 
 
-class AdminListCreateProductView(generics.ListCreateAPIView):
+class AdminListCreateProductView(AtomicWritesMixin, generics.ListCreateAPIView):
     """
     For admins with full CRUD access (including hard deletes).
     Provides:
@@ -115,13 +198,13 @@ class AdminListCreateProductView(generics.ListCreateAPIView):
       - POST /admin/product/             -> Create
     """
     serializer_class = ProductSerializer
-    queryset = Product.objects.all()
+    queryset = Product.objects.for_serializer().with_images()
     permission_classes = [permissions.IsAdminUser]
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-class AdminDetailedProductView(generics.RetrieveUpdateDestroyAPIView):
+class AdminDetailedProductView(AtomicWritesMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     For admins with full CRUD access (including hard deletes).
     Provides:
@@ -130,8 +213,25 @@ class AdminDetailedProductView(generics.RetrieveUpdateDestroyAPIView):
       - DELETE /admin/product/<uuid:pk>/ -> Hard delete
     """
     serializer_class = ProductSerializer
-    queryset = Product.objects.all()
+    queryset = Product.objects.for_serializer().with_images()
     permission_classes = [permissions.IsAdminUser]
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
+
+
+class AdminProductExportView(CatalogExportView):
+    """
+    Provides:
+      - GET /admin/products/export/?format=csv|jsonl -> Every product, streamed
+    """
+    catalog = product_catalog
+
+
+class AdminProductImportView(CatalogImportView):
+    """
+    Provides:
+      - POST /admin/products/import/ -> Create products from an uploaded
+        CSV or JSON Lines ``file``, owned by the admin; streams progress
+    """
+    catalog = product_catalog
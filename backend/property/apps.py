@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'property'
+
+    def ready(self):
+        from . import receivers  # noqa: F401
@@ -0,0 +1,43 @@
+from backend.catalog import Catalog
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+
+from .models import Property, PropertyImage
+from .serializers import PropertySerializer
+
+
+class PropertyCatalog(Catalog):
+    name = 'properties'
+    serializer_class = PropertySerializer
+    columns = {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'owner': 'owner__username',
+        'location': 'location',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'rent_per_month': 'rent_per_month',
+        'security_deposit': 'security_deposit',
+        'furnished': 'furnished',
+        'total_vacancy': 'total_vacancy',
+        'available_vacancy': 'available_vacancy',
+        'sharing': 'sharing',
+        'is_active': 'is_active',
+        'deleted': 'deleted',
+        'custom_features': 'custom_features',
+        'images': 'image_urls',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    json_columns = ('custom_features', 'images')
+
+    def queryset(self):
+        return Property.objects.annotate(
+            image_urls=ArraySubquery(
+                PropertyImage.objects.filter(property=OuterRef('pk')).order_by('position').values('url'),
+            ),
+        ).order_by('pk')
+
+
+property_catalog = PropertyCatalog()
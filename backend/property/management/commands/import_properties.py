@@ -0,0 +1,8 @@
+from backend.catalog import CatalogImportCommand
+
+from ...catalog import property_catalog
+
+
+class Command(CatalogImportCommand):
+    help = 'Import properties from a CSV or JSON Lines file, validated and written in batches'
+    catalog = property_catalog
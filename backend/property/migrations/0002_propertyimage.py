@@ -0,0 +1,69 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_images(apps, schema_editor):
+    Property = apps.get_model('property', 'Property')
+    PropertyImage = apps.get_model('property', 'PropertyImage')
+    batch = []
+    for property_id, images in Property.objects.exclude(legacy_images__isnull=True).values_list('id', 'legacy_images').iterator():
+        urls = [url.strip() for url in images.split(',') if url.strip()]
+        batch.extend(
+            PropertyImage(property_id=property_id, url=url, position=position, is_primary=position == 0)
+            for position, url in enumerate(urls)
+        )
+        if len(batch) >= 1000:
+            PropertyImage.objects.bulk_create(batch)
+            batch = []
+    PropertyImage.objects.bulk_create(batch)
+
+
+def join_images(apps, schema_editor):
+    Property = apps.get_model('property', 'Property')
+    PropertyImage = apps.get_model('property', 'PropertyImage')
+    images = {}
+    for property_id, url in PropertyImage.objects.order_by('property_id', 'position').values_list('property_id', 'url'):
+        images.setdefault(property_id, []).append(url)
+    for property_id, urls in images.items():
+        Property.objects.filter(pk=property_id).update(legacy_images=','.join(urls))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0001_initial'),
+    ]
+
+    operations = [
+        # Move the old column out of the way of the new reverse accessor.
+        migrations.RenameField(
+            model_name='property',
+            old_name='images',
+            new_name='legacy_images',
+        ),
+        migrations.CreateModel(
+            name='PropertyImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2048)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('is_primary', models.BooleanField(default=False)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='property.property')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['property', 'position'], name='property_image_order_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='propertyimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('property',), name='property_image_single_primary'),
+        ),
+        migrations.RunPython(split_images, join_images),
+        migrations.RemoveField(
+            model_name='property',
+            name='legacy_images',
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0002_propertyimage'),
+        # Creates the pg_trgm extension.
+        ('product', '0005_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION property_property_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                    setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(NEW.location, '')), 'B') ||
+                    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER property_property_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF title, location, description ON property_property
+                FOR EACH ROW EXECUTE FUNCTION property_property_search_vector_update();
+
+                -- Backfill existing rows through the trigger.
+                UPDATE property_property SET title = title;
+            """,
+            reverse_sql="""
+                DROP TRIGGER property_property_search_vector_trigger ON property_property;
+                DROP FUNCTION property_property_search_vector_update();
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='property_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='property_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['location'], name='property_location_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0004_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('deleted', False), ('is_active', True)), fields=['-created_at', '-id'], name='property_shop_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('deleted', False), ('is_active', True)), fields=['sharing', 'rent_per_month'], name='property_shop_rent_idx'),
+        ),
+    ]
@@ -1,15 +1,52 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
 
 
+class PropertyQuerySet(models.QuerySet):
+    def shop(self):
+        """Properties visible in the public listing."""
+        return self.filter(is_active=True, deleted=False)
+
+    def with_images(self):
+        """Prefetch every image of each property, in display order."""
+        return self.prefetch_related(
+            models.Prefetch('images', queryset=PropertyImage.objects.only('property', 'url', 'position')),
+        )
+
+    def with_thumbnail(self):
+        """Prefetch only the primary image URL of each property into ``thumbnails``."""
+        return self.prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=PropertyImage.objects.filter(is_primary=True).only('property', 'url'),
+                to_attr='thumbnails',
+            ),
+        )
+
+    def for_serializer(self):
+        """
+        Join the owner PropertySerializer reads and load only the columns it
+        renders, so a list costs one query regardless of its length (plus one
+        per image prefetch).
+        """
+        property_fields = [
+            field.name for field in self.model._meta.concrete_fields if field.name != 'search_vector'
+        ]
+        return self.select_related('owner').only(*property_fields, 'owner__username', 'owner__email')
+
+
 class Property(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Use UUID as primary key
     title = models.CharField(max_length=255)  # E.g., "2 BHK near College"
     description = models.TextField()  # Detailed description of the house
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='houses')
     location = models.TextField()
-    images = models.TextField(blank=True, null=True)  # Store image URLs as a comma-separated string
+    # Optional map position, used for distance search
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     rent_per_month = models.DecimalField(max_digits=10, decimal_places=2)  # Rent per month
     security_deposit = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)  # Security deposit amount
     furnished = models.BooleanField(default=False)  # Whether the house is furnished
@@ -20,4 +57,59 @@ class Property(models.Model):
     custom_features = models.JSONField(blank=True, null=True)  # Store custom fields as a JSON string
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    deleted = models.BooleanField(default=False)
\ No newline at end of file
+    deleted = models.BooleanField(default=False)
+    # Weighted title/location/description tsvector, maintained by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PropertyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serve the public listing (ShopPropertiesView): newest first, and
+            # narrowed by sharing and a rent range.
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='property_shop_feed_idx',
+                condition=models.Q(is_active=True, deleted=False),
+            ),
+            models.Index(
+                fields=['sharing', 'rent_per_month'],
+                name='property_shop_rent_idx',
+                condition=models.Q(is_active=True, deleted=False),
+            ),
+            # Full-text and typo-tolerant matching for PostgresSearchBackend.
+            GinIndex(fields=['search_vector'], name='property_search_vector_idx'),
+            GinIndex(fields=['title'], name='property_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['location'], name='property_location_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
+    def set_images(self, urls):
+        """Replace the property's images; the first URL becomes the primary one."""
+        self.images.all().delete()
+        PropertyImage.objects.bulk_create(
+            PropertyImage(property=self, url=url, position=position, is_primary=position == 0)
+            for position, url in enumerate(urls)
+        )
+
+
+class PropertyImage(models.Model):
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
+    url = models.URLField(max_length=2048)
+    position = models.PositiveSmallIntegerField(default=0)  # Display order, 0 first
+    is_primary = models.BooleanField(default=False)  # Thumbnail shown in listings
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['property', 'position'], name='property_image_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property'],
+                condition=models.Q(is_primary=True),
+                name='property_image_single_primary',
+            ),
+        ]
+
+    def __str__(self):
+        return self.url
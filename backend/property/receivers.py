@@ -0,0 +1,15 @@
+from backend.cache import shop_cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Property
+from .signals import properties_bulk_saved
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(properties_bulk_saved, sender=Property)
+def invalidate_shop_properties(sender, **kwargs):
+    """Drop the cached shop listings once the change is committed."""
+    transaction.on_commit(lambda: shop_cache.invalidate('shop-properties'))
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Property
+from .models import Property, PropertyImage
+from .signals import properties_bulk_saved
 import json
 
 class PropertyExtraFeatureSerializer(serializers.Serializer):
@@ -7,10 +9,30 @@ class PropertyExtraFeatureSerializer(serializers.Serializer):
     value = serializers.CharField()
     ref_name = "PropertyExtraFeature"
 
+class PropertyListSerializer(serializers.ListSerializer):
+    """
+    Bulk creation for ``PropertySerializer(many=True)``: one ``bulk_create``
+    for the properties and one for their images, in a single transaction.
+    Sends ``properties_bulk_saved`` once instead of a ``post_save`` each.
+    """
+
+    @transaction.atomic
+    def create(self, validated_data):
+        images = [item.pop('images', []) for item in validated_data]
+        properties = Property.objects.bulk_create(Property(**item) for item in validated_data)
+        PropertyImage.objects.bulk_create(
+            PropertyImage(property=property_obj, url=url, position=position, is_primary=position == 0)
+            for property_obj, urls in zip(properties, images)
+            for position, url in enumerate(urls)
+        )
+        properties_bulk_saved.send(sender=Property, ids=[property_obj.pk for property_obj in properties])
+        return properties
+
+
 class PropertySerializer(serializers.ModelSerializer):
     owner_name = serializers.CharField(source='owner.username', read_only=True)
     owner_email = serializers.CharField(source='owner.email', read_only=True)
-    images = serializers.ListField(child=serializers.URLField(), required=False)
+    images = serializers.ListField(child=serializers.URLField(), required=False, write_only=True)
     custom_features = serializers.ListField(child=PropertyExtraFeatureSerializer(), required=False, allow_empty=True)
 
     class Meta:
@@ -22,6 +44,8 @@ class PropertySerializer(serializers.ModelSerializer):
             'owner_name',
             'owner_email',
             'location',
+            'latitude',
+            'longitude',
             'images',  # This will handle both input (list) and output (list)
             'rent_per_month',
             'security_deposit',
@@ -37,22 +61,41 @@ class PropertySerializer(serializers.ModelSerializer):
 
         ]
         read_only_fields = ['id', 'owner_name', 'owner_email', 'created_at', 'updated_at', 'deleted']
+        list_serializer_class = PropertyListSerializer
+
+    def validate(self, attrs):
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('latitude and longitude must be set together.')
+        if latitude is not None and not -90 <= latitude <= 90:
+            raise serializers.ValidationError({'latitude': 'Must be between -90 and 90.'})
+        if longitude is not None and not -180 <= longitude <= 180:
+            raise serializers.ValidationError({'longitude': 'Must be between -180 and 180.'})
+        return attrs
 
     def to_representation(self, instance):
-        """ Convert stored comma-separated image URLs to a list when retrieving data """
+        """ Expose image URLs as a list, or just the thumbnail for listings """
         data = super().to_representation(instance)
-        data['images'] = instance.images.split(',') if instance.images else []
+        thumbnails = getattr(instance, 'thumbnails', None)
+        if thumbnails is not None:
+            data['thumbnail'] = thumbnails[0].url if thumbnails else None
+        else:
+            data['images'] = [image.url for image in instance.images.all()]
+            data['thumbnail'] = data['images'][0] if data['images'] else None
         return data
 
     def create(self, validated_data):
-        """ Convert list of image URLs into a comma-separated string before saving """
+        """ Store the list of image URLs as ordered PropertyImage rows """
         images = validated_data.pop('images', [])
-        validated_data['images'] = ','.join(images) if images else ""
-        return super().create(validated_data)
+        instance = super().create(validated_data)
+        if images:
+            instance.set_images(images)
+        return instance
 
     def update(self, instance, validated_data):
-        """ Convert list of image URLs into a comma-separated string before updating """
+        """ Replace the property's images when a new list is given """
         images = validated_data.pop('images', None)
         if images is not None:
-            instance.images = ','.join(images)
+            instance.set_images(images)
         return super().update(instance, validated_data)
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with ``sender=Property`` and the ``ids`` of the properties written in
+# bulk; see product.signals.products_bulk_saved.
+properties_bulk_saved = Signal()
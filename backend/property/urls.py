@@ -6,7 +6,9 @@ from .views import (
     ShopPropertyDetailView,
     TogglePropertyAvailabilityView,
     AdminDetailedPropertyView,
-    AdminListCreatePropertyView
+    AdminListCreatePropertyView,
+    AdminPropertyExportView,
+    AdminPropertyImportView,
 )
 
 urlpatterns = [
@@ -22,5 +24,7 @@ urlpatterns = [
     path('properties/', ShopPropertiesView.as_view(), name='shop-properties'),
     path('properties/<uuid:pk>/', ShopPropertyDetailView.as_view(), name='shop-property-detail'),
     path('admin/properties/', AdminListCreatePropertyView.as_view(), name='admin-property-list-create'),
+    path('admin/properties/export/', AdminPropertyExportView.as_view(), name='admin-property-export'),
+    path('admin/properties/import/', AdminPropertyImportView.as_view(), name='admin-property-import'),
     path('admin/properties/<uuid:pk>/', AdminDetailedPropertyView.as_view(), name='admin-property-detail'),
 ]
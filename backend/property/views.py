@@ -1,4 +1,11 @@
+from backend.cache import CachedResponseMixin
+from backend.catalog import CatalogExportView, CatalogImportView
+from backend.conditional import ConditionalGetMixin
+from backend.pagination import KeysetPagination
+from backend.transactions import AtomicWritesMixin
+from django.db import transaction
 from rest_framework import generics, permissions
+from .catalog import property_catalog
 from .models import Property
 from .serializers import PropertySerializer
 from rest_framework.views import APIView
@@ -6,7 +13,7 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 
-class DashboardPropertyListCreateView(generics.ListCreateAPIView):
+class DashboardPropertyListCreateView(AtomicWritesMixin, generics.ListCreateAPIView):
     """
     GET /dashboard-properties/
        -> List properties owned by the current user.
@@ -17,13 +24,13 @@ class DashboardPropertyListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Property.objects.filter(owner=self.request.user)
+        return Property.objects.filter(owner=self.request.user).with_images()
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class DashboardPropertyRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class DashboardPropertyRetrieveUpdateDestroyView(AtomicWritesMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET /dashboard-properties/<uuid:pk>/
        -> Retrieve a property (only if owned by the user).
@@ -37,20 +44,25 @@ class DashboardPropertyRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyA
     lookup_field = 'pk'
 
     def get_queryset(self):
-        return Property.objects.filter(owner=self.request.user)
+        return Property.objects.filter(owner=self.request.user).with_images()
 
 
 
-class ShopPropertiesView(generics.ListAPIView):
+class ShopPropertiesView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """
     GET /shop-properties/
-       -> List active properties with optional filters.
+       -> List active properties with optional filters, newest first.
+          Cursor paginated (?cursor=...&page_size=...).
+          Answers 304 to a current If-None-Match.
+          Pages are cached server-side until a property changes.
     """
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    cache_namespace = 'shop-properties'
 
-    def get_queryset(self):
-        filters = {'is_active': True}
+    def get_filters(self):
+        filters = {}
         # Apply filters from query parameters if present:
         if self.request.query_params.get('owner'):
             filters['owner_id'] = self.request.query_params.get('owner')
@@ -62,20 +74,31 @@ class ShopPropertiesView(generics.ListAPIView):
             filters['rent_per_month__lte'] = float(self.request.query_params.get('max_rent'))
         if self.request.query_params.get('sharing'):
             filters['sharing'] = int(self.request.query_params.get('sharing'))
-        return Property.objects.filter(**filters)
+        return filters
+
+    def get_queryset(self):
+        return Property.objects.shop().filter(**self.get_filters()).for_serializer().with_thumbnail()
 
+    def get_cache_params(self):
+        return {
+            'filters': self.get_filters(),
+            'cursor': self.request.query_params.get(self.paginator.cursor_query_param),
+            'page_size': self.paginator.get_page_size(self.request),
+        }
 
-class ShopPropertyDetailView(generics.RetrieveAPIView):
+
+class ShopPropertyDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     GET /shop-properties/<uuid:pk>/
        -> Retrieve details of a single active property.
+          Answers 304 to a current If-None-Match / If-Modified-Since.
     """
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'pk'
 
     def get_queryset(self):
-        return Property.objects.filter(is_active=True)
+        return Property.objects.shop().with_images()
 
 
 class TogglePropertyAvailabilityView(APIView):
@@ -86,6 +109,7 @@ class TogglePropertyAvailabilityView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request, pk):
         property_obj = get_object_or_404(Property, pk=pk, owner=request.user)
         property_obj.is_active = not property_obj.is_active
@@ -94,7 +118,7 @@ class TogglePropertyAvailabilityView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class AdminListCreatePropertyView(generics.ListCreateAPIView):
+class AdminListCreatePropertyView(AtomicWritesMixin, generics.ListCreateAPIView):
     """
     Admin view for properties with full CRUD access.
 
@@ -104,14 +128,14 @@ class AdminListCreatePropertyView(generics.ListCreateAPIView):
        -> Create a property.
     """
     serializer_class = PropertySerializer
-    queryset = Property.objects.all()
+    queryset = Property.objects.with_images()
     permission_classes = [permissions.IsAdminUser]
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class AdminDetailedPropertyView(generics.RetrieveUpdateDestroyAPIView):
+class AdminDetailedPropertyView(AtomicWritesMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Admin view for properties with full CRUD access.
     GET /admin/properties/<uuid:pk>/
@@ -122,7 +146,7 @@ class AdminDetailedPropertyView(generics.RetrieveUpdateDestroyAPIView):
        -> Hard delete the property (permanently remove from the database).
     """
     serializer_class = PropertySerializer
-    queryset = Property.objects.all()
+    queryset = Property.objects.with_images()
     permission_classes = [permissions.IsAdminUser]
     lookup_field = 'pk'
 
@@ -131,4 +155,21 @@ class AdminDetailedPropertyView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_destroy(self, instance):
         # Hard delete: permanently remove the property from the database.
-        instance.delete()
\ No newline at end of file
+        instance.delete()
+
+
+class AdminPropertyExportView(CatalogExportView):
+    """
+    GET /admin/properties/export/?format=csv|jsonl
+       -> Every property, streamed.
+    """
+    catalog = property_catalog
+
+
+class AdminPropertyImportView(CatalogImportView):
+    """
+    POST /admin/properties/import/
+       -> Create properties from an uploaded CSV or JSON Lines ``file``,
+          owned by the admin; streams progress.
+    """
+    catalog = property_catalog
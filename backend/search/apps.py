@@ -6,5 +6,6 @@ class SearchConfig(AppConfig):
     name = 'search'
 
     def ready(self):
-            from . import meilisearch_integration
-            meilisearch_integration.meilisearch_index.initialize_index()
+        # Only register signal receivers here: index setup talks to Meilisearch
+        # and is a deploy step instead (the reconcile_search_indexes command).
+        from . import signals  # noqa: F401
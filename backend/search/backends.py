@@ -0,0 +1,278 @@
+import logging
+import time
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Greatest
+from django.utils.module_loading import import_string
+from product.models import Product, ProductImage
+from property.models import Property, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBackendError(Exception):
+    """The backend could not answer; another one may."""
+
+
+class InvalidSearchQuery(Exception):
+    """The query itself is invalid; no backend will accept it."""
+
+
+class BaseSearchBackend:
+    kinds = ()
+
+    def supports(self, kind, query):
+        return kind in self.kinds
+
+    def search(self, kind, query):
+        """
+        Run ``query`` (a validated SearchQuerySerializer) against the ``kind``
+        collection and return ``{'hits': [...], 'facets': {...}, 'total': n}``.
+        """
+        raise NotImplementedError
+
+    async def asearch(self, kind, query):
+        """``search()`` for async views; in a thread unless overridden"""
+        return await sync_to_async(self.search)(kind, query)
+
+
+class MeilisearchBackend(BaseSearchBackend):
+    """
+    Search through the shared Meilisearch clients of search.client, which
+    (with the meilisearch package) are only imported on the first search, to
+    keep it out of process startup.
+    """
+    kinds = ('products', 'properties')
+
+    def search(self, kind, query):
+        from .client import get_client
+
+        try:
+            results = get_client().index(kind).search(query.validated_data['q'], query.get_search_params())
+        except Exception as e:
+            self.raise_error(e)
+        return self.to_results(results)
+
+    async def asearch(self, kind, query):
+        from .client import get_async_client
+
+        try:
+            results = await get_async_client().search(kind, query.validated_data['q'], query.get_search_params())
+        except Exception as e:
+            self.raise_error(e)
+        return self.to_results(results)
+
+    @staticmethod
+    def raise_error(e):
+        from meilisearch.errors import MeilisearchApiError
+
+        if isinstance(e, MeilisearchApiError) and e.type == 'invalid_request':
+            raise InvalidSearchQuery(e.message)
+        raise SearchBackendError(str(e))
+
+    @staticmethod
+    def to_results(results):
+        return {
+            'hits': results['hits'],
+            'facets': results.get('facetDistribution', {}),
+            'total': results.get('totalHits', results.get('estimatedTotalHits', 0)),
+        }
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Full-text search on the trigger-maintained ``search_vector`` columns,
+    widened with ``pg_trgm`` similarity on short text fields so that typos
+    still match. Ranks by the sum of both scores.
+    """
+    kinds = ('products', 'properties')
+    config = 'english'
+
+    def supports(self, kind, query):
+        # Raw filter expressions are Meilisearch syntax; geo search needs its _geo index.
+        return (
+            super().supports(kind, query)
+            and not query.validated_data.get('filter')
+            and not getattr(query, 'is_geo', False)
+        )
+
+    def search(self, kind, query):
+        return self.paginate(query, *getattr(self, f'query_{kind}')(query))
+
+    async def asearch(self, kind, query):
+        return await self.apaginate(query, *getattr(self, f'query_{kind}')(query))
+
+    def query_products(self, query):
+        """``(matches, hit rows, facet fields)`` querysets of a product search"""
+        data = query.validated_data
+        products = Product.objects.shop()
+        if data.get('category'):
+            products = products.filter(category__in=data['category'])
+        if data.get('brand'):
+            products = products.filter(brand__in=data['brand'])
+        if 'min_price' in data:
+            products = products.filter(selling_price__gte=data['min_price'])
+        if 'max_price' in data:
+            products = products.filter(selling_price__lte=data['max_price'])
+        if 'is_ad' in data:
+            products = products.filter(is_ad=data['is_ad'] == 'true')
+        products = self.match(products, data['q'], ['title'])
+
+        thumbnail = ProductImage.objects.filter(product=OuterRef('pk'), is_primary=True).values('url')[:1]
+        rows = products.annotate(
+            category_name=F('category__name'),
+            thumbnail=Subquery(thumbnail),
+        ).values(
+            'id', 'title', 'brand', 'category', 'category_name', 'thumbnail', 'selling_price', 'mrp', 'is_ad',
+        )
+        return products, rows, {'category_name': 'category__name'}
+
+    def query_properties(self, query):
+        data = query.validated_data
+        properties = Property.objects.filter(is_active=True, deleted=False)
+        if 'min_rent' in data:
+            properties = properties.filter(rent_per_month__gte=data['min_rent'])
+        if 'max_rent' in data:
+            properties = properties.filter(rent_per_month__lte=data['max_rent'])
+        if 'max_deposit' in data:
+            properties = properties.filter(security_deposit__lte=data['max_deposit'])
+        if 'sharing' in data:
+            properties = properties.filter(sharing=data['sharing'])
+        if 'min_vacancy' in data:
+            properties = properties.filter(available_vacancy__gte=data['min_vacancy'])
+        if 'furnished' in data:
+            properties = properties.filter(furnished=data['furnished'] == 'true')
+        properties = self.match(properties, data['q'], ['title', 'location'])
+
+        thumbnail = PropertyImage.objects.filter(property=OuterRef('pk'), is_primary=True).values('url')[:1]
+        rows = properties.annotate(thumbnail=Subquery(thumbnail)).values(
+            'id', 'title', 'location', 'thumbnail', 'rent_per_month', 'security_deposit', 'furnished',
+            'sharing', 'available_vacancy',
+        )
+        return properties, rows, {}
+
+    def match(self, queryset, q, trigram_fields):
+        if not q:
+            return queryset
+        search_query = SearchQuery(q, search_type='websearch', config=self.config)
+        similarities = [TrigramSimilarity(field, q) for field in trigram_fields]
+        similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        matches = Q(search_vector=search_query)
+        for field in trigram_fields:
+            matches |= Q(**{f'{field}__trigram_similar': q})
+        return queryset.filter(matches).annotate(
+            rank=SearchRank(F('search_vector'), search_query) + similarity,
+        )
+
+    def paginate(self, query, queryset, rows, facet_fields):
+        hits, facets = self.page(query, queryset, rows, facet_fields)
+        return {
+            'hits': [self.to_json(row) for row in hits],
+            'facets': {
+                facet: {self.facet_key(value): count for value, count in counts if value is not None}
+                for facet, counts in facets.items()
+            },
+            'total': queryset.count(),
+        }
+
+    async def apaginate(self, query, queryset, rows, facet_fields):
+        """``paginate()`` through the async ORM interface"""
+        hits, facets = self.page(query, queryset, rows, facet_fields)
+        return {
+            'hits': [self.to_json(row) async for row in hits],
+            'facets': {
+                facet: {self.facet_key(value): count async for value, count in counts if value is not None}
+                for facet, counts in facets.items()
+            },
+            'total': await queryset.acount(),
+        }
+
+    def page(self, query, queryset, rows, facet_fields):
+        """Querysets of the requested page of ``rows`` and of each requested facet's counts"""
+        data = query.validated_data
+        ordering = [
+            f"{'-' if key.endswith(':desc') else ''}{key.split(':')[0]}" for key in data.get('sort', [])
+        ]
+        if data['q']:
+            ordering.append('-rank')
+        ordering += ['-created_at', 'id']
+
+        offset, limit = query.get_window()
+        facets = {
+            facet: queryset.order_by().values_list(facet_fields.get(facet, facet)).annotate(count=Count('pk'))
+            for facet in data.get('facets', [])
+        }
+        return rows.order_by(*ordering)[offset:offset + limit], facets
+
+    @staticmethod
+    def facet_key(value):
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return str(value)
+
+    @staticmethod
+    def to_json(row):
+        """Match the value types of Meilisearch hits"""
+        for key, value in row.items():
+            if isinstance(value, Decimal):
+                row[key] = float(value)
+            elif isinstance(value, uuid.UUID):
+                row[key] = str(value)
+        return row
+
+
+class FailoverSearch:
+    """
+    Tries the backends of ``settings.SEARCH_BACKENDS`` in order. A backend
+    that fails is skipped for ``SEARCH_FAILOVER_COOLDOWN`` seconds, so an
+    outage costs one failed attempt per cooldown instead of one per request.
+    """
+
+    def __init__(self, backends, cooldown):
+        self.backends = backends
+        self.cooldown = cooldown
+        self.down_until = {}
+
+    def search(self, kind, query):
+        for backend in self.available(kind, query):
+            try:
+                return backend.search(kind, query)
+            except SearchBackendError as e:
+                self.failed(backend, e)
+        raise SearchBackendError(f'No search backend available for {kind}')
+
+    async def asearch(self, kind, query):
+        for backend in self.available(kind, query):
+            try:
+                return await backend.asearch(kind, query)
+            except SearchBackendError as e:
+                self.failed(backend, e)
+        raise SearchBackendError(f'No search backend available for {kind}')
+
+    def available(self, kind, query):
+        for backend in self.backends:
+            if backend.supports(kind, query) and self.down_until.get(type(backend).__name__, 0) <= time.monotonic():
+                yield backend
+
+    def failed(self, backend, error):
+        name = type(backend).__name__
+        logger.warning("Search backend %s failed, failing over: %s", name, error)
+        self.down_until[name] = time.monotonic() + self.cooldown
+
+
+_search = None
+
+
+def get_search():
+    global _search
+    if _search is None:
+        _search = FailoverSearch(
+            [import_string(path)() for path in settings.SEARCH_BACKENDS],
+            getattr(settings, 'SEARCH_FAILOVER_COOLDOWN', 30),
+        )
+    return _search
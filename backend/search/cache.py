@@ -0,0 +1,3 @@
+from backend.cache import ResponseCache
+
+search_cache = ResponseCache.from_settings('SEARCH_CACHE', prefix='search')
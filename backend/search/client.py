@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from meilisearch import Client
+from meilisearch._httprequests import HttpRequests
+from meilisearch.errors import MeilisearchApiError, MeilisearchCommunicationError, MeilisearchTimeoutError
+from meilisearch.models.task import TaskInfo
+
+from backend.metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+
+class MeilisearchUnavailable(MeilisearchCommunicationError):
+    """Refused without calling Meilisearch: the circuit breaker is open."""
+
+
+def is_outage(error):
+    """Whether a failed call says Meilisearch is down, rather than the call being wrong"""
+    if isinstance(error, (MeilisearchCommunicationError, MeilisearchTimeoutError)):
+        return True
+    return isinstance(error, MeilisearchApiError) and error.status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Stops calling Meilisearch for ``reset_timeout`` seconds after
+    ``failure_threshold`` consecutive outage errors, so that callers fail at
+    once instead of each waiting out the timeouts. Then one call is let
+    through as a probe: it closes the breaker again if it succeeds and
+    reopens it if it fails. Shared by the threads and event loops of a
+    process.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise MeilisearchUnavailable('Meilisearch circuit breaker is open')
+            self.probing = True
+
+    def record(self, error=None):
+        """Account the outcome of a call let through by ``before_call()``"""
+        with self._lock:
+            if error is None or not is_outage(error):
+                if self.opened_at is not None:
+                    logger.info("Meilisearch is reachable again, closing the circuit breaker")
+                self.failures = 0
+                self.opened_at = None
+                self.probing = False
+                return
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if not self.probing:
+                    logger.warning(
+                        "Meilisearch failed %d times in a row, opening the circuit breaker for %ss: %s",
+                        self.failures, self.reset_timeout, error,
+                    )
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def cancel(self):
+        """
+        Account a call let through by ``before_call()`` that ended without an
+        outcome (cancelled, interrupted), so that a probe cut short does not
+        keep the breaker half-open and refusing every call.
+        """
+        with self._lock:
+            self.probing = False
+
+
+class InstrumentedHttpRequests(HttpRequests):
+    """
+    Sends the calls of meilisearch.Client through a shared ``requests.Session``
+    (whose connections are kept alive) and a CircuitBreaker, and accounts
+    them to the current request (see backend.metrics).
+    """
+
+    def __init__(self, config, session, breaker):
+        super().__init__(config)
+        self.session = session
+        self.breaker = breaker
+
+    def send_request(self, http_method, *args, **kwargs):
+        # http_method is requests.get, requests.post, ...: one connection per call
+        http_method = getattr(self.session, http_method.__name__)
+        self.breaker.before_call()
+        try:
+            with external_call('meilisearch'):
+                result = super().send_request(http_method, *args, **kwargs)
+        except Exception as e:
+            self.breaker.record(e)
+            raise
+        except BaseException:
+            # asyncio.CancelledError, KeyboardInterrupt, a worker timeout...
+            self.breaker.cancel()
+            raise
+        self.breaker.record()
+        return result
+
+
+class MeilisearchClient(Client):
+    """
+    meilisearch.Client whose calls, and those of the indexes it hands out,
+    share one keep-alive session and circuit breaker and are timed into the
+    request metrics and Server-Timing header. ``timeout`` may be a
+    ``(connect, read)`` pair of seconds.
+    """
+
+    def __init__(self, url, api_key=None, breaker=None, pool_size=10, **kwargs):
+        super().__init__(url, api_key, **kwargs)
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.http = self.make_http()
+        self.task_handler.http = self.make_http()
+
+    def make_http(self):
+        return InstrumentedHttpRequests(self.config, self.session, self.breaker)
+
+    def index(self, uid):
+        index = super().index(uid)
+        index.http = self.make_http()
+        index.task_handler.http = self.make_http()
+        return index
+
+    # The parent's versions go through an Index of their own, outside of the session
+
+    def get_index(self, uid):
+        return self.index(uid).fetch_info()
+
+    def create_index(self, uid, options=None):
+        return TaskInfo(**self.http.post(self.config.paths.index, {**(options or {}), 'uid': uid}))
+
+
+class AsyncMeilisearchClient:
+    """
+    The few Meilisearch calls the async views make, over an httpx.AsyncClient
+    that keeps connections alive and bounds every call by the timeouts of
+    ``settings.MEILISEARCH_HTTP``. Raises the errors meilisearch.Client does.
+    """
+
+    def __init__(self, url, api_key=None, options=None, breaker=None):
+        options = options or {}
+        self.breaker = breaker or CircuitBreaker()
+        headers = {'Authorization': f'Bearer {api_key}'} if api_key else {}
+        self.http = httpx.AsyncClient(
+            base_url=url,
+            headers=headers,
+            timeout=httpx.Timeout(options.get('TIMEOUT', 5), connect=options.get('CONNECT_TIMEOUT', 1)),
+            limits=httpx.Limits(
+                max_connections=options.get('MAX_CONNECTIONS', 100),
+                max_keepalive_connections=options.get('MAX_KEEPALIVE_CONNECTIONS', 20),
+                keepalive_expiry=options.get('KEEPALIVE_EXPIRY', 30),
+            ),
+        )
+
+    async def request(self, method, path, body=None):
+        self.breaker.before_call()
+        try:
+            result = await self.send(method, path, body)
+        except Exception as e:
+            self.breaker.record(e)
+            raise
+        except BaseException:
+            # asyncio.CancelledError, KeyboardInterrupt, a worker timeout...
+            self.breaker.cancel()
+            raise
+        self.breaker.record()
+        return result
+
+    async def send(self, method, path, body):
+        with external_call('meilisearch'):
+            try:
+                response = await self.http.request(method, path, json=body)
+            except httpx.TimeoutException as e:
+                raise MeilisearchTimeoutError(str(e)) from e
+            except httpx.TransportError as e:
+                raise MeilisearchCommunicationError(str(e)) from e
+        if response.is_error:
+            raise MeilisearchApiError(str(response.status_code), response)
+        return response.json()
+
+    async def search(self, index, query, params=None):
+        """Like ``Client.index(index).search(query, params)``"""
+        return await self.request('POST', f'/indexes/{index}/search', {'q': query, **(params or {})})
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def http_options():
+    return getattr(settings, 'MEILISEARCH_HTTP', {})
+
+
+_breaker = None
+_client = None
+# httpx connection pools belong to the event loop they were opened in
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_breaker():
+    """The CircuitBreaker of this process, shared by the sync and async clients"""
+    global _breaker
+    if _breaker is None:
+        options = http_options()
+        _breaker = CircuitBreaker(options.get('FAILURE_THRESHOLD', 5), options.get('RESET_TIMEOUT', 30))
+    return _breaker
+
+
+def get_client():
+    """
+    The MeilisearchClient of this process, built on first use rather than
+    at import, so that starting a process does not depend on Meilisearch.
+    """
+    global _client
+    if _client is None:
+        options = http_options()
+        _client = MeilisearchClient(
+            settings.MEILISEARCH_URL,
+            settings.MEILISEARCH_API_KEY,
+            breaker=get_breaker(),
+            pool_size=options.get('MAX_KEEPALIVE_CONNECTIONS', 20),
+            timeout=(options.get('CONNECT_TIMEOUT', 1), options.get('TIMEOUT', 5)),
+        )
+    return _client
+
+
+def get_async_client():
+    """
+    The AsyncMeilisearchClient of the running event loop: one pool per ASGI
+    worker, shared by all of its requests. It is closed when its loop shuts
+    down, which under WSGI happens after every request: Django runs each
+    async view in an event loop of its own there.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncMeilisearchClient(
+            settings.MEILISEARCH_URL,
+            settings.MEILISEARCH_API_KEY,
+            http_options(),
+            breaker=get_breaker(),
+        )
+        # Held by the client: the loop only keeps weak references to its tasks
+        client.closer = loop.create_task(close_with_loop(loop, client))
+    return client
+
+
+async def close_with_loop(loop, client):
+    """
+    Close ``client`` once ``loop`` shuts down. asyncio.run() and asgiref
+    cancel the tasks still pending when their coroutine returns, and then
+    run the loop until those have finished.
+    """
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if _async_clients.get(loop) is client:
+            del _async_clients[loop]
+        await client.aclose()
+
+
+def reset_clients():
+    """Drop the clients, to be rebuilt from the current settings on next use"""
+    global _breaker, _client
+    _breaker = None
+    _client = None
+    _async_clients.clear()
@@ -0,0 +1,39 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from ... import outbox
+
+PRUNE_INTERVAL = 60  # Seconds between deletions of old processed entries
+
+
+class Command(BaseCommand):
+    help = 'Push queued search index changes to Meilisearch in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait when there is nothing to do')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox has no ready entries')
+        parser.add_argument('--stats', action='store_true', help='Print outbox lag metrics as JSON and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox.stats()))
+            return
+
+        pruned_at = None
+        while True:
+            if pruned_at is None or time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                outbox.prune()
+                pruned_at = time.monotonic()
+            processed, failed = outbox.drain(options['batch_size'])
+            if failed:
+                self.stderr.write(f"{failed} changes failed and will be retried, see the outbox's last_error")
+            if processed:
+                self.stdout.write(f"Indexed {processed} changes, outbox: {json.dumps(outbox.stats())}")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
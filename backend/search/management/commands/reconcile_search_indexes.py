@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Create missing Meilisearch indexes and bring their settings in line with the code. '
+        'Idempotent: indexes that already match are left alone. Run it as a deploy step.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report differences, and exit with an error if there are any')
+        parser.add_argument('--task-timeout', type=int, default=120,
+                            help='Seconds to wait for each Meilisearch task')
+
+    def handle(self, *args, **options):
+        self.options = options
+        drifted = []
+        for search_index in outbox.get_indexes().values():
+            try:
+                drift = search_index.settings_drift()
+            except Exception as e:
+                raise CommandError(f"Could not read the settings of index {search_index.name}: {e}")
+
+            if drift == []:
+                self.stdout.write(f"{search_index.name}: up to date")
+                continue
+            drifted.append(search_index.name)
+            if drift is None:
+                self.stdout.write(f"{search_index.name}: missing")
+                if not options['check']:
+                    self.wait(search_index, search_index.initialize_index())
+                    self.stdout.write(self.style.SUCCESS(f"{search_index.name}: created"))
+            else:
+                self.stdout.write(f"{search_index.name}: {', '.join(drift)} differ")
+                if not options['check']:
+                    changes = {name: search_index.index_settings[name] for name in drift}
+                    self.wait(search_index, search_index.index.update_settings(changes))
+                    self.stdout.write(self.style.SUCCESS(f"{search_index.name}: updated"))
+
+        if options['check'] and drifted:
+            raise CommandError(f"Index settings out of date: {', '.join(drifted)}")
+
+    def wait(self, search_index, task_info):
+        task = search_index.client.wait_for_task(
+            task_info.task_uid,
+            timeout_in_ms=self.options['task_timeout'] * 1000,
+            interval_in_ms=200,
+        )
+        if task.status != 'succeeded':
+            raise CommandError(f"Meilisearch task {task.uid} {task.status}: {task.error}")
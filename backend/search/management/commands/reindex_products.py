@@ -0,0 +1,133 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ... import outbox
+from ...meilisearch_integration import meilisearch_index
+from ...models import IndexOutbox
+
+# Also replay changes made just before the run started, whose transactions
+# may have committed after it read their rows.
+REPLAY_MARGIN = timedelta(minutes=1)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the products search index into a fresh index and swap it in without downtime'
+    search_index = meilisearch_index
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents per add_documents call')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+        parser.add_argument('--concurrency', type=int, default=4, help='Maximum batches in flight')
+        parser.add_argument('--task-timeout', type=int, default=120,
+                            help='Seconds to wait for each Meilisearch task')
+        parser.add_argument('--checkpoint', default='reindex_products.checkpoint.json',
+                            help='File recording progress, for --resume')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its checkpoint')
+
+    def handle(self, *args, **options):
+        self.options = options
+        search_index = self.search_index
+        client = search_index.client
+
+        if options['resume']:
+            state = self.load_checkpoint()
+        else:
+            state = {
+                'staging': f"{search_index.name}_{timezone.now():%Y%m%d%H%M%S}",
+                'started_at': timezone.now().isoformat(),
+                'last_pk': None,
+            }
+            self.wait(search_index.initialize_index(state['staging']))
+            self.save_checkpoint(state)
+
+        staging = client.index(state['staging'])
+        queryset = search_index.queryset().order_by('pk')
+        if state['last_pk']:
+            queryset = queryset.filter(pk__gt=state['last_pk'])
+        total = queryset.count()
+        rows = queryset.iterator(chunk_size=self.options['chunk_size'])
+
+        # Batches are confirmed in submission order, so the checkpoint only
+        # ever points past documents Meilisearch has actually indexed.
+        done = 0
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            while batch := list(islice(rows, options['batch_size'])):
+                documents = [search_index.to_dict(instance) for instance in batch]
+                in_flight.append((executor.submit(self.send, staging, documents), documents[-1]['id'], len(documents)))
+                if len(in_flight) >= options['concurrency']:
+                    done += self.confirm(in_flight.popleft(), state, done, total)
+            while in_flight:
+                done += self.confirm(in_flight.popleft(), state, done, total)
+
+        # Swapping needs both indexes to exist; creating an existing one just fails its task.
+        client.wait_for_task(client.create_index(search_index.name, {'primaryKey': 'id'}).task_uid)
+        self.wait(client.swap_indexes([{'indexes': [search_index.name, state['staging']]}]))
+        self.wait(client.delete_index(state['staging']))  # Now holds the previous documents
+
+        # The outbox worker kept writing to the old index while we streamed;
+        # replay everything touched since the run started onto the new one.
+        # The outbox keeps processed entries, deletes included, and the drain
+        # deletes the documents of objects that no longer exist; updated_at
+        # also catches writes that bypassed the signals.
+        started_at = parse_datetime(state['started_at'])
+        if timezone.now() - started_at > outbox.RETENTION:
+            self.stderr.write(self.style.WARNING(
+                f"The run started more than {outbox.RETENTION} ago and the outbox may no longer hold "
+                "every change made since; deleted objects may remain searchable until the next full reindex."
+            ))
+        since = started_at - REPLAY_MARGIN
+        changed = outbox.changed_since(search_index.name, since)
+        changed.update(
+            str(pk) for pk in search_index.queryset().filter(updated_at__gte=since).values_list('pk', flat=True)
+        )
+        outbox.enqueue(search_index.name, sorted(changed), IndexOutbox.UPSERT)
+
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully reindexed {done} {search_index.name}'))
+
+    def send(self, index, documents):
+        self.wait(index.add_documents(documents))
+
+    def confirm(self, entry, state, done, total):
+        future, last_pk, count = entry
+        try:
+            future.result()
+        except Exception as e:
+            raise CommandError(f"Batch failed ({e}); rerun with --resume to continue from the last checkpoint")
+        state['last_pk'] = last_pk
+        self.save_checkpoint(state)
+        self.stdout.write(f"Indexed {done + count}/{total}")
+        return count
+
+    def wait(self, task_info):
+        task = self.search_index.client.wait_for_task(
+            task_info.task_uid,
+            timeout_in_ms=self.options['task_timeout'] * 1000,
+            interval_in_ms=200,
+        )
+        if task.status != 'succeeded':
+            raise CommandError(f"Meilisearch task {task.uid} {task.status}: {task.error}")
+        return task
+
+    def load_checkpoint(self):
+        try:
+            with open(self.options['checkpoint']) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"No checkpoint found at {self.options['checkpoint']}")
+
+    def save_checkpoint(self, state):
+        tmp = f"{self.options['checkpoint']}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.options['checkpoint'])
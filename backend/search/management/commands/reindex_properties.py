@@ -0,0 +1,11 @@
+from ...meilisearch_integration import meilisearch_property_index
+from .reindex_products import Command as ReindexCommand
+
+
+class Command(ReindexCommand):
+    help = 'Rebuild the properties search index into a fresh index and swap it in without downtime'
+    search_index = meilisearch_property_index
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(checkpoint='reindex_properties.checkpoint.json')
@@ -1 +1 @@
-from ...meilisearch_integration import SyncMeilisearchCommand as Command
\ No newline at end of file
+from .reindex_products import Command
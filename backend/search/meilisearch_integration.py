@@ -1,11 +1,10 @@
-from django.core.management.base import BaseCommand
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from meilisearch import Client
-from django.conf import settings
 from datetime import datetime
 from decimal import Decimal
+from meilisearch.errors import MeilisearchApiError
 from product.models import Product
+from property.models import Property
+
+from .client import get_client
 
 
 def format_decimal(value):
@@ -13,46 +12,104 @@ def format_decimal(value):
         return float(value)
     return value
 
-class MeilisearchProductIndex:
-    def __init__(self):
-        self.client = Client(settings.MEILISEARCH_URL, settings.MEILISEARCH_API_KEY)
-        self.index = self.client.index('products')
+class MeilisearchIndex:
+    """
+    One Meilisearch index mirroring a model. Subclasses set ``name`` and
+    ``index_settings`` and implement ``queryset()`` and ``to_dict()``.
+    """
+    name = None
+    index_settings = {}
+    # Meilisearch hands these back sorted, whatever order they were set in
+    unordered_settings = ('filterableAttributes', 'sortableAttributes')
+
+    @property
+    def client(self):
+        return get_client()
+
+    @property
+    def index(self):
+        return self.client.index(self.name)
 
-    def initialize_index(self):
-        """Create and configure the products index"""
+    def initialize_index(self, uid=None):
+        """Create and configure the index, or a staging index named ``uid``"""
+        uid = uid or self.name
         try:
-            self.client.create_index('products', {'primaryKey': 'id'})
+            self.client.create_index(uid, {'primaryKey': 'id'})
         except Exception:
             # Index might already exist
             pass
 
         # Configure index settings
-        self.index.update_settings({
-            'searchableAttributes': [
-                'title',
-                'description',
-                'brand',
-                'extra_features'
-            ],
-            'filterableAttributes': [
-                'category',
-                'brand',
-                'is_ad',
-                'is_sold',
-                'owner_id',
-                'selling_price',
-                'mrp'
-            ],
-            'sortableAttributes': [
-                'created_at',
-                'updated_at',
-                'selling_price',
-                'mrp'
-            ]
-        })
+        return self.client.index(uid).update_settings(self.index_settings)
+
+    def settings_drift(self):
+        """
+        Names of the ``index_settings`` the live index does not have, or None
+        when the index does not exist at all
+        """
+        try:
+            current = self.index.get_settings()
+        except MeilisearchApiError as e:
+            if e.code == 'index_not_found':
+                return None
+            raise
+        return [
+            name for name, value in self.index_settings.items()
+            if self.normalize_setting(name, current.get(name)) != self.normalize_setting(name, value)
+        ]
+
+    def normalize_setting(self, name, value):
+        return sorted(value) if name in self.unordered_settings and value is not None else value
+
+    def queryset(self):
+        """Rows with the relations to_dict reads"""
+        raise NotImplementedError
+
+    def to_dict(self, instance):
+        """Convert a model instance to a Meilisearch document"""
+        raise NotImplementedError
+
+    def get_documents(self, ids):
+        """Meilisearch documents for the rows with the given ids that still exist"""
+        return [self.to_dict(instance) for instance in self.queryset().filter(pk__in=ids)]
+
+
+class MeilisearchProductIndex(MeilisearchIndex):
+    name = 'products'
+    index_settings = {
+        'searchableAttributes': [
+            'title',
+            'description',
+            'brand',
+            'extra_features'
+        ],
+        'filterableAttributes': [
+            'category',
+            'category_name',
+            'brand',
+            'is_ad',
+            'is_sold',
+            'is_active',
+            'deleted',
+            'owner_id',
+            'selling_price',
+            'mrp'
+        ],
+        'sortableAttributes': [
+            'created_at',
+            'updated_at',
+            'selling_price',
+            'mrp'
+        ]
+    }
+
+    def queryset(self):
+        """Products with the relations product_to_dict reads"""
+        return Product.objects.select_related('category').prefetch_related('images')
 
     def product_to_dict(self, product):
         """Convert a Product instance to a Meilisearch document"""
+        images = [image.url for image in product.images.all()]
         return {
             'id': str(product.id),
             'title': product.title,
@@ -61,63 +118,88 @@ class MeilisearchProductIndex:
             'category': str(product.category_id) if product.category else None,
             'category_name': product.category.name if product.category else None,
             'brand': product.brand,
-            'images': product.images.split(',') if product.images else [],
+            'images': images,
+            'thumbnail': images[0] if images else None,
             'quantity': product.quantity,
             'mrp': format_decimal(product.mrp),
             'selling_price': format_decimal(product.selling_price),
             'is_ad': product.is_ad,
             'is_sold': product.is_sold,
-            'extra_features': product.extra_features or {},
+            'is_active': product.is_active,
+            'deleted': product.deleted,
+            'extra_features': product.extra_features or [],
             'created_at': product.created_at.isoformat() if product.created_at else None,
             'updated_at': product.updated_at.isoformat() if product.updated_at else None
         }
 
-# Initialize Meilisearch index manager
-meilisearch_index = MeilisearchProductIndex()
+    to_dict = product_to_dict
+
 
-@receiver(post_save, sender=Product)
-def update_meilisearch(sender, instance, created, **kwargs):
-    """Update or create product document in Meilisearch when a product is saved"""
-    try:
-        product_data = meilisearch_index.product_to_dict(instance)
-        meilisearch_index.index.add_documents([product_data])
-    except Exception as e:
-        # Log the error but don't break the save operation
-        print(f"Meilisearch update error: {e}")
-
-@receiver(post_delete, sender=Product)
-def delete_from_meilisearch(sender, instance, **kwargs):
-    """Delete product document from Meilisearch when a product is deleted"""
-    try:
-        meilisearch_index.index.delete_document(str(instance.id))
-    except Exception as e:
-        # Log the error but don't break the delete operation
-        print(f"Meilisearch delete error: {e}")
-
-class SyncMeilisearchCommand(BaseCommand):
-    help = 'Sync all products to Meilisearch'
-
-    def handle(self, *args, **kwargs):
-
-        # Initialize index
-        meilisearch_index.initialize_index()
-
-        # Get all products
-        products = Product.objects.select_related('category').all()
-
-        # Convert to Meilisearch documents
-        products_data = [
-            meilisearch_index.product_to_dict(product)
-            for product in products
+class MeilisearchPropertyIndex(MeilisearchIndex):
+    name = 'properties'
+    index_settings = {
+        'searchableAttributes': [
+            'title',
+            'location',
+            'description',
+            'custom_features'
+        ],
+        'filterableAttributes': [
+            '_geo',
+            'rent_per_month',
+            'security_deposit',
+            'sharing',
+            'furnished',
+            'available_vacancy',
+            'is_active',
+            'deleted',
+            'owner_id'
+        ],
+        'sortableAttributes': [
+            '_geo',
+            'created_at',
+            'rent_per_month',
+            'security_deposit'
         ]
+    }
 
-        # Batch add to Meilisearch
-        if products_data:
-            meilisearch_index.index.add_documents(products_data)
-            self.stdout.write(
-                self.style.SUCCESS(f'Successfully synced {len(products_data)} products')
-            )
-        else:
-            self.stdout.write(
-                self.style.WARNING('No products found to sync')
-            )
\ No newline at end of file
+    def queryset(self):
+        """Properties with the relations property_to_dict reads"""
+        return Property.objects.prefetch_related('images')
+
+    def property_to_dict(self, property_obj):
+        """Convert a Property instance to a Meilisearch document"""
+        images = [image.url for image in property_obj.images.all()]
+        document = {
+            'id': str(property_obj.id),
+            'title': property_obj.title,
+            'description': property_obj.description,
+            'owner_id': str(property_obj.owner_id),
+            'location': property_obj.location,
+            'images': images,
+            'thumbnail': images[0] if images else None,
+            'rent_per_month': format_decimal(property_obj.rent_per_month),
+            'security_deposit': format_decimal(property_obj.security_deposit),
+            'furnished': property_obj.furnished,
+            'total_vacancy': property_obj.total_vacancy,
+            'available_vacancy': property_obj.available_vacancy,
+            'sharing': property_obj.sharing,
+            'is_active': property_obj.is_active,
+            'deleted': property_obj.deleted,
+            'custom_features': property_obj.custom_features or [],
+            'created_at': property_obj.created_at.isoformat() if property_obj.created_at else None,
+            'updated_at': property_obj.updated_at.isoformat() if property_obj.updated_at else None
+        }
+        if property_obj.latitude is not None and property_obj.longitude is not None:
+            # Meilisearch's reserved field for geo filtering and sorting.
+            document['_geo'] = {
+                'lat': format_decimal(property_obj.latitude),
+                'lng': format_decimal(property_obj.longitude),
+            }
+        return document
+
+    to_dict = property_to_dict
+
+# Index managers; their client is only built on first use
+meilisearch_index = MeilisearchProductIndex()
+meilisearch_property_index = MeilisearchPropertyIndex()
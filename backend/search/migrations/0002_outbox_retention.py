@@ -0,0 +1,34 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='indexoutbox',
+            name='search_outbox_ready_idx',
+        ),
+        migrations.AddField(
+            model_name='indexoutbox',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='indexoutbox',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['available_at', 'id'], name='search_outbox_ready_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indexoutbox',
+            index=models.Index(fields=['index_name', 'created_at'], name='search_outbox_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indexoutbox',
+            index=models.Index(condition=models.Q(('processed_at__isnull', False)), fields=['processed_at'], name='search_outbox_processed_idx'),
+        ),
+    ]
@@ -1,3 +1,46 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class IndexOutbox(models.Model):
+    """
+    A pending change to a search index.
+
+    Rows are written by model signals in the same transaction as the change
+    itself and drained in batches by ``manage.py drain_search_outbox``, so
+    writes never wait on (or get lost because of) the search engine.
+    Drained rows are kept for ``outbox.RETENTION`` so that a full reindex
+    can replay what changed while it ran, deletes included.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OPERATION_CHOICES = [(UPSERT, 'Upsert'), (DELETE, 'Delete')]
+
+    index_name = models.CharField(max_length=64)
+    object_id = models.CharField(max_length=64)
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)  # Not picked up before this (retry backoff)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)  # When Meilisearch applied the change
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                name='search_outbox_ready_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+            # Reindex replays (outbox.changed_since)
+            models.Index(fields=['index_name', 'created_at'], name='search_outbox_created_idx'),
+            # Pruning (outbox.prune)
+            models.Index(
+                fields=['processed_at'],
+                name='search_outbox_processed_idx',
+                condition=models.Q(processed_at__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} {self.index_name}/{self.object_id}"
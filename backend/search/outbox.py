@@ -0,0 +1,194 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .cache import search_cache
+from .models import IndexOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+BACKOFF_BASE = 5  # Seconds before the first retry, doubled on every failure
+BACKOFF_MAX = 15 * 60
+TASK_TIMEOUT = 30  # Seconds to wait for Meilisearch to process a batch
+LEASE = timedelta(minutes=10)  # How long claimed entries are hidden from other workers
+RETENTION = timedelta(days=1)  # How long drained entries are kept for reindex replays
+
+
+def enqueue(index_name, object_ids, operation):
+    """Record pending index changes; call inside the transaction making the change."""
+    IndexOutbox.objects.bulk_create(
+        IndexOutbox(index_name=index_name, object_id=str(object_id), operation=operation)
+        for object_id in object_ids
+    )
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def get_indexes():
+    from .meilisearch_integration import meilisearch_index, meilisearch_property_index
+
+    return {index.name: index for index in (meilisearch_index, meilisearch_property_index)}
+
+
+def push(search_index, upsert_ids, delete_ids):
+    """
+    Send one coalesced batch of changes to a single Meilisearch index.
+    Returns the tasks Meilisearch enqueued for it, as
+    ``(task info, object ids, documents sent)``.
+    """
+    tasks = []
+    if upsert_ids:
+        documents = search_index.get_documents(upsert_ids)
+        found = {document['id'] for document in documents}
+        # Objects gone from the database since they were queued.
+        delete_ids = delete_ids + [object_id for object_id in upsert_ids if object_id not in found]
+        if documents:
+            tasks.append((search_index.index.add_documents(documents), list(found), documents))
+    if delete_ids:
+        tasks.append((search_index.index.delete_documents(delete_ids), delete_ids, None))
+    return tasks
+
+
+def rejected(search_index, tasks):
+    """
+    Wait for ``tasks`` (see ``push()``) and return ``{object id: error}``
+    for the changes Meilisearch did not apply. Documents are validated
+    after the call returns (e.g. ``_geo``), and one invalid document fails
+    its whole task, so a failed batch of documents is sent again one
+    document at a time to find the ones at fault.
+    """
+    errors = {}
+    for task_info, object_ids, documents in tasks:
+        task = search_index.client.wait_for_task(
+            task_info.task_uid, timeout_in_ms=TASK_TIMEOUT * 1000, interval_in_ms=50,
+        )
+        if task.status == 'succeeded':
+            continue
+        if documents is not None and len(documents) > 1:
+            errors.update(rejected(search_index, [
+                (search_index.index.add_documents([document]), [document['id']], [document])
+                for document in documents
+            ]))
+        else:
+            error = f"Meilisearch task {task.uid} {task.status}: {task.error}"
+            errors.update(dict.fromkeys(object_ids, error))
+    return errors
+
+
+def reschedule(entries, now, error):
+    for entry in entries:
+        entry.attempts += 1
+        entry.available_at = now + backoff(entry.attempts)
+        entry.last_error = error(entry) if callable(error) else error
+    IndexOutbox.objects.bulk_update(entries, ['attempts', 'available_at', 'last_error'])
+
+
+def claim(batch_size=BATCH_SIZE):
+    """
+    Lease up to ``batch_size`` ready entries to the calling worker, oldest
+    first. Their ``available_at`` moves ``LEASE`` ahead, which hides them from
+    other workers until they are marked, or until the lease runs out if this
+    worker dies, so no row stays locked while Meilisearch is called.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            IndexOutbox.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if entries:
+            IndexOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(available_at=now + LEASE)
+    return entries
+
+
+def drain(batch_size=BATCH_SIZE):
+    """
+    Process one batch of ready outbox entries.
+
+    Entries are claimed (see ``claim()``) so several workers can run side by
+    side, and Meilisearch is called outside any transaction. Repeated changes
+    to the same object collapse into its latest operation. Entries are done,
+    and marked processed, once Meilisearch has processed their task, not
+    just accepted it. When a call fails, the whole batch is kept and
+    rescheduled with exponential backoff; when Meilisearch rejects some of
+    the changes, only their entries are, with the task's error.
+
+    Returns ``(processed, failed)`` entry counts; ``(0, 0)`` means idle.
+    """
+    entries = claim(batch_size)
+    if not entries:
+        return 0, 0
+
+    latest = {}
+    for entry in entries:
+        latest[entry.index_name, entry.object_id] = entry.operation
+
+    changes = {}
+    for (index_name, object_id), operation in latest.items():
+        upserts, deletes = changes.setdefault(index_name, ([], []))
+        (upserts if operation == IndexOutbox.UPSERT else deletes).append(object_id)
+
+    errors = {}
+    try:
+        indexes = get_indexes()
+        for index_name, (upserts, deletes) in changes.items():
+            search_index = indexes[index_name]
+            for object_id, error in rejected(search_index, push(search_index, upserts, deletes)).items():
+                errors[index_name, object_id] = error
+    except Exception as e:
+        logger.warning("Search outbox batch of %d failed: %r", len(entries), e)
+        with transaction.atomic():
+            reschedule(entries, timezone.now(), repr(e))
+        return 0, len(entries)
+
+    failed = [entry for entry in entries if (entry.index_name, entry.object_id) in errors]
+    done = [entry.pk for entry in entries if (entry.index_name, entry.object_id) not in errors]
+    with transaction.atomic():
+        if failed:
+            logger.warning(
+                "Meilisearch rejected %d of %d search outbox changes: %s",
+                len(failed), len(entries), '; '.join(sorted(set(errors.values()))),
+            )
+            reschedule(failed, timezone.now(), lambda entry: errors[entry.index_name, entry.object_id])
+        IndexOutbox.objects.filter(pk__in=done).update(processed_at=timezone.now())
+
+    # Responses cached between the write and now were computed from the old documents.
+    for index_name in changes:
+        search_cache.invalidate(index_name)
+    return len(done), len(failed)
+
+
+def prune(retention=RETENTION):
+    """Delete the entries processed more than ``retention`` ago; returns how many."""
+    deleted, _ = IndexOutbox.objects.filter(processed_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+def changed_since(index_name, since):
+    """
+    Ids of the objects of ``index_name`` queued for a change since ``since``,
+    processed or not, as long as ``RETENTION`` covers that time.
+    """
+    return set(
+        IndexOutbox.objects.filter(index_name=index_name, created_at__gte=since)
+        .values_list('object_id', flat=True)
+    )
+
+
+def stats():
+    """Lag metrics for the outbox: queue depth, entries being retried and age of the oldest one."""
+    aggregate = IndexOutbox.objects.filter(processed_at__isnull=True).aggregate(
+        pending=Count('id'),
+        retrying=Count('id', filter=Q(attempts__gt=0)),
+        oldest=Min('created_at'),
+    )
+    oldest = aggregate.pop('oldest')
+    aggregate['lag_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return aggregate
@@ -0,0 +1,214 @@
+import json
+import math
+from decimal import Decimal
+
+from rest_framework import serializers
+
+MAX_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 20
+
+
+def quote(value):
+    """Quote a value for a Meilisearch filter expression"""
+    return json.dumps(str(value))
+
+
+def sort_choices(fields):
+    return [f'{field}:{order}' for field in fields for order in ('asc', 'desc')]
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """
+    Validates the query string of a search endpoint. Subclasses add their
+    filters, sort keys and facets, and translate them into Meilisearch
+    parameters; other backends read ``validated_data`` directly.
+
+    Pagination is either ``page``/``hits_per_page`` (exact totals) or
+    ``offset``/``limit`` (estimated totals, cheaper), not both.
+    """
+    results_key = None
+    visible_filter = None
+    retrieved_attributes = None
+
+    q = serializers.CharField(required=False, allow_blank=True, default='')
+    filter = serializers.CharField(required=False, help_text='Raw Meilisearch filter expression')
+    page = serializers.IntegerField(min_value=1, required=False)
+    hits_per_page = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, required=False)
+    offset = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, required=False)
+
+    def validate(self, attrs):
+        # Matching is case-insensitive; normalizing makes equivalent queries share a cache entry.
+        attrs['q'] = ' '.join(attrs['q'].lower().split())
+        if ('page' in attrs or 'hits_per_page' in attrs) and ('offset' in attrs or 'limit' in attrs):
+            raise serializers.ValidationError('Use either page/hits_per_page or offset/limit, not both.')
+        return attrs
+
+    @property
+    def paginate_by_page(self):
+        return 'page' in self.validated_data or 'hits_per_page' in self.validated_data
+
+    def get_window(self):
+        """``(offset, limit)`` of the requested page"""
+        data = self.validated_data
+        if self.paginate_by_page:
+            hits_per_page = data.get('hits_per_page', DEFAULT_PAGE_SIZE)
+            return (data.get('page', 1) - 1) * hits_per_page, hits_per_page
+        return data.get('offset', 0), data.get('limit', DEFAULT_PAGE_SIZE)
+
+    def get_cache_key(self):
+        return sorted(self.validated_data.items())
+
+    def get_filters(self):
+        filters = [self.visible_filter]
+        if self.validated_data.get('filter'):
+            # Top-level array entries are ANDed, so a client filter can only narrow results.
+            filters.append(self.validated_data['filter'])
+        return filters
+
+    def get_sort(self):
+        return self.validated_data.get('sort', [])
+
+    def get_search_params(self):
+        """Meilisearch search parameters"""
+        data = self.validated_data
+        params = {
+            'filter': self.get_filters(),
+            'attributesToRetrieve': self.retrieved_attributes,
+        }
+        if self.get_sort():
+            params['sort'] = self.get_sort()
+        if data.get('facets'):
+            params['facets'] = data['facets']
+        if self.paginate_by_page:
+            params['page'] = data.get('page', 1)
+            params['hitsPerPage'] = data.get('hits_per_page', DEFAULT_PAGE_SIZE)
+        else:
+            params['offset'] = data.get('offset', 0)
+            params['limit'] = data.get('limit', DEFAULT_PAGE_SIZE)
+        return params
+
+    def format_results(self, results):
+        """
+        Shape a backend result (``hits``, ``facets``, ``total``) for the API
+        """
+        response = {
+            self.results_key: results['hits'],
+            'facets': results['facets'],
+            'total': results['total'],
+        }
+        offset, limit = self.get_window()
+        if self.paginate_by_page:
+            response.update({
+                'page': offset // limit + 1,
+                'hits_per_page': limit,
+                'total_pages': math.ceil(results['total'] / limit),
+            })
+        else:
+            response.update({'offset': offset, 'limit': limit})
+        return response
+
+
+class ProductSearchQuerySerializer(SearchQuerySerializer):
+    results_key = 'products'
+    # Only products the shop would list are searchable.
+    visible_filter = 'is_active = true AND deleted = false AND is_sold = false'
+    retrieved_attributes = [
+        'id', 'title', 'brand', 'category', 'category_name', 'thumbnail', 'selling_price', 'mrp', 'is_ad',
+    ]
+    sortable_fields = ['created_at', 'updated_at', 'selling_price', 'mrp']
+    facet_fields = ['category', 'category_name', 'brand', 'is_ad']
+
+    category = serializers.ListField(child=serializers.UUIDField(), required=False)
+    brand = serializers.ListField(child=serializers.CharField(), required=False)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    is_ad = serializers.ChoiceField(choices=['true', 'false'], required=False)
+    sort = serializers.ListField(child=serializers.ChoiceField(choices=sort_choices(sortable_fields)), required=False)
+    facets = serializers.ListField(child=serializers.ChoiceField(choices=facet_fields), required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if 'min_price' in attrs and 'max_price' in attrs and attrs['min_price'] > attrs['max_price']:
+            raise serializers.ValidationError({'min_price': 'Must not be greater than max_price.'})
+        return attrs
+
+    def get_filters(self):
+        data = self.validated_data
+        filters = super().get_filters()
+        if data.get('category'):
+            filters.append(f"category IN [{', '.join(quote(c) for c in sorted(data['category']))}]")
+        if data.get('brand'):
+            filters.append(f"brand IN [{', '.join(quote(b) for b in sorted(data['brand']))}]")
+        if 'min_price' in data:
+            filters.append(f"selling_price >= {data['min_price']}")
+        if 'max_price' in data:
+            filters.append(f"selling_price <= {data['max_price']}")
+        if 'is_ad' in data:
+            filters.append(f"is_ad = {data['is_ad']}")
+        return filters
+
+
+class PropertySearchQuerySerializer(SearchQuerySerializer):
+    results_key = 'properties'
+    visible_filter = 'is_active = true AND deleted = false'
+    retrieved_attributes = [
+        'id', 'title', 'location', 'thumbnail', 'rent_per_month', 'security_deposit', 'furnished',
+        'sharing', 'available_vacancy', '_geo',
+    ]
+    # ``distance`` sorts by distance from lat/lng.
+    sortable_fields = ['created_at', 'rent_per_month', 'security_deposit', 'distance']
+    facet_fields = ['furnished', 'sharing']
+
+    min_rent = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    max_rent = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    max_deposit = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    sharing = serializers.IntegerField(min_value=1, required=False)
+    min_vacancy = serializers.IntegerField(min_value=1, required=False)
+    furnished = serializers.ChoiceField(choices=['true', 'false'], required=False)
+    lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    lng = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    radius = serializers.IntegerField(min_value=1, max_value=100_000, required=False, help_text='Meters from lat/lng')
+    sort = serializers.ListField(child=serializers.ChoiceField(choices=sort_choices(sortable_fields)), required=False)
+    facets = serializers.ListField(child=serializers.ChoiceField(choices=facet_fields), required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if 'min_rent' in attrs and 'max_rent' in attrs and attrs['min_rent'] > attrs['max_rent']:
+            raise serializers.ValidationError({'min_rent': 'Must not be greater than max_rent.'})
+        if ('lat' in attrs) != ('lng' in attrs):
+            raise serializers.ValidationError('lat and lng must be given together.')
+        needs_point = 'radius' in attrs or any(key.startswith('distance:') for key in attrs.get('sort', []))
+        if needs_point and 'lat' not in attrs:
+            raise serializers.ValidationError('radius and distance sorting need lat and lng.')
+        return attrs
+
+    @property
+    def is_geo(self):
+        return 'lat' in self.validated_data
+
+    def get_sort(self):
+        data = self.validated_data
+        return [
+            f"_geoPoint({data['lat']}, {data['lng']}):{key.split(':')[1]}" if key.startswith('distance:') else key
+            for key in data.get('sort', [])
+        ]
+
+    def get_filters(self):
+        data = self.validated_data
+        filters = super().get_filters()
+        if 'min_rent' in data:
+            filters.append(f"rent_per_month >= {data['min_rent']}")
+        if 'max_rent' in data:
+            filters.append(f"rent_per_month <= {data['max_rent']}")
+        if 'max_deposit' in data:
+            filters.append(f"security_deposit <= {data['max_deposit']}")
+        if 'sharing' in data:
+            filters.append(f"sharing = {data['sharing']}")
+        if 'min_vacancy' in data:
+            filters.append(f"available_vacancy >= {data['min_vacancy']}")
+        if 'furnished' in data:
+            filters.append(f"furnished = {data['furnished']}")
+        if 'radius' in data:
+            filters.append(f"_geoRadius({data['lat']}, {data['lng']}, {data['radius']})")
+        return filters
@@ -1,26 +1,63 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.core.signals import setting_changed
 from product.models import Product
-import meilisearch
+from product.signals import products_bulk_saved
+from property.models import Property
+from property.signals import properties_bulk_saved
+
+from .cache import search_cache
+from .models import IndexOutbox
+from .outbox import enqueue
 
-# Initialize Meilisearch client
-MEILISEARCH_URL = "http://meilisearch:7700/"  # Make sure it matches your Docker setup
-MEILISEARCH_API_KEY = "EQpsOmvVXkfV4VeqBxdgiGf2TkuJtCiX39KZNCMu8ZM"
-client = meilisearch.Client(MEILISEARCH_URL, MEILISEARCH_API_KEY)
 
 @receiver(post_save, sender=Product)
-def sync_product_on_save(sender, instance, **kwargs):
+def enqueue_product_upsert(sender, instance, **kwargs):
+    """Queue the product for (re)indexing; the outbox worker sends it to Meilisearch."""
+    enqueue('products', [instance.pk], IndexOutbox.UPSERT)
+    transaction.on_commit(lambda: search_cache.invalidate('products'))
 
-    client.index("products").add_documents([{
-        "id": instance.id,
-        "name": instance.name,
-        "description": instance.description,
-        "price": instance.price,
-        "brand": instance.brand,
-        "category": instance.category.name if instance.category else None,
-    }])
 
 @receiver(post_delete, sender=Product)
-def remove_product_from_index(sender, instance, **kwargs):
+def enqueue_product_delete(sender, instance, **kwargs):
+    """Queue removal of the product's search document."""
+    enqueue('products', [instance.pk], IndexOutbox.DELETE)
+    transaction.on_commit(lambda: search_cache.invalidate('products'))
+
+
+@receiver(products_bulk_saved, sender=Product)
+def enqueue_products_bulk_upsert(sender, ids, **kwargs):
+    """Queue a whole batch of bulk-written products in one insert."""
+    enqueue('products', ids, IndexOutbox.UPSERT)
+    transaction.on_commit(lambda: search_cache.invalidate('products'))
+
+
+@receiver(post_save, sender=Property)
+def enqueue_property_upsert(sender, instance, **kwargs):
+    """Queue the property for (re)indexing; the outbox worker sends it to Meilisearch."""
+    enqueue('properties', [instance.pk], IndexOutbox.UPSERT)
+    transaction.on_commit(lambda: search_cache.invalidate('properties'))
+
+
+@receiver(post_delete, sender=Property)
+def enqueue_property_delete(sender, instance, **kwargs):
+    """Queue removal of the property's search document."""
+    enqueue('properties', [instance.pk], IndexOutbox.DELETE)
+    transaction.on_commit(lambda: search_cache.invalidate('properties'))
+
+
+@receiver(properties_bulk_saved, sender=Property)
+def enqueue_properties_bulk_upsert(sender, ids, **kwargs):
+    """Queue a whole batch of bulk-written properties in one insert."""
+    enqueue('properties', ids, IndexOutbox.UPSERT)
+    transaction.on_commit(lambda: search_cache.invalidate('properties'))
+
+
+@receiver(setting_changed)
+def reset_meilisearch_clients(setting, **kwargs):
+    """Rebuild the Meilisearch clients against overridden settings (tests, benchmarks)."""
+    if setting in ('MEILISEARCH_URL', 'MEILISEARCH_API_KEY', 'MEILISEARCH_HTTP'):
+        from .client import reset_clients
 
-    client.index("products").delete_document(str(instance.id))
+        reset_clients()
@@ -1,3 +1,533 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from meilisearch.errors import MeilisearchCommunicationError
+from rest_framework.test import APIClient
+
+from backend.cache import ResponseCache
+from benchmarks.meilisearch_stub import MeilisearchStub
+from product.models import Category, Product
+
+from . import backends, outbox
+from .backends import BaseSearchBackend, FailoverSearch, PostgresSearchBackend, SearchBackendError
+from .cache import search_cache
+from .client import AsyncMeilisearchClient, CircuitBreaker, MeilisearchUnavailable, get_async_client
+from .meilisearch_integration import MeilisearchProductIndex
+from .models import IndexOutbox
+from .serializers import ProductSearchQuerySerializer, PropertySearchQuerySerializer
+
+
+class RecordingIndex:
+    """
+    Stands in for both a Meilisearch index and its client: records the
+    calls and processes every task at once, failing those that hold a
+    document of ``reject``.
+    """
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.calls = []
+        self.failed_tasks = {}
+
+    def add_documents(self, documents):
+        ids = sorted(document['id'] for document in documents)
+        self.calls.append(('add', ids))
+        return self.task(bool(self.reject & set(ids)))
+
+    def delete_documents(self, ids):
+        self.calls.append(('delete', sorted(ids)))
+        return self.task(False)
+
+    def task(self, failed):
+        uid = len(self.failed_tasks)
+        self.failed_tasks[uid] = failed
+        return SimpleNamespace(task_uid=uid)
+
+    def wait_for_task(self, uid, **kwargs):
+        if self.failed_tasks[uid]:
+            return SimpleNamespace(uid=uid, status='failed', error={'code': 'invalid_document_geo_field'})
+        return SimpleNamespace(uid=uid, status='succeeded', error=None)
+
+
+class RecordingProductIndex(MeilisearchProductIndex):
+    """The products index, documents and all, sending them to a RecordingIndex"""
+
+    def __init__(self, meilisearch):
+        self.meilisearch = meilisearch
+
+    @property
+    def client(self):
+        return self.meilisearch
+
+    @property
+    def index(self):
+        return self.meilisearch
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.category = Category.objects.create(name='Books', slug='books')
+
+    def create_product(self, title):
+        return Product.objects.create(
+            title=title, description='A product', owner=self.owner, category=self.category,
+            brand='Acme', mrp=100, selling_price=80, is_active=True,
+        )
+
+    def drain(self, meilisearch):
+        with mock.patch.object(outbox, 'get_indexes', return_value={'products': RecordingProductIndex(meilisearch)}):
+            return outbox.drain()
+
+    def test_changes_are_queued_with_the_write(self):
+        product = self.create_product('Lamp')
+        self.assertEqual(
+            list(IndexOutbox.objects.values_list('index_name', 'object_id', 'operation')),
+            [('products', str(product.pk), IndexOutbox.UPSERT)],
+        )
+
+    def test_drain_coalesces_changes_per_object(self):
+        kept = self.create_product('Lamp')
+        kept.title = 'Desk lamp'
+        kept.save()
+        other = self.create_product('Chair')
+        gone = self.create_product('Table')
+        gone_pk = str(gone.pk)
+        gone.delete()
+
+        meilisearch = RecordingIndex()
+        self.assertEqual(self.drain(meilisearch), (5, 0))
+        self.assertEqual(meilisearch.calls, [
+            ('add', sorted([str(kept.pk), str(other.pk)])),
+            ('delete', [gone_pk]),
+        ])
+        self.assertFalse(IndexOutbox.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(self.drain(meilisearch), (0, 0))
+
+    def test_rejected_documents_are_retried_alone(self):
+        good = self.create_product('Lamp')
+        bad = self.create_product('Chair')
+
+        meilisearch = RecordingIndex(reject=[str(bad.pk)])
+        with self.assertLogs('search.outbox', 'WARNING'):
+            self.assertEqual(self.drain(meilisearch), (1, 1))
+        # The failed batch is resent a document at a time to find the invalid one
+        self.assertCountEqual(meilisearch.calls[1:], [('add', [str(good.pk)]), ('add', [str(bad.pk)])])
+        entry = IndexOutbox.objects.get(processed_at__isnull=True)
+        self.assertEqual(entry.object_id, str(bad.pk))
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn('invalid_document_geo_field', entry.last_error)
+        self.assertEqual(self.drain(meilisearch), (0, 0))  # Not before its backoff
+
+    def test_failed_calls_reschedule_the_batch(self):
+        self.create_product('Lamp')
+        self.create_product('Chair')
+
+        meilisearch = RecordingIndex()
+        meilisearch.add_documents = mock.Mock(side_effect=ConnectionError('Meilisearch is down'))
+        with self.assertLogs('search.outbox', 'WARNING'):
+            self.assertEqual(self.drain(meilisearch), (0, 2))
+        self.assertEqual(
+            list(IndexOutbox.objects.values_list('attempts', flat=True)), [1, 1],
+        )
+
+    def test_meilisearch_is_called_outside_transactions(self):
+        self.create_product('Lamp')
+        depth = len(connection.atomic_blocks)  # The test case's own
+        during_calls = []
+
+        def push(*args):
+            during_calls.append((len(connection.atomic_blocks), outbox.claim()))
+            return []
+
+        with mock.patch.object(outbox, 'push', side_effect=push):
+            self.assertEqual(self.drain(RecordingIndex()), (1, 0))
+        # The claimed entry is leased away from other workers meanwhile
+        self.assertEqual(during_calls, [(depth, [])])
+
+    def test_processed_changes_are_kept_for_replays(self):
+        before = self.create_product('Lamp')
+        self.drain(RecordingIndex())
+        since = timezone.now()
+        changed = self.create_product('Chair')
+        gone = self.create_product('Table')
+        gone_pk = str(gone.pk)
+        gone.delete()
+        self.drain(RecordingIndex())
+
+        # Deleted objects included, though their change was already processed
+        self.assertEqual(outbox.changed_since('products', since), {str(changed.pk), gone_pk})
+        self.assertEqual(outbox.changed_since('properties', since), set())
+        self.assertEqual(outbox.stats()['pending'], 0)
+
+        IndexOutbox.objects.filter(object_id=str(before.pk)).update(
+            processed_at=timezone.now() - outbox.RETENTION - timedelta(minutes=1),
+        )
+        self.assertEqual(outbox.prune(), 1)
+        self.assertEqual(IndexOutbox.objects.count(), 3)
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    def outage(self, breaker, error=None):
+        breaker.before_call()
+        breaker.record(error or MeilisearchCommunicationError('Connection refused'))
+
+    def test_opens_after_consecutive_outages(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.outage(breaker)
+        breaker.before_call()
+        breaker.record()  # A success starts the count again
+        self.outage(breaker)
+        self.assertEqual(breaker.state, 'closed')
+        with self.assertLogs('search.client', 'WARNING'):
+            self.outage(breaker)
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(MeilisearchUnavailable):
+            breaker.before_call()
+
+    def test_call_errors_are_not_outages(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        self.outage(breaker, ValueError('Invalid filter'))
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_one_probe_when_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        with self.assertLogs('search.client', 'WARNING'):
+            self.outage(breaker)
+        self.assertEqual(breaker.state, 'half-open')
+        breaker.before_call()
+        with self.assertRaises(MeilisearchUnavailable):
+            breaker.before_call()  # While the probe is in flight
+        breaker.record(MeilisearchCommunicationError('Connection refused'))
+        breaker.before_call()
+        with self.assertLogs('search.client', 'INFO'):
+            breaker.record()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_cancelled_probe_lets_the_next_one_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        with self.assertLogs('search.client', 'WARNING'):
+            self.outage(breaker)
+
+        async def probe():
+            client = AsyncMeilisearchClient('http://meilisearch.invalid', breaker=breaker)
+            client.send = lambda *args: asyncio.Event().wait()  # Never answers
+            task = asyncio.create_task(client.search('products', 'lamp'))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await client.aclose()
+
+        asyncio.run(probe())
+        self.assertFalse(breaker.probing)
+        breaker.before_call()
+
+
+class AsyncClientTestCase(SimpleTestCase):
+    def test_closed_with_its_event_loop(self):
+        async def search():
+            client = get_async_client()
+            self.assertIs(get_async_client(), client)
+            return client
+
+        # As Django runs async views under WSGI: in an event loop per request
+        first, second = async_to_sync(search)(), async_to_sync(search)()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.http.is_closed)
+        self.assertTrue(second.http.is_closed)
+
+
+class SearchQueryTestCase(SimpleTestCase):
+    def query(self, query_string, serializer_class=ProductSearchQuerySerializer):
+        query = serializer_class(data=QueryDict(query_string))
+        query.is_valid()
+        return query
+
+    def test_invalid_queries(self):
+        for query_string in (
+            'page=2&offset=20',
+            'hits_per_page=500',
+            'min_price=50&max_price=10',
+            'sort=title:asc',
+            'facets=owner',
+            'category=not-a-uuid',
+        ):
+            with self.subTest(query_string):
+                self.assertFalse(self.query(query_string).is_valid())
+        for query_string in ('lat=12.9', 'radius=1000', 'sort=distance:asc', 'min_rent=9000&max_rent=5000'):
+            with self.subTest(query_string):
+                self.assertFalse(self.query(query_string, PropertySearchQuerySerializer).is_valid())
+
+    def test_search_params(self):
+        category = '7d3b0c52-55d6-4c8e-9f43-8d6c2c35c8a1'
+        query = self.query(f'q=Desk+Lamp&category={category}&brand=Acme&min_price=10&is_ad=false'
+                           '&sort=selling_price:asc&facets=brand&page=2&hits_per_page=10')
+        self.assertEqual(query.errors, {})
+        self.assertEqual(query.validated_data['q'], 'desk lamp')
+        self.assertEqual(query.get_search_params(), {
+            'filter': [
+                ProductSearchQuerySerializer.visible_filter,
+                f'category IN ["{category}"]',
+                'brand IN ["Acme"]',
+                'selling_price >= 10.00',
+                'is_ad = false',
+            ],
+            'attributesToRetrieve': ProductSearchQuerySerializer.retrieved_attributes,
+            'sort': ['selling_price:asc'],
+            'facets': ['brand'],
+            'page': 2,
+            'hitsPerPage': 10,
+        })
+        self.assertEqual(
+            query.format_results({'hits': [], 'facets': {}, 'total': 25}),
+            {'products': [], 'facets': {}, 'total': 25, 'page': 2, 'hits_per_page': 10, 'total_pages': 3},
+        )
+
+    def test_client_filters_only_narrow_results(self):
+        query = self.query('filter=is_sold+%3D+true+OR+deleted+%3D+true')
+        self.assertEqual(query.get_search_params()['filter'], [
+            ProductSearchQuerySerializer.visible_filter, 'is_sold = true OR deleted = true',
+        ])
+
+    def test_distance_search(self):
+        query = self.query('lat=12.9&lng=77.6&radius=2000&sort=distance:asc', PropertySearchQuerySerializer)
+        params = query.get_search_params()
+        self.assertIn('_geoRadius(12.9, 77.6, 2000)', params['filter'])
+        self.assertEqual(params['sort'], ['_geoPoint(12.9, 77.6):asc'])
+
+    def test_equivalent_queries_share_a_cache_key(self):
+        self.assertEqual(
+            self.query('q=Desk++LAMP&brand=Acme&limit=20').get_cache_key(),
+            self.query('limit=20&brand=Acme&q=desk%20lamp').get_cache_key(),
+        )
+        self.assertNotEqual(
+            self.query('q=lamp&brand=Acme').get_cache_key(),
+            self.query('q=lamp&brand=Other').get_cache_key(),
+        )
+
+
+class ResponseCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache('test', ttl=30, stale_ttl=300)
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'computed': self.computed}
+
+    def test_hit(self):
+        self.assertEqual(self.cache.get_or_compute('products', {'q': 'lamp'}, self.compute), {'computed': 1})
+        self.assertEqual(self.cache.get_or_compute('products', {'q': 'lamp'}, self.compute), {'computed': 1})
+        self.assertEqual(self.cache.get_or_compute('products', {'q': 'desk'}, self.compute), {'computed': 2})
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 2))
+
+    def test_invalidate_drops_one_namespace(self):
+        self.cache.get_or_compute('products', {}, self.compute)
+        self.cache.get_or_compute('properties', {}, self.compute)
+        self.cache.invalidate('products')
+        self.assertEqual(self.cache.generation('products'), 1)
+        self.assertEqual(self.cache.get_or_compute('products', {}, self.compute), {'computed': 3})
+        self.assertEqual(self.cache.get_or_compute('properties', {}, self.compute), {'computed': 2})
+
+    def test_stale_entry_is_served_while_refreshed(self):
+        self.cache.ttl = 0
+        self.cache.get_or_compute('products', {}, self.compute)
+        self.assertEqual(self.cache.get_or_compute('products', {}, self.compute), {'computed': 1})
+        deadline = time.monotonic() + 5
+        while self.cache.stats()['refreshes'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.computed, 2)
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_concurrent_misses_compute_once(self):
+        def slow_compute():
+            time.sleep(0.2)
+            return self.compute()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute('products', {}, slow_compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.computed, 1)
+        self.assertEqual(results, [{'computed': 1}] * 5)
+
+    def test_async(self):
+        async def compute():
+            return self.compute()
+
+        lookup = async_to_sync(self.cache.aget_or_compute)
+        self.assertEqual(lookup('products', {}, compute), {'computed': 1})
+        self.assertEqual(lookup('products', {}, compute), {'computed': 1})
+        self.cache.invalidate('products')
+        self.assertEqual(lookup('products', {}, compute), {'computed': 2})
+
+
+class SearchCacheInvalidationTestCase(TestCase):
+    def test_writes_invalidate_on_commit(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        category = Category.objects.create(name='Books', slug='books')
+        generation, other = search_cache.generation('products'), search_cache.generation('properties')
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(title='Lamp', description='A lamp', owner=owner, category=category,
+                                             brand='Acme', mrp=100, selling_price=80, is_active=True)
+            self.assertEqual(search_cache.generation('products'), generation)  # Not before the commit
+        self.assertEqual(search_cache.generation('products'), generation + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(search_cache.generation('products'), generation + 2)
+        self.assertEqual(search_cache.generation('properties'), other)
+
+
+class UnavailableBackend(BaseSearchBackend):
+    kinds = ('products',)
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, kind, query):
+        self.calls += 1
+        raise SearchBackendError('Meilisearch is down')
+
+
+class PostgresSearchTestCase(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.books = Category.objects.create(name='Books', slug='books')
+        self.lighting = Category.objects.create(name='Lighting', slug='lighting')
+        for title, category, price, visible in (
+            ('Desk lamp', self.lighting, 40, True),
+            ('Floor lamp', self.lighting, 120, True),
+            ('Lamp shade', self.lighting, 15, False),  # Sold
+            ('Cookbook', self.books, 20, True),
+        ):
+            Product.objects.create(title=title, description='A product', owner=owner, category=category,
+                                   brand='Acme', mrp=200, selling_price=price, is_active=True, is_sold=not visible)
+        self.backend = PostgresSearchBackend()
+
+    def search(self, query_string):
+        query = ProductSearchQuerySerializer(data=QueryDict(query_string))
+        self.assertTrue(query.is_valid(), query.errors)
+        return self.backend.search('products', query)
+
+    def titles(self, results):
+        return [hit['title'] for hit in results['hits']]
+
+    def test_full_text(self):
+        results = self.search('q=lamps')  # Stemmed
+        self.assertEqual(sorted(self.titles(results)), ['Desk lamp', 'Floor lamp'])
+        self.assertEqual(results['total'], 2)
+
+    def test_typos(self):
+        self.assertEqual(self.titles(self.search('q=cookbok')), ['Cookbook'])
+
+    def test_filters_facets_and_pages(self):
+        results = self.search('min_price=30&facets=category_name&sort=selling_price:desc&hits_per_page=1')
+        self.assertEqual(self.titles(results), ['Floor lamp'])
+        self.assertEqual(results['total'], 2)
+        self.assertEqual(results['facets'], {'category_name': {'Lighting': 2}})
+        hit = results['hits'][0]
+        self.assertEqual(hit['selling_price'], 120.0)  # As in Meilisearch hits
+        self.assertIsInstance(hit['id'], str)
+
+    def test_async_search(self):
+        query = ProductSearchQuerySerializer(data=QueryDict('q=lamp'))
+        query.is_valid()
+        self.assertEqual(
+            sorted(hit['title'] for hit in async_to_sync(self.backend.asearch)('products', query)['hits']),
+            ['Desk lamp', 'Floor lamp'],
+        )
+
+    def test_meilisearch_only_queries(self):
+        query = ProductSearchQuerySerializer(data=QueryDict('filter=brand+%3D+Acme'))
+        query.is_valid()
+        self.assertFalse(self.backend.supports('products', query))
+
+    def test_failover(self):
+        unavailable = UnavailableBackend()
+        search = FailoverSearch([unavailable, self.backend], cooldown=60)
+        query = ProductSearchQuerySerializer(data=QueryDict('q=lamp'))
+        query.is_valid()
+        with self.assertLogs('search.backends', 'WARNING'):
+            self.assertEqual(len(search.search('products', query)['hits']), 2)
+        search.search('products', query)
+        self.assertEqual(unavailable.calls, 1)  # Skipped during the cooldown
+
+        search = FailoverSearch([unavailable], cooldown=60)
+        with self.assertLogs('search.backends', 'WARNING'), self.assertRaises(SearchBackendError):
+            search.search('products', query)
+
+
+class SearchViewTestCase(TestCase):
+    def setUp(self):
+        search_cache.clear()
+        backends._search = None  # Rebuilt from the settings of the test
+        self.addCleanup(setattr, backends, '_search', None)
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'password')
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        category = Category.objects.create(name='Lighting', slug='lighting')
+        for title in ('Desk lamp', 'Floor lamp', 'Armchair'):
+            Product.objects.create(title=title, description='A product', owner=owner, category=category,
+                                   brand='Acme', mrp=100, selling_price=80, is_active=True)
+        self.client = APIClient()
+        self.url = reverse('search_products')
+
+    def test_requires_authentication(self):
+        response = self.client.get(self.url, {'q': 'lamp'})
+        # SessionAuthentication comes first and has no challenge: 403, not 401
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(SEARCH_BACKENDS=['search.backends.PostgresSearchBackend'])
+    def test_search(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'q': 'lamp', 'hits_per_page': 10})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(sorted(hit['title'] for hit in data['products']), ['Desk lamp', 'Floor lamp'])
+        self.assertEqual((data['total'], data['page'], data['total_pages']), (2, 1, 1))
+
+        response = self.client.get(self.url, {'q': 'lamp', 'page': 1, 'offset': 10})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('details', response.json())
+
+    def test_search_through_meilisearch(self):
+        self.client.force_authenticate(self.user)
+        with MeilisearchStub() as stub, override_settings(MEILISEARCH_URL=stub.url):
+            response = self.client.get(self.url, {'q': 'lamp'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(hit['title'] for hit in response.json()['products']), ['Desk lamp', 'Floor lamp'])
+        # The async client accounts its calls to the request
+        self.assertIn('meilisearch;', response['Server-Timing'])
+
+    def test_unavailable(self):
+        self.client.force_authenticate(self.user)
+        with override_settings(SEARCH_BACKENDS=['search.tests.UnavailableBackend']), \
+                self.assertLogs('search.backends', 'WARNING'):
+            response = self.client.get(self.url, {'q': 'lamp'})
+        self.assertEqual(response.status_code, 503)
+
+    def test_cache_stats_are_for_admins(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('search_cache_stats')).status_code, 403)
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get(reverse('search_cache_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hit_ratio', response.json())
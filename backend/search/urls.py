@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import SearchProducts
+from .views import SearchProducts, SearchProperties, SearchCacheStats
 
 urlpatterns = [
     path("search/", SearchProducts.as_view(), name="search_products"),
+    path("search/properties/", SearchProperties.as_view(), name="search_properties"),
+    path("search/cache-stats/", SearchCacheStats.as_view(), name="search_cache_stats"),
 ]
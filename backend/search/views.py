@@ -1,38 +1,70 @@
 from django.http import JsonResponse
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-import meilisearch
-from django.conf import settings
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
-client = meilisearch.Client(settings.MEILISEARCH_URL, settings.MEILISEARCH_API_KEY)
+from backend.async_views import AsyncAPIView
 
-class SearchProducts(APIView):
-    permission_classes = [IsAuthenticated]  # Ensure only authenticated users can search
+from .backends import InvalidSearchQuery, SearchBackendError, get_search
+from .cache import search_cache
+from .serializers import ProductSearchQuerySerializer, PropertySearchQuerySerializer
 
-    def get(self, request):
-        query = request.GET.get("q", "")
-        if not query:
-            return JsonResponse({"error": "Query parameter 'q' is required."}, status=400)
 
-        try:
-            results = client.index("products").search(query, {"limit": 10})
+class SearchProducts(AsyncAPIView):
+    """
+    GET /search/?q=...
+       -> Full-text product search with optional filters (category, brand,
+          min_price, max_price, is_ad, filter), sort, facets and
+          page/hits_per_page or offset/limit pagination.
 
-            if not results["hits"]:
-                return JsonResponse({"message": "No products found"}, status=200)
+    Served by the first available backend of settings.SEARCH_BACKENDS, so a
+    Meilisearch outage falls back to Postgres full-text search. Async: under
+    ASGI a worker serves other requests while waiting on the backend.
+    """
+    permission_classes = [IsAuthenticated]  # Ensure only authenticated users can search
+    kind = "products"
+    query_serializer_class = ProductSearchQuerySerializer
 
-            filtered_products = [
-                {
-                    "id": product["id"],
-                    "title": product["title"],
-                    "selling_price": product.get("selling_price", 0)
-                }
-                for product in results["hits"]
-            ]
+    async def get(self, request):
+        query = self.query_serializer_class(data=request.GET)
+        if not query.is_valid():
+            return JsonResponse({"error": "Invalid search parameters", "details": query.errors}, status=400)
+
+        async def search():
+            return query.format_results(await get_search().asearch(self.kind, query))
+
+        try:
+            return JsonResponse(
+                await search_cache.aget_or_compute(self.kind, query.get_cache_key(), search), status=200,
+            )
 
-            return JsonResponse({"products": filtered_products}, safe=False, status=200)
+        except InvalidSearchQuery as e:
+            return JsonResponse({"error": "Invalid search parameters", "details": str(e)}, status=400)
 
-        except meilisearch.errors.MeilisearchApiError as e:
-            return JsonResponse({"error": "Meilisearch API error", "details": str(e)}, status=500)
+        except SearchBackendError as e:
+            return JsonResponse({"error": "Search unavailable", "details": str(e)}, status=503)
 
         except Exception as e:
             return JsonResponse({"error": "Internal Server Error", "details": str(e)}, status=500)
+
+
+class SearchProperties(SearchProducts):
+    """
+    GET /search/properties/?q=...
+       -> Full-text property search with optional filters (min_rent,
+          max_rent, max_deposit, sharing, min_vacancy, furnished), distance
+          search (lat, lng, radius in meters, sort=distance:asc), sort,
+          facets and pagination.
+    """
+    kind = "properties"
+    query_serializer_class = PropertySearchQuerySerializer
+
+
+class SearchCacheStats(APIView):
+    """
+    GET /search/cache-stats/
+       -> Hit/miss counters and miss latency of the search result cache.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return JsonResponse(search_cache.stats())
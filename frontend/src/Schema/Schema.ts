@@ -30,7 +30,8 @@ export type ProductSchema = {
     is_sold: boolean;
     is_active: boolean;
     category: number;
-    images: string[];
+    images?: string[];
+    thumbnail: string | null;
     extra_features: ExtraFeatureSchema[];
 };
 
@@ -41,7 +42,10 @@ export interface PropertySchema {
     title: string;
     description: string;
     location: string;
-    images: string[];
+    latitude: string | null;
+    longitude: string | null;
+    images?: string[];
+    thumbnail: string | null;
     rent_per_month: number;
     security_deposit: number;
     furnished: boolean;
@@ -117,7 +117,7 @@ export const Rent = () => {
                         <Card key={property.id} className="hover:shadow-lg transition-shadow">
                             <div className="relative">
                                 <img
-                                    src={property.images[0]}
+                                    src={property.thumbnail}
                                     alt={property.title}
                                     className="w-full h-60 object-cover rounded-t-lg"
                                 />
@@ -17,8 +17,8 @@ export const Shop = () => {
     useEffect(() => {
         const fetchProducts = async () => {
             const data = await getProducts();
-            setProducts(data);
-            setFilteredProducts(data);
+            setProducts(data.results);
+            setFilteredProducts(data.results);
         };
 
         fetchProducts();
@@ -80,7 +80,7 @@ export const Shop = () => {
                         <Card key={product.id} className="hover:shadow-lg">
                             <div className='relative'>
                                 <img
-                                    src={product.images[0]}
+                                    src={product.thumbnail}
                                     alt={product.title}
                                     className="w-full h-60 object-cover rounded-t-md"
                                 />
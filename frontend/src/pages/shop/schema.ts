@@ -30,6 +30,7 @@ export type Product = {
     is_sold: boolean;
     is_active: boolean;
     category: number;
-    images: string[];
+    images?: string[];
+    thumbnail: string | null;
     extra_features: ExtraFeature[];
 };